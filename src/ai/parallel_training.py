@@ -0,0 +1,131 @@
+"""
+Multi process Q-learning training.
+Each worker process runs its own seeded episodes with a private Qlearning that starts
+from the current global table. At the end of every round the workers send back what
+they changed (summed Q deltas plus visit counts per state/action), the coordinator
+merges those into the global table and the next round starts everyone from the result.
+"""
+
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ai.qtable import DenseQTable
+from core.events import NullSink
+from ai.reinforcement import Qlearning
+from ai.training import run_headless_episode
+
+
+def _train_round(global_q: np.ndarray, seed: int, episodes: int, configs: List[Dict],
+                 max_turns: int, learning_rate: float, discount: float, epsilon: float):
+    """
+    Run one worker's episodes for a round and return (delta, visits, failed episodes).
+    Module level so a process pool can send it to the workers.
+    """
+    q_learning = Qlearning(learning_rate=learning_rate, discount=discount, epsilon=epsilon,
+                           rng=random.Random(seed), backend='dense')
+    q_learning.q_table.q[:] = global_q
+
+    failed = 0
+    for episode in range(episodes):
+        sim_params = configs[episode % len(configs)]
+        try:
+            run_headless_episode(q_learning, max_turns, seed + episode, **sim_params)
+        except Exception:
+            # same as ExperimentRunner, a crashed episode is skipped (whatever it learned first is kept)
+            failed += 1
+
+    return q_learning.q_table.q - global_q, q_learning.q_table.visits, failed
+
+
+class ParallelTrainer:
+    """
+    Trains one shared policy across `workers` processes.
+    merge='visits' weights each worker's change to a (state, action) by how often that worker
+    updated it, merge='average' takes the plain mean of the workers' changes.
+    configs is a list of Simulation kwargs, episodes cycle through them so the policy
+    is trained across all of them.
+    """
+
+    def __init__(self, workers: int = 4, episodes_per_round: int = 10, seed: Optional[int] = None,
+                 max_turns: int = 100, merge: str = 'visits', configs: Optional[List[Dict]] = None,
+                 learning_rate: float = 0.1, discount: float = 0.95, epsilon: float = 1, events=None):
+        if merge not in ('visits', 'average'):
+            raise ValueError(f"Invalid merge: {merge}. Must be 'visits' or 'average'")
+        self.workers = workers
+        self.episodes_per_round = episodes_per_round
+        self.seed = seed if seed is not None else random.randrange(2**31)
+        self.max_turns = max_turns
+        self.merge = merge
+        self.configs = configs if configs else [{}]
+        self.learning_rate = learning_rate
+        self.discount = discount
+        self.epsilon = epsilon
+        # per round progress goes here ('training' events), quiet unless a sink is passed in
+        self.events = events if events is not None else NullSink()
+
+        self.q_learning = Qlearning(learning_rate=learning_rate, discount=discount, epsilon=epsilon,
+                                    backend='dense')
+        self.rounds = 0
+        self.history = []  # largest change to any Q value in each round
+        self.failed_episodes = 0
+
+    def _worker_seed(self, worker: int) -> int:
+        # every worker and round gets its own block of episode seeds
+        return self.seed + (self.rounds * self.workers + worker) * self.episodes_per_round
+
+    def _merge(self, results):
+        table: DenseQTable = self.q_learning.q_table
+        deltas = np.stack([delta for delta, _, _ in results])
+        visits = np.stack([count for _, count, _ in results]).astype(np.float64)
+        self.failed_episodes += sum(failed for _, _, failed in results)
+
+        if self.merge == 'visits':
+            total = visits.sum(axis=0)
+            change = np.divide((deltas * visits).sum(axis=0), total,
+                               out=np.zeros_like(table.q), where=total > 0)
+        else:
+            change = deltas.mean(axis=0)
+
+        table.q += change
+        table.visits += visits.sum(axis=0).astype(np.int64)
+        for index in np.nonzero(visits.sum(axis=(0, 2)))[0]:
+            table.touch(int(index))
+        return float(np.abs(change).max()) if change.size else 0.0
+
+    def train_round(self, pool: Optional[ProcessPoolExecutor] = None) -> float:
+        """Run one round on every worker and merge it, returns the largest Q change."""
+        args = [(self.q_learning.q_table.q.copy(), self._worker_seed(worker), self.episodes_per_round,
+                 self.configs, self.max_turns, self.learning_rate, self.discount, self.epsilon)
+                for worker in range(self.workers)]
+
+        if pool is not None:
+            results = list(pool.map(_train_round, *zip(*args)))
+        elif self.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(_train_round, *zip(*args)))
+        else:
+            results = [_train_round(*args[0])]
+
+        change = self._merge(results)
+        self.rounds += 1
+        self.history.append(change)
+        return change
+
+    def train(self, rounds: int, tolerance: Optional[float] = None) -> Qlearning:
+        """Train for up to `rounds` rounds, stopping early once a round changes nothing by more than tolerance."""
+        # one pool for the whole run, starting processes every round would eat the speedup
+        pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        try:
+            for _ in range(rounds):
+                change = self.train_round(pool)
+                self.events.emit('training', "Round {round}: max |dQ| = {change:.4f} ({states} states)",
+                                 round=self.rounds, change=change, states=len(self.q_learning.q_table))
+                if tolerance is not None and change < tolerance:
+                    break
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return self.q_learning
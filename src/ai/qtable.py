@@ -0,0 +1,170 @@
+"""
+Dense numpy backend for the Q-table.
+Qlearning states are (health, stamina, honour, threat) tuples with only a few levels each,
+so every state gets a fixed integer index into one (n_states, n_actions) float array.
+Action selection and TD updates become array operations, and many transitions can be
+applied in one call instead of a python dict lookup per step.
+"""
+
+from typing import Dict, Iterator, Sequence, Tuple
+
+import numpy as np
+
+# the levels Qlearning.get_state can produce, in index order
+HEALTH_LEVELS = ('low', 'medium', 'high')
+STAMINA_LEVELS = ('low', 'high')
+HONOUR_LEVELS = ('low', 'medium', 'high')
+THREAT_LEVELS = ('low', 'medium', 'high')
+STATE_LEVELS = (HEALTH_LEVELS, STAMINA_LEVELS, HONOUR_LEVELS, THREAT_LEVELS)
+
+N_STATES = len(HEALTH_LEVELS) * len(STAMINA_LEVELS) * len(HONOUR_LEVELS) * len(THREAT_LEVELS)
+
+# level name -> position, one dict per part of the state
+_LEVEL_INDEX = [{name: i for i, name in enumerate(levels)} for levels in STATE_LEVELS]
+
+
+def encode_state(state: Tuple[str, ...]) -> int:
+    """State tuple -> row index (mixed radix over the levels)."""
+    index = 0
+    for part, levels, lookup in zip(state, STATE_LEVELS, _LEVEL_INDEX):
+        index = index * len(levels) + lookup[part]
+    return index
+
+
+def decode_state(index: int) -> Tuple[str, ...]:
+    parts = []
+    for levels in reversed(STATE_LEVELS):
+        index, digit = divmod(index, len(levels))
+        parts.append(levels[digit])
+    return tuple(reversed(parts))
+
+
+# every state tuple, precomputed so encoding is a dict lookup
+STATE_INDEX: Dict[Tuple[str, ...], int] = {decode_state(i): i for i in range(N_STATES)}
+
+
+class DenseQTable:
+    """
+    Q values in a preallocated (n_states, n_actions) array.
+    Also behaves enough like the old dict of dicts (len, in, [state], items()) that
+    reporting and snapshot code works with either backend. A state only "exists"
+    once it has been seen, and states iterate in the order they were first seen,
+    so len() and items() match what the dict backend would give.
+    """
+
+    def __init__(self, actions: Sequence[str]):
+        self.actions = list(actions)
+        self.action_index = {action: i for i, action in enumerate(self.actions)}
+        self.q = np.zeros((N_STATES, len(self.actions)), dtype=np.float64)
+        self.visits = np.zeros((N_STATES, len(self.actions)), dtype=np.int64)  # updates per (state, action)
+        self.seen = np.zeros(N_STATES, dtype=bool)
+        self.order = []  # state indices in the order they were first seen
+
+    # mapping style access
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def __contains__(self, state) -> bool:
+        index = STATE_INDEX.get(state)
+        return index is not None and bool(self.seen[index])
+
+    def __iter__(self) -> Iterator[Tuple[str, ...]]:
+        for index in self.order:
+            yield decode_state(index)
+
+    def __getitem__(self, state) -> Dict[str, float]:
+        index = STATE_INDEX[state]
+        if not self.seen[index]:
+            raise KeyError(state)
+        return dict(zip(self.actions, self.q[index].tolist()))
+
+    def __setitem__(self, state, values: Dict[str, float]):
+        index = STATE_INDEX[state]
+        for action, value in values.items():
+            self.q[index, self.action_index[action]] = value
+        self.touch(index)
+
+    def items(self):
+        return [(state, self[state]) for state in self]
+
+    def keys(self):
+        return list(self)
+
+    # array operations
+
+    def touch(self, index: int):
+        if not self.seen[index]:
+            self.seen[index] = True
+            self.order.append(index)
+
+    def _touch_many(self, indices: np.ndarray):
+        if self.seen[indices].all():
+            return
+        for index in indices.tolist():
+            self.touch(index)
+
+    def best_action(self, index: int) -> int:
+        # argmax takes the first maximum, the same tie break as max() over the action dict
+        return int(np.argmax(self.q[index]))
+
+    def best_actions(self, indices: np.ndarray) -> np.ndarray:
+        """Greedy action index for each state index."""
+        return np.argmax(self.q[indices], axis=1)
+
+    def td_update(self, state: int, action: int, reward: float, next_state: int,
+                  learning_rate: float, discount: float):
+        self.touch(state)
+        self.touch(next_state)
+        current = self.q[state, action]
+        target = reward + discount * self.q[next_state].max()
+        delta = learning_rate * (target - current)
+        self.q[state, action] = current + delta
+        self.visits[state, action] += 1
+        return delta
+
+    def batch_update(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+                     next_states: np.ndarray, learning_rate, discount: float,
+                     done: np.ndarray = None):
+        """
+        Apply many transitions at once. learning_rate is one value or one per transition.
+        They go in waves: the k-th transition to hit a (state, action) is in wave k, so
+        repeats of a pair are applied one after another like sequential updates rather
+        than having their steps summed. Each wave takes its targets from the table as it
+        is when the wave starts.
+        done marks terminal transitions, which dont bootstrap from next_state.
+        Returns the TD error of each transition.
+        """
+        states = np.asarray(states, dtype=np.int64)
+        actions = np.asarray(actions, dtype=np.int64)
+        next_states = np.asarray(next_states, dtype=np.int64)
+        rewards = np.asarray(rewards, dtype=np.float64)
+        learning_rate = np.broadcast_to(np.asarray(learning_rate, dtype=np.float64), states.shape)
+        td_error = np.zeros(len(states))
+        if not len(states):
+            return td_error
+
+        # rank of each transition among the ones hitting the same pair, in batch order
+        keys = states * len(self.actions) + actions
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        first = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+        group_start = np.maximum.accumulate(np.where(first, np.arange(len(keys)), 0))
+        rank = np.empty(len(keys), dtype=np.int64)
+        rank[order] = np.arange(len(keys)) - group_start
+
+        for wave in range(int(rank.max()) + 1):
+            picks = np.flatnonzero(rank == wave)
+            s, a, n = states[picks], actions[picks], next_states[picks]
+            future = self.q[n].max(axis=1)
+            if done is not None:
+                future = np.where(np.asarray(done)[picks], 0.0, future)
+            current = self.q[s, a]
+            error = rewards[picks] + discount * future - current
+            # pairs are unique within a wave so plain fancy assignment is safe
+            self.q[s, a] = current + learning_rate[picks] * error
+            td_error[picks] = error
+        np.add.at(self.visits, (states, actions), 1)
+
+        self._touch_many(np.column_stack((states, next_states)).ravel())
+        return td_error
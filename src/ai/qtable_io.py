@@ -0,0 +1,127 @@
+"""
+Binary Q-table files.
+A file is one or more checkpoints written one after another. Each checkpoint is a
+fixed header, the action names, a state key index (ai.qtable state indices, one per
+row) and one contiguous float64 array of Q values. Every section is padded to 8 bytes
+so the values can be memory mapped straight out of the file, letting many worker
+processes share one read only policy instead of each loading its own copy.
+Appending adds a new checkpoint without rewriting the earlier ones. A checkpoint cut
+short (a crash halfway through an append) is ignored when reading and written over by
+the next append.
+"""
+
+import os
+import struct
+from typing import List, NamedTuple, Sequence
+
+import numpy as np
+
+from ai.qtable import STATE_INDEX, decode_state
+
+FORMAT_VERSION = 1
+MAGIC = b'QTBL'
+# magic, version, actions, rows, bytes of action names, step (episode or update count of the checkpoint)
+HEADER = struct.Struct('<4sHHIIQ')
+
+
+def _padded(size: int) -> int:
+    return (size + 7) & ~7
+
+
+class Checkpoint(NamedTuple):
+    step: int
+    actions: List[str]
+    rows: int
+    keys_offset: int
+    values_offset: int
+
+
+def write_checkpoint(filename: str, keys: Sequence[int], values: np.ndarray, actions: Sequence[str],
+                     step: int = 0, append: bool = False):
+    """Write (or append) one checkpoint. keys are ai.qtable state indices, values is (rows, actions)."""
+    keys = np.asarray(keys, dtype='<i2')
+    values = np.ascontiguousarray(values, dtype='<f8')
+    if values.shape != (len(keys), len(actions)):
+        raise ValueError(f"values shape {values.shape} doesn't match {len(keys)} states x {len(actions)} actions")
+
+    names = '\n'.join(actions).encode('utf-8')
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, len(actions), len(keys), len(names), step),
+             names.ljust(_padded(len(names)), b'\0'),
+             keys.tobytes().ljust(_padded(keys.nbytes), b'\0'),
+             values.tobytes()]
+
+    with open(filename, 'r+b' if append and os.path.exists(filename) else 'wb') as f:
+        if append:
+            # start after the last complete checkpoint, dropping any torn one
+            f.truncate(_scan(f)[1])
+            f.seek(0, 2)
+        f.write(b''.join(parts))
+
+
+def _scan(f):
+    """(checkpoints, end of the last complete one) for an open file."""
+    checkpoints = []
+    data_end = f.seek(0, 2)
+    offset = 0
+    while offset + HEADER.size <= data_end:
+        f.seek(offset)
+        magic, version, n_actions, rows, names_len, step = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"Not a Q-table checkpoint at byte {offset} of {f.name}")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported Q-table version {version}, expected {FORMAT_VERSION}")
+
+        keys_offset = offset + HEADER.size + _padded(names_len)
+        values_offset = keys_offset + _padded(rows * 2)
+        end = values_offset + rows * n_actions * 8
+        if end > data_end:
+            break  # torn write, everything before it is still good
+        actions = f.read(names_len).decode('utf-8').split('\n') if names_len else []
+        checkpoints.append(Checkpoint(step, actions, rows, keys_offset, values_offset))
+        offset = end
+    return checkpoints, offset
+
+
+def read_checkpoints(filename: str) -> List[Checkpoint]:
+    """Walk the headers of every complete checkpoint in a file without reading the Q values."""
+    with open(filename, 'rb') as f:
+        return _scan(f)[0]
+
+
+class QTableFile:
+    """
+    One checkpoint of a Q-table file (the latest by default).
+    With mmap=True the values are a read only np.memmap, so opening is cheap and
+    the pages are shared between every process that opens the same file.
+    """
+
+    def __init__(self, filename: str, checkpoint: int = -1, mmap: bool = True):
+        self.filename = filename
+        self.checkpoints = read_checkpoints(filename)
+        if not self.checkpoints:
+            raise ValueError(f"{filename} has no checkpoints")
+        info = self.checkpoints[checkpoint]
+
+        self.step = info.step
+        self.actions = info.actions
+        shape = (info.rows, len(info.actions))
+        self.keys = np.fromfile(filename, dtype='<i2', count=info.rows, offset=info.keys_offset)
+        if mmap and info.rows:
+            self.values = np.memmap(filename, dtype='<f8', mode='r', offset=info.values_offset, shape=shape)
+        else:
+            self.values = np.fromfile(filename, dtype='<f8', count=shape[0] * shape[1],
+                                      offset=info.values_offset).reshape(shape)
+        self.row_of = {int(key): row for row, key in enumerate(self.keys)}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def states(self):
+        return [decode_state(int(key)) for key in self.keys]
+
+    def row(self, state) -> np.ndarray:
+        return self.values[self.row_of[STATE_INDEX[state]]]
+
+    def best_action(self, state) -> str:
+        """Greedy action for a state, for workers acting on a shared read only policy."""
+        return self.actions[int(np.argmax(self.row(state)))]
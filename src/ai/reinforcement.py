@@ -1,10 +1,21 @@
 import random 
-import pickle
+import numpy as np
+from entities.monster import Monster
+from ai.qtable import DenseQTable, STATE_INDEX, N_STATES
+from ai.schedules import ConvergenceTracker
+from ai.qtable_io import QTableFile, write_checkpoint
 
 class Qlearning:
     """
     q learning is an ai reingforcement learning algorithm that will help dek to learn from its environment and make better decisions over time.
     partly for challenge h , specifies we need reinforcment learning
+
+    Without schedules epsilon and learning_rate stay fixed, and the Qlearning a Simulation
+    makes for itself has none on purpose: it only lives for one run (one episode) so an
+    episode schedule would never move, and a per step one would change every seeded run
+    that core.batch and the experiment runner compare against (Dek exploring at epsilon 1).
+    Anything that trains across episodes should pass its own Qlearning with schedules,
+    e.g. epsilon_schedule=VisitCountSchedule(1.0, 0.5, 0.05) from ai.schedules.
     """
 
 
@@ -24,10 +35,13 @@ class Qlearning:
     # Helps the agent explore or exploit
     # Youd typically decay this over time
 
-    def __init__(self, learning_rate = 0.1, discount = 0.95, epsilon = 1): # these r standard values
+    def __init__(self, learning_rate = 0.1, discount = 0.95, epsilon = 1, rng = None, backend = 'dict',
+                 buffer = None, learn_online = True, epsilon_schedule = None, learning_rate_schedule = None,
+                 schedule_per = 'episode'): # these r standard values
         
+        # seeded random.Random from the simulation, falls back to the global random module
+        self.rng = rng if rng is not None else random
 
-        self.q_table = {} # This is like the memory -> will store what dek learns
         self.learning_rate = learning_rate
         self.discount = discount
         self.epsilon = epsilon
@@ -43,6 +57,39 @@ class Qlearning:
             'avoid_danger'     
         ]
 
+        # 'dense' keeps the table in one numpy array (ai.qtable), same results as the dict just faster
+        if backend not in ('dict', 'dense'):
+            raise ValueError(f"Invalid backend: {backend}. Must be 'dict' or 'dense'")
+        self.backend = backend
+
+        # optional ai.replay_buffer.ReplayBuffer that every transition passed to update() is recorded in,
+        # learn_online=False then leaves the learning to an OfflineTrainer
+        self.buffer = buffer
+        self.learn_online = learn_online
+        if backend == 'dense':
+            self.q_table = DenseQTable(self.actions)
+        else:
+            self.q_table = {} # This is like the memory -> will store what dek learns
+
+        # optional ai.schedules schedules, without one epsilon and learning_rate stay fixed.
+        # schedule_per is 'episode' (end_episode() ticks time on) or 'step' (every update does)
+        if schedule_per not in ('episode', 'step'):
+            raise ValueError(f"Invalid schedule_per: {schedule_per}. Must be 'episode' or 'step'")
+        self.epsilon_schedule = epsilon_schedule
+        self.learning_rate_schedule = learning_rate_schedule
+        self.schedule_per = schedule_per
+        self.episodes = 0
+        self.steps = 0
+        self.state_visits = {}  # state -> times an action was chosen there, for visit count schedules
+        self.telemetry = ConvergenceTracker(N_STATES)
+        self._apply_schedules()
+
+        # predator -> (inputs, state) so repeat get_state calls in a turn are a tuple compare
+        self._state_cache = {}
+
+        # transitions queued by queue_update, applied together by apply_updates (shared policy clans)
+        self.pending = []
+
 
 
     
@@ -51,7 +98,12 @@ class Qlearning:
         
         #this will convert the game situation into  a simple state
         
-    
+        # everything the state depends on, the spatial version changes whenever any agent moves or dies
+        inputs = (simulation.turn, predator.x, predator.y, predator.health, predator.stamina, predator.honor,
+                  simulation.grid.spatial.version)
+        cached = self._state_cache.get(predator)
+        if cached is not None and cached[0] == inputs:
+            return cached[1]
 
         health_state = 'high' if predator.health > 65 else (
             'medium' if predator.health > 30 else 'low'
@@ -65,15 +117,8 @@ class Qlearning:
         )
 
 
-        # coutn nearby monsters for threat level
-
-        nearby_monster = 0
-
-        for monster in simulation.monsters:
-            if monster.alive:
-                distance = abs(monster.x - predator.x) - abs(monster.y - predator.y)
-                if distance < 5:
-                    nearby_monster += 1
+        # coutn nearby monsters for threat level (within 4 cells, straight from the spatial index)
+        nearby_monster = simulation.grid.spatial.count_within(predator.x, predator.y, 4, kind=Monster)
 
         threat_level = 'high' if nearby_monster >= 3 else (
             'medium' if nearby_monster == 2 else 'low'
@@ -81,11 +126,41 @@ class Qlearning:
 
 
 
-        return (health_state, stamina_state,honor_state, threat_level)
+        state = (health_state, stamina_state,honor_state, threat_level)
+        self._state_cache[predator] = (inputs, state)
+        return state
     
 
 
 
+    def _schedule_time(self):
+        return self.episodes if self.schedule_per == 'episode' else self.steps
+
+    def _apply_schedules(self):
+        # keep the plain attributes showing the time based value so reports stay meaningful
+        if self.epsilon_schedule is not None:
+            self.epsilon = self.epsilon_schedule.value(self._schedule_time())
+        if self.learning_rate_schedule is not None:
+            self.learning_rate = self.learning_rate_schedule.value(self._schedule_time())
+
+    def current_epsilon(self, state=None):
+        if self.epsilon_schedule is None:
+            return self.epsilon
+        return self.epsilon_schedule.value(self._schedule_time(), self.state_visits.get(state, 0))
+
+    def current_learning_rate(self, state=None):
+        if self.learning_rate_schedule is None:
+            return self.learning_rate
+        return self.learning_rate_schedule.value(self._schedule_time(), self.state_visits.get(state, 0))
+
+    def end_episode(self):
+        """Called by the simulation when a run ends, moves episode schedules on and records telemetry."""
+        record = self.telemetry.end_episode(self.q_table, self.epsilon, self.learning_rate)
+        self._state_cache.clear()  # dont hold on to last episode's predators
+        self.episodes += 1
+        self._apply_schedules()
+        return record
+
     def choose_action(self, state):
 
         """
@@ -96,14 +171,24 @@ class Qlearning:
 
         """
 
+        epsilon = self.current_epsilon(state)
+        self.state_visits[state] = self.state_visits.get(state, 0) + 1
+
+        if self.backend == 'dense':
+            index = STATE_INDEX[state]
+            self.q_table.touch(index)
+            if self.rng.random() < epsilon:
+                return self.rng.choice(self.actions)
+            return self.actions[self.q_table.best_action(index)]
+
         # checks ifstate is in memory
         if state not in self.q_table:
             self.q_table[state] = {action: 0.0 for action in self.actions}
 
 
         # Exploration tries soemthing random 20 perecetn of the time
-        if random.random() < self.epsilon:
-            action = random.choice(self.actions)
+        if self.rng.random() < epsilon:
+            action = self.rng.choice(self.actions)
             return action
         
 
@@ -111,11 +196,49 @@ class Qlearning:
         best_action = max(self.q_table[state], key=self.q_table[state].get)
 
         return best_action
+
+    def choose_actions(self, states):
+        """
+        choose_action for a whole list of states at once, for many predators sharing this policy.
+        On the dense backend the greedy picks are one argmax over the stacked rows.
+        """
+        if self.backend != 'dense':
+            return [self.choose_action(state) for state in states]
+
+        indices = np.fromiter((STATE_INDEX[state] for state in states), dtype=np.int64, count=len(states))
+        self.q_table._touch_many(indices)
+        greedy = self.q_table.best_actions(indices).tolist()
+
+        actions = []
+        for state, best in zip(states, greedy):
+            epsilon = self.current_epsilon(state)
+            self.state_visits[state] = self.state_visits.get(state, 0) + 1
+            if self.rng.random() < epsilon:
+                actions.append(self.rng.choice(self.actions))
+            else:
+                actions.append(self.actions[best])
+        return actions
     
 
 
     def update(self, state, action, reward, next_state):
         
+        if self.buffer is not None:
+            self.buffer.add(state, action, reward, next_state)
+        if not self.learn_online:
+            return
+
+        learning_rate = self.current_learning_rate(state)
+        self.steps += 1
+        if self.schedule_per == 'step':
+            self._apply_schedules()
+
+        if self.backend == 'dense':
+            delta = self.q_table.td_update(STATE_INDEX[state], self.q_table.action_index[action], reward,
+                                           STATE_INDEX[next_state], learning_rate, self.discount)
+            self.telemetry.record_update(delta)
+            return
+
 
         if state not in self.q_table:
             self.q_table[state] = {action: 0.0 for action in self.actions}
@@ -132,9 +255,53 @@ class Qlearning:
         # reward is the immediate payoff dek got
         # max_next_q = best possible future play off
 
-        new_q = current_q + self.learning_rate * (reward + self.discount * max_next_q - current_q)
+        new_q = current_q + learning_rate * (reward + self.discount * max_next_q - current_q)
 
         self.q_table[state][action] = new_q
+        self.telemetry.record_update(new_q - current_q)
+
+
+
+    def update_batch(self, states, actions, rewards, next_states):
+        """Apply a whole list of transitions, in one array operation on the dense backend."""
+        if self.backend != 'dense':
+            for transition in zip(states, actions, rewards, next_states):
+                self.update(*transition)
+            return
+
+        # the rate each transition would have got from update(), step schedules moving on one per transition
+        if self.learning_rate_schedule is None:
+            learning_rate = self.learning_rate
+        else:
+            learning_rate = [self.learning_rate_schedule.value(self.steps + i if self.schedule_per == 'step'
+                                                              else self.episodes,
+                                                              self.state_visits.get(state, 0))
+                             for i, state in enumerate(states)]
+        self.steps += len(states)
+        if self.schedule_per == 'step':
+            self._apply_schedules()
+
+        td_error = self.q_table.batch_update([STATE_INDEX[s] for s in states],
+                                             [self.q_table.action_index[a] for a in actions],
+                                             rewards,
+                                             [STATE_INDEX[s] for s in next_states],
+                                             learning_rate, self.discount)
+        self.telemetry.record_updates(np.asarray(learning_rate) * td_error)
+
+    def queue_update(self, state, action, reward, next_state):
+        """Like update, but held back until apply_updates so a turn's worth of transitions go in together."""
+        if self.buffer is not None:
+            self.buffer.add(state, action, reward, next_state)
+        if not self.learn_online:
+            return
+        self.pending.append((state, action, reward, next_state))
+
+    def apply_updates(self):
+        if not self.pending:
+            return
+        states, actions, rewards, next_states = zip(*self.pending)
+        self.pending = []
+        self.update_batch(states, actions, rewards, next_states)
 
 
 
@@ -171,19 +338,40 @@ class Qlearning:
 
 
 
-    def save(self, filename='q_table.pkl'):
-        with open(filename, 'wb') as f:
-            pickle.dump(self.q_table, f)
-        print(f"Saved Q table with {len(self.q_table)} states")
+    def save(self, filename='q_table.qtb', append=False, step=0):
+        """
+        Write the table in the ai.qtable_io binary format. append=True adds a checkpoint
+        to the end of the file instead of replacing it, step labels the checkpoint.
+        """
+        states = list(self.q_table.keys())
+        keys = [STATE_INDEX[state] for state in states]
+        if self.backend == 'dense':
+            values = self.q_table.q[keys] if keys else np.zeros((0, len(self.actions)))
+        else:
+            values = np.array([[self.q_table[state].get(action, 0.0) for action in self.actions] for state in states],
+                              dtype=np.float64).reshape(len(states), len(self.actions))
+        write_checkpoint(filename, keys, values, self.actions, step=step, append=append)
+        print(f"Saved Q table with {len(states)} states")
     
-    def load(self, filename='q_table.pkl'):
+    def load(self, filename='q_table.qtb', checkpoint=-1, mmap=False):
+        """
+        Load a checkpoint (the latest by default). mmap=True reads the values through a
+        memory map, for sharing one read only policy see ai.qtable_io.QTableFile.
+        """
         try:
-            with open(filename, 'rb') as f:
-                self.q_table = pickle.load(f)
-            print(f"Loaded Q table with {len(self.q_table)} states")
-            return True
+            table = QTableFile(filename, checkpoint=checkpoint, mmap=mmap)
         except FileNotFoundError:
             print("No saved Q table found , starting fresh")
             return False
-        
 
+        # match actions up by name in case the file lists them in a different order
+        columns = [table.actions.index(action) if action in table.actions else None for action in self.actions]
+        if self.backend == 'dense':
+            self.q_table = DenseQTable(self.actions)
+        else:
+            self.q_table = {}
+        for state, row in zip(table.states(), table.values):
+            self.q_table[state] = {action: (float(row[col]) if col is not None else 0.0)
+                                   for action, col in zip(self.actions, columns)}
+        print(f"Loaded Q table with {len(self.q_table)} states")
+        return True
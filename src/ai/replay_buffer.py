@@ -0,0 +1,137 @@
+"""
+Experience replay for Dek's Q-learning.
+ReplayBuffer is a fixed size ring buffer of (state, action, reward, next_state, done)
+transitions held in flat numpy arrays, and OfflineTrainer replays random minibatches
+from it into a Qlearning table. Together they let a training campaign run lots of
+cheap headless episodes to gather experience and do the learning separately.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from ai.qtable import STATE_INDEX
+from ai.training import run_headless_episode
+
+
+class ReplayBuffer:
+    """
+    Ring buffer of transitions stored as state / action indices (see ai.qtable), so
+    recording one is a handful of array writes. Once full the oldest transitions are
+    overwritten.
+    """
+
+    def __init__(self, capacity: int = 100_000, actions=None):
+        # actions in Qlearning order, the buffer stores their index
+        from ai.reinforcement import Qlearning
+        self.actions = list(actions) if actions is not None else Qlearning().actions
+        self.action_index = {action: i for i, action in enumerate(self.actions)}
+
+        self.capacity = capacity
+        self.states = np.zeros(capacity, dtype=np.int16)
+        self.actions_taken = np.zeros(capacity, dtype=np.int8)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros(capacity, dtype=np.int16)
+        self.done = np.zeros(capacity, dtype=bool)
+
+        self.position = 0  # next slot to write
+        self.size = 0
+        self.total_added = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, state, action, reward: float, next_state, done: bool = False):
+        """Record one transition, state tuples and action names like Qlearning.update takes."""
+        self.add_indices(STATE_INDEX[state], self.action_index[action], reward, STATE_INDEX[next_state], done)
+
+    def add_indices(self, state: int, action: int, reward: float, next_state: int, done: bool = False):
+        i = self.position
+        self.states[i] = state
+        self.actions_taken[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.done[i] = done
+
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.total_added += 1
+
+    def sample(self, batch_size: int, rng: Optional[np.random.Generator] = None):
+        """Random minibatch (with replacement) as (states, actions, rewards, next_states, done) arrays."""
+        if self.size == 0:
+            raise ValueError("Can't sample from an empty replay buffer")
+        rng = rng if rng is not None else np.random.default_rng()
+        picks = rng.integers(0, self.size, size=batch_size)
+        return (self.states[picks], self.actions_taken[picks], self.rewards[picks],
+                self.next_states[picks], self.done[picks])
+
+    def clear(self):
+        self.position = 0
+        self.size = 0
+
+
+class OfflineTrainer:
+    """
+    Trains a Qlearning table from a ReplayBuffer instead of during play.
+    Works best with Qlearning(backend='dense') as each minibatch is then a few array updates
+    (see DenseQTable.batch_update).
+    """
+
+    def __init__(self, q_learning, buffer: ReplayBuffer, batch_size: int = 64, seed: Optional[int] = None):
+        self.q_learning = q_learning
+        self.buffer = buffer
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+        self.updates = 0
+
+    def train_step(self) -> float:
+        """One minibatch, returns its mean absolute TD error."""
+        states, actions, rewards, next_states, done = self.buffer.sample(self.batch_size, self.rng)
+        q = self.q_learning
+
+        if q.backend == 'dense':
+            td_error = q.q_table.batch_update(states, actions, rewards, next_states,
+                                              q.learning_rate, q.discount, done)
+        else:
+            from ai.qtable import decode_state
+            td_error = []
+            for s, a, r, n, d in zip(states.tolist(), actions.tolist(), rewards.tolist(),
+                                     next_states.tolist(), done.tolist()):
+                state, next_state, action = decode_state(s), decode_state(n), q.actions[a]
+                for key in (state, next_state):
+                    if key not in q.q_table:
+                        q.q_table[key] = {name: 0.0 for name in q.actions}
+                current = q.q_table[state][action]
+                future = 0.0 if d else max(q.q_table[next_state].values())
+                error = r + q.discount * future - current
+                q.q_table[state][action] = current + q.learning_rate * error
+                td_error.append(error)
+
+        self.updates += 1
+        return float(np.mean(np.abs(td_error)))
+
+    def train(self, steps: int, tolerance: Optional[float] = None) -> float:
+        """
+        Replay `steps` minibatches, stopping early once the mean absolute TD error of a
+        minibatch drops below tolerance. Returns the last minibatch's error.
+        """
+        error = 0.0
+        for _ in range(steps):
+            error = self.train_step()
+            if tolerance is not None and error < tolerance:
+                break
+        return error
+
+
+def collect_experience(buffer: ReplayBuffer, episodes: int, seed: int = 0, max_turns: int = 100,
+                       **sim_params) -> ReplayBuffer:
+    """
+    Run headless episodes that only record Dek's transitions into buffer, with no
+    learning during play. Episode n uses seed + n.
+    """
+    for episode in range(episodes):
+        run_headless_episode(max_turns=max_turns, seed=seed + episode, experience=buffer, learn_online=False,
+                             **sim_params)
+
+    return buffer
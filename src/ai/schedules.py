@@ -0,0 +1,169 @@
+"""
+Schedules for Qlearning's epsilon and learning rate, plus convergence telemetry.
+A schedule maps time (episodes or update steps, see Qlearning.schedule_per) and how
+often the current state has been visited to a value. ConvergenceTracker keeps per
+episode stats so training can stop once the table settles down.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ai.training import run_headless_episode
+
+
+class Schedule:
+    """Base schedule, value() is called with the time and the current state's visit count."""
+
+    def value(self, t: int, visits: int = 0) -> float:
+        raise NotImplementedError
+
+    def to_config(self) -> Dict:
+        """Class name plus constructor arguments, for snapshots (see schedule_from_config)."""
+        return dict(vars(self), kind=type(self).__name__)
+
+
+class ConstantSchedule(Schedule):
+
+    def __init__(self, constant: float):
+        self.constant = constant
+
+    def value(self, t: int, visits: int = 0) -> float:
+        return self.constant
+
+
+class LinearSchedule(Schedule):
+    """Straight line from start to end over `steps`, then stays at end."""
+
+    def __init__(self, start: float, end: float, steps: int):
+        self.start = start
+        self.end = end
+        self.steps = steps
+
+    def value(self, t: int, visits: int = 0) -> float:
+        fraction = min(t / self.steps, 1.0) if self.steps > 0 else 1.0
+        return self.start + (self.end - self.start) * fraction
+
+
+class ExponentialSchedule(Schedule):
+    """start * decay ** t, never going below end."""
+
+    def __init__(self, start: float, decay: float, end: float = 0.0):
+        self.start = start
+        self.decay = decay
+        self.end = end
+
+    def value(self, t: int, visits: int = 0) -> float:
+        return max(self.end, self.start * self.decay ** t)
+
+
+class VisitCountSchedule(Schedule):
+    """
+    scale / (1 + visits) ** power, never going below minimum. Explores (or learns)
+    a lot in states Dek has rarely been in and settles down in familiar ones.
+    """
+
+    def __init__(self, scale: float = 1.0, power: float = 0.5, minimum: float = 0.0):
+        self.scale = scale
+        self.power = power
+        self.minimum = minimum
+
+    def value(self, t: int, visits: int = 0) -> float:
+        return max(self.minimum, self.scale / (1 + visits) ** self.power)
+
+
+SCHEDULES = {cls.__name__: cls for cls in (ConstantSchedule, LinearSchedule, ExponentialSchedule,
+                                             VisitCountSchedule)}
+
+
+def schedule_from_config(config: Optional[Dict]) -> Optional[Schedule]:
+    if config is None:
+        return None
+    config = dict(config)
+    kind = config.pop('kind')
+    if kind not in SCHEDULES:
+        raise ValueError(f"Invalid schedule: {kind}. Must be one of {sorted(SCHEDULES)}")
+    return SCHEDULES[kind](**config)
+
+
+class ConvergenceTracker:
+    """
+    Per episode telemetry for a Qlearning: the largest |dQ| of any single update,
+    how many states have been seen, and how many states changed their greedy action.
+    """
+
+    def __init__(self, n_states: int):
+        self.n_states = n_states
+        self.history: List[Dict] = []
+        self.max_delta = 0.0  # biggest change this episode so far
+        self.updates = 0
+        self._policy: Dict = {}  # greedy action per state at the end of the last episode
+
+    def record_update(self, delta: float):
+        self.updates += 1
+        delta = abs(float(delta))
+        if delta > self.max_delta:
+            self.max_delta = delta
+
+    def record_updates(self, deltas: np.ndarray):
+        """record_update for a whole batch of changes."""
+        if len(deltas):
+            self.updates += len(deltas)
+            self.max_delta = max(self.max_delta, float(np.abs(deltas).max()))
+
+    def end_episode(self, q_table, epsilon: float, learning_rate: float) -> Dict:
+        # greedy action per state, first max wins like choose_action
+        policy = {state: max(values, key=values.get) for state, values in q_table.items()}
+        changes = sum(1 for state, action in policy.items() if self._policy.get(state) != action)
+
+        record = {
+            'episode': len(self.history) + 1,
+            'max_delta': self.max_delta,
+            'updates': self.updates,
+            'states_seen': len(policy),
+            'coverage': len(policy) / self.n_states,
+            'policy_changes': changes,
+            'epsilon': epsilon,
+            'learning_rate': learning_rate,
+        }
+        self.history.append(record)
+
+        self._policy = policy
+        self.max_delta = 0.0
+        self.updates = 0
+        return record
+
+    def getstate(self) -> Dict:
+        return {
+            'history': [dict(record) for record in self.history],
+            'max_delta': self.max_delta,
+            'updates': self.updates,
+            'policy': [[list(state), action] for state, action in self._policy.items()],
+        }
+
+    def setstate(self, state: Dict):
+        self.history = [dict(record) for record in state['history']]
+        self.max_delta = state['max_delta']
+        self.updates = state['updates']
+        self._policy = {tuple(s): action for s, action in state['policy']}
+
+    def converged(self, tolerance: float = 1e-3, patience: int = 5) -> bool:
+        """True once the last `patience` episodes all had max |dQ| below tolerance and no policy changes."""
+        if len(self.history) < patience:
+            return False
+        return all(record['max_delta'] < tolerance and record['policy_changes'] == 0
+                   for record in self.history[-patience:])
+
+
+def train_until_converged(q_learning, max_episodes: int = 1000, tolerance: float = 1e-3, patience: int = 5,
+                          seed: int = 0, max_turns: int = 100, **sim_params) -> List[Dict]:
+    """
+    Run headless episodes with q_learning until its telemetry says it has converged
+    (or max_episodes is reached). Episode n uses seed + n. Returns the telemetry history.
+    """
+    for episode in range(max_episodes):
+        run_headless_episode(q_learning, max_turns, seed + episode, **sim_params)
+        if q_learning.telemetry.converged(tolerance, patience):
+            break
+
+    return q_learning.telemetry.history
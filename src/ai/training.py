@@ -0,0 +1,21 @@
+"""
+Shared pieces of the headless trainers (replay buffer collection, parallel training,
+train_until_converged).
+"""
+
+from core.events import NullSink
+
+
+def run_headless_episode(q_learning=None, max_turns: int = 100, seed: int = 0, **sim_params):
+    """
+    Run one quiet episode and return the finished Simulation.
+    It stops at max_turns or when the run ends on its own (Dek dead, the boss dead, nothing left
+    to fight), and Simulation.run calls q_learning.end_episode() either way.
+    Without q_learning the simulation makes its own.
+    """
+    # imported here, core.simulation imports the ai package
+    from core.simulation import Simulation
+
+    sim = Simulation(seed=seed, events=NullSink(), q_learning=q_learning, **sim_params)
+    sim.run(display_every=0, max_turns=max_turns)
+    return sim
@@ -0,0 +1,160 @@
+"""
+A* benchmark: the flat index search (MovementSystem.a_star_search / GridSearch) against
+the PathNode version it replaced, which is kept here as the baseline.
+Both run the same random start / goal pairs on an open grid, a grid scattered with
+agents (avoid_agents=True) and a procedural terrain grid, and we report cells expanded,
+wall time and the cost of the paths found.
+
+    python benchmarks/astar_benchmark.py --size 200 --searches 200
+"""
+
+import argparse
+import heapq
+import os
+import random
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from core.grid import Grid
+from entities.agent import Agent
+from generation.procedural import generate_terrain
+from systems.movement import MovementSystem, grid_search
+
+
+class PathNode:
+
+    def __init__(self, position, g_cost, h_cost, parent=None):
+        self.position = position
+        self.g_cost = g_cost
+        self.f_cost = g_cost + h_cost
+        self.parent = parent
+
+    def __lt__(self, other):
+        return self.f_cost < other.f_cost
+
+
+def baseline_a_star(start, goal, grid, avoid_agents=False):
+    """The old search: a PathNode per push, tuple sets and dicts, plain (non wrapping) manhattan heuristic.
+    Returns (path, expansions)."""
+    if start == goal:
+        return [start], 0
+
+    open_set = [PathNode(start, 0, MovementSystem.manattan_distance(start, goal))]
+    closed_set = set()
+    g_costs = {start: 0}
+    terrain_costs = grid.terrain.cost_rows if grid.terrain is not None else None
+    expansions = 0
+
+    while open_set:
+        current = heapq.heappop(open_set)
+        if current.position == goal:
+            path = []
+            node = current
+            while node:
+                path.append(node.position)
+                node = node.parent
+            return list(reversed(path)), expansions
+
+        if current.position in closed_set:
+            continue
+        closed_set.add(current.position)
+        expansions += 1
+
+        x, y = current.position
+        for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0), (1, 1), (1, -1), (-1, -1), (-1, 1)]:
+            neighbor_pos = ((x + dx) % grid.width, (y + dy) % grid.height)
+            if neighbor_pos in closed_set:
+                continue
+            if avoid_agents and neighbor_pos != goal and grid.get_cell(*neighbor_pos) is not None:
+                continue
+            move_cost = 1.4 if abs(neighbor_pos[0] - x) + abs(neighbor_pos[1] - y) == 2 else 1.0
+            if terrain_costs is not None:
+                terrain_cost = terrain_costs[neighbor_pos[1]][neighbor_pos[0]]
+                if terrain_cost == float('inf'):
+                    continue
+                move_cost *= terrain_cost
+            tentative_g = current.g_cost + move_cost
+            if neighbor_pos not in g_costs or tentative_g < g_costs[neighbor_pos]:
+                g_costs[neighbor_pos] = tentative_g
+                heapq.heappush(open_set, PathNode(neighbor_pos, tentative_g,
+                                                  MovementSystem.manattan_distance(neighbor_pos, goal), current))
+
+    return None, expansions
+
+
+def path_cost(path, grid):
+    """What walking a path actually costs, diagonals across the wrap included."""
+    total = 0.0
+    for (x0, y0), (x1, y1) in zip(path, path[1:]):
+        step = 1.4 if x0 != x1 and y0 != y1 else 1.0
+        if grid.terrain is not None:
+            step *= grid.terrain.cost_at(x1, y1)
+        total += step
+    return total
+
+
+def make_grid(kind, size, seed):
+    grid = Grid(size, size)
+    rng = random.Random(seed)
+    if kind == 'agents':
+        for _ in range(size * size // 5):
+            grid.place_agent(Agent(0, 0, '#', name="Rock"), rng.randrange(size), rng.randrange(size))
+    elif kind == 'terrain':
+        grid.terrain = generate_terrain(size, size, seed=seed)
+    return grid
+
+
+def free_cells(grid, count, rng):
+    cells = grid.empty_cells()
+    return [(rng.choice(cells), rng.choice(cells)) for _ in range(count)]
+
+
+def run(kind, size, searches, seed):
+    grid = make_grid(kind, size, seed)
+    pairs = free_cells(grid, searches, random.Random(seed + 1))
+    avoid_agents = kind == 'agents'
+    search = grid_search(size, size)
+
+    results = {}
+    for name in ('baseline', 'flat'):
+        expansions = 0
+        cost = 0.0
+        found = 0
+        started = time.perf_counter()
+        for start, goal in pairs:
+            if name == 'baseline':
+                path, expanded = baseline_a_star(start, goal, grid, avoid_agents)
+            else:
+                path = MovementSystem.a_star_search(start, goal, grid, avoid_agents)
+                expanded = search.expansions if start != goal else 0
+            expansions += expanded
+            if path is not None:
+                found += 1
+                cost += path_cost(path, grid)
+        results[name] = (time.perf_counter() - started, expansions, found, cost)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=200, help='grid width and height')
+    parser.add_argument('--searches', type=int, default=200, help='start / goal pairs per scenario')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"A* on a {args.size}x{args.size} grid, {args.searches} searches per scenario\n")
+    print(f"{'scenario':<10}{'search':<10}{'time (s)':>10}{'expanded':>12}{'found':>8}{'path cost':>12}")
+    for kind in ('open', 'agents', 'terrain'):
+        results = run(kind, args.size, args.searches, args.seed)
+        for name, (elapsed, expansions, found, cost) in results.items():
+            print(f"{kind:<10}{name:<10}{elapsed:>10.3f}{expansions:>12}{found:>8}{cost:>12.1f}")
+        base, flat = results['baseline'], results['flat']
+        print(f"{'':<10}{'speedup':<10}{base[0] / max(flat[0], 1e-9):>9.1f}x"
+              f"{base[1] / max(flat[1], 1):>11.1f}x\n")
+
+
+if __name__ == "__main__":
+    main()
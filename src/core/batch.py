@@ -0,0 +1,672 @@
+"""
+Headless batch engine for Monte Carlo studies.
+Holds many independent worlds as numpy arrays (one row per world) instead of
+Simulation object graphs, and steps them all together through the core loop:
+movement towards targets, adjacent combat, traps, resources, hazards and weather.
+Rules follow Simulation closely but not call for call, so results agree in
+distribution rather than run for run. There is no Q-learning in the batch engine,
+Dek picks his actions the way an untrained Qlearning does.
+"""
+
+from typing import List, Optional
+
+import numpy as np
+
+# slot kinds
+PREDATOR = 0
+BOSS = 1
+MONSTER = 2
+SYNTHETIC = 3
+
+# weather codes, same order as core.replay.WEATHER_TYPES
+CLEAR = 0
+HOT = 1
+COLD = 2
+RAINY = 3
+THUNDER_STORM = 4
+
+# hazard codes, index into HAZARD_DAMAGE
+SILICON_RAIN = 0
+OZONE_RADIATION = 1
+SULPHUR_DIOXIDE = 2
+BREAK_DOMAIN = 3
+HAZARD_DAMAGE = np.array([15, 50, 10, 999], dtype=np.float64)
+MAX_HAZARDS = 8
+MAX_HAZARD_TILES = 5
+
+# resource codes
+SWORD = 0
+REPAIR_KIT = 1
+MED_KIT = 2
+STAMINA_BOOST = 3
+
+# Dek's actions, same order as Qlearning.actions
+HUNT_MONSTER = 0
+HUNT_BOSS = 1
+COLLECT_RESOURCE = 2
+REST = 3
+SEEK_THIA = 4
+AVOID_DANGER = 5
+DEK_ACTIONS = ('hunt_monster', 'hunt_boss', 'collect_resource', 'rest', 'seek_thia', 'avoid_danger')
+
+MAX_TRAPS = 5
+MAX_RESOURCES = 8
+
+# neighbour order used by Simulation._check_combat and _check_resources (dx outer, dy inner)
+COMBAT_OFFSETS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+RESOURCE_OFFSETS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
+class BatchSimulation:
+    """
+    num_worlds independent worlds stepped in lockstep. Agent arrays are (worlds, slots)
+    with the slots laid out as predators (Dek first, then Brother and Father),
+    the boss, the other monsters and Thia.
+    The grid occupancy array holds 0 for empty, slot + 1 for an agent and -(index + 1) for a resource.
+    """
+
+    def __init__(self, num_worlds: int, width: int = 20, height: int = 20, num_predators: int = 3,
+                 num_monsters: int = 5, num_synthetics: int = 2, seed: Optional[int] = None):
+        # num_synthetics is accepted so the same params work for Simulation, only Thia spawns in either
+        self.num_worlds = num_worlds
+        self.width = width
+        self.height = height
+        self.seed = seed if seed is not None else int(np.random.SeedSequence().entropy % 2**31)
+        self.rng = np.random.default_rng(self.seed)
+
+        self.num_predators = max(3, num_predators)
+        self.num_monsters = num_monsters
+        kinds = [PREDATOR] * self.num_predators
+        if num_monsters > 0:
+            kinds += [BOSS] + [MONSTER] * (num_monsters - 1)
+        kinds.append(SYNTHETIC)
+        self.kind = np.array(kinds, dtype=np.int8)
+        self.num_slots = len(kinds)
+        self.is_predator = self.kind == PREDATOR
+        self.is_monster = (self.kind == BOSS) | (self.kind == MONSTER)
+
+        self.turn = 0
+        self.max_turns = 100
+        self.finished = np.zeros(num_worlds, dtype=bool)
+        self.turns = np.zeros(num_worlds, dtype=np.int32)
+
+        self.stats = {
+            'combats': np.zeros(num_worlds, dtype=np.int32),
+            'kills': np.zeros(num_worlds, dtype=np.int32),
+            'deaths': np.zeros(num_worlds, dtype=np.int32),
+            'resources_collected': np.zeros(num_worlds, dtype=np.int32),
+        }
+        # Dek's honour, health, stamina and kills at the start of every turn, (turn, world)
+        self.timelines = {'honour': [], 'health': [], 'stamina': [], 'kills': []}
+
+        self._spawn()
+
+    def _spawn(self):
+        n, slots = self.num_worlds, self.num_slots
+        rng = self.rng
+
+        self.traps_per_world = rng.integers(3, MAX_TRAPS + 1, size=n)
+        self.resources_per_world = rng.integers(4, MAX_RESOURCES + 1, size=n)
+
+        # distinct random cells for every agent, trap and resource in each world
+        cells = self.width * self.height
+        needed = slots + MAX_TRAPS + MAX_RESOURCES
+        if needed > cells:
+            raise ValueError(f"Grid {self.width}x{self.height} is too small for {needed} entities")
+        picks = np.argsort(rng.random((n, cells)), axis=1)[:, :needed]
+        px, py = picks % self.width, picks // self.width
+
+        self.x = px[:, :slots].astype(np.int32)
+        self.y = py[:, :slots].astype(np.int32)
+        self.health = np.full((n, slots), 100, dtype=np.int32)
+        self.health[:, self.kind == BOSS] = 3500
+        self.max_health = self.health.copy()
+        self.alive = np.ones((n, slots), dtype=bool)
+        self.stamina = np.full((n, slots), 100, dtype=np.int32)
+
+        # predator only state, indexed by predator slot
+        p = self.num_predators
+        self.honour = np.full((n, p), 50, dtype=np.int32)
+        self.kills = np.zeros((n, p), dtype=np.int32)
+        self.weapon_buff = np.zeros((n, p), dtype=np.int32)
+        self.load = np.zeros((n, p), dtype=np.int32)
+        self.held_med_kits = np.zeros((n, p), dtype=np.int32)
+        self.held_stamina_boosts = np.zeros((n, p), dtype=np.int32)
+
+        # traps are hidden, they never go in the occupancy grid
+        self.trap_x = px[:, slots:slots + MAX_TRAPS].astype(np.int32)
+        self.trap_y = py[:, slots:slots + MAX_TRAPS].astype(np.int32)
+        self.trap_armed = np.arange(MAX_TRAPS)[None, :] < self.traps_per_world[:, None]
+
+        self.res_x = px[:, slots + MAX_TRAPS:].astype(np.int32)
+        self.res_y = py[:, slots + MAX_TRAPS:].astype(np.int32)
+        self.res_type = rng.integers(0, 4, size=(n, MAX_RESOURCES)).astype(np.int8)
+        self.res_present = np.arange(MAX_RESOURCES)[None, :] < self.resources_per_world[:, None]
+
+        self.occ = np.zeros((n, self.height, self.width), dtype=np.int32)
+        worlds = np.arange(n)[:, None]
+        self.occ[worlds, self.y, self.x] = np.arange(slots)[None, :] + 1
+        rw, rr = np.nonzero(self.res_present)
+        self.occ[rw, self.res_y[rw, rr], self.res_x[rw, rr]] = -(rr + 1)
+
+        # hazards live in fixed slots, hazard_born keeps the spawn order so the oldest one wins on overlap
+        self.hazard_live = np.zeros((n, MAX_HAZARDS), dtype=bool)
+        self.hazard_type = np.zeros((n, MAX_HAZARDS), dtype=np.int8)
+        self.hazard_born = np.zeros((n, MAX_HAZARDS), dtype=np.int32)
+        self.hazard_age = np.zeros((n, MAX_HAZARDS), dtype=np.int32)
+        self.hazard_active = np.zeros((n, MAX_HAZARDS), dtype=bool)
+        self.hazard_intensity = np.zeros((n, MAX_HAZARDS))
+        self.hazard_growth = np.zeros((n, MAX_HAZARDS))
+        self.hazard_max = np.zeros((n, MAX_HAZARDS))
+        # tiles are not wrapped, same as DynamicHazards._spread, so off grid tiles never hit anyone
+        self.hazard_tiles = np.zeros((n, MAX_HAZARDS, MAX_HAZARD_TILES, 2), dtype=np.int32)
+        self.hazard_tile_count = np.zeros((n, MAX_HAZARDS), dtype=np.int32)
+
+        self.weather = np.full(n, CLEAR, dtype=np.int8)
+
+    # small helpers, all take matching arrays of world indices `w` and slots `s`
+
+    def _wrap_delta(self, d, size):
+        d = d % size
+        return np.where(d > size // 2, d - size, d)
+
+    def _distance(self, x1, y1, x2, y2):
+        dx = np.abs(x1 - x2)
+        dy = np.abs(y1 - y2)
+        return np.minimum(dx, self.width - dx) + np.minimum(dy, self.height - dy)
+
+    def _use_stamina(self, w, s, amount):
+        enough = self.stamina[w, s] >= amount
+        self.stamina[w[enough], s[enough]] -= amount
+
+    def _rest(self, w, s, amount):
+        self.stamina[w, s] = np.minimum(self.stamina[w, s] + amount, 100)
+
+    def _change_honour(self, w, p, amount):
+        self.honour[w, p] = np.clip(self.honour[w, p] + amount, 0, 100)
+
+    def _damage(self, w, s, amount):
+        """Take damage, anything that dies comes off the grid. Returns the mask of deaths."""
+        self.health[w, s] -= amount
+        died = (self.health[w, s] <= 0) & self.alive[w, s]
+        self.health[w, s] = np.maximum(self.health[w, s], 0)
+        dw, ds = w[died], s[died]
+        self.alive[dw, ds] = False
+        self.occ[dw, self.y[dw, ds], self.x[dw, ds]] = 0
+        return died
+
+    def _try_move(self, w, s, nx, ny):
+        """Move each agent to (nx, ny) if the cell is free, returns the mask of agents that moved."""
+        nx, ny = nx % self.width, ny % self.height
+        moved = self.occ[w, ny, nx] == 0
+        mw, ms, mx, my = w[moved], s[moved], nx[moved], ny[moved]
+        self.occ[mw, self.y[mw, ms], self.x[mw, ms]] = 0
+        self.occ[mw, my, mx] = ms + 1
+        self.x[mw, ms] = mx
+        self.y[mw, ms] = my
+        return moved
+
+    def _octile(self, x, y, tx, ty):
+        # the cost A* pays on an empty grid, diagonals are 1.4 like MovementSystem's
+        dx = np.abs(self._wrap_delta(tx - x, self.width))
+        dy = np.abs(self._wrap_delta(ty - y, self.height))
+        return np.maximum(dx, dy) + 0.4 * np.minimum(dx, dy)
+
+    def _step_towards(self, w, s, tx, ty):
+        """
+        One step towards (tx, ty) in place of Simulation's A* step, returns the mask of agents that moved.
+        Next to the target the A* path is just [start, target], so only the target cell is tried
+        (it's usually occupied and they stay put). Further away it tries the diagonal, then each axis
+        on its own, then any other neighbour that still gets closer, the way A* steps round an agent
+        in the way.
+        """
+        dx = self._wrap_delta(tx - self.x[w, s], self.width)
+        dy = self._wrap_delta(ty - self.y[w, s], self.height)
+        moved = np.zeros(len(w), dtype=bool)
+        near = np.maximum(np.abs(dx), np.abs(dy)) <= 1
+        idx = np.nonzero(near)[0]
+        if len(idx):
+            moved[idx] = self._try_move(w[idx], s[idx], tx[idx], ty[idx])
+
+        sx, sy = np.sign(dx), np.sign(dy)
+        for cx, cy in ((sx, sy), (sx, 0 * sy), (0 * sx, sy)):
+            todo = ~near & ~moved & ((cx != 0) | (cy != 0))
+            idx = np.nonzero(todo)[0]
+            if len(idx):
+                moved[idx] = self._try_move(w[idx], s[idx], self.x[w[idx], s[idx]] + cx[idx],
+                                            self.y[w[idx], s[idx]] + cy[idx])
+
+        # still stuck, the other neighbours best first while they get closer at all
+        idx = np.nonzero(~near & ~moved)[0]
+        if len(idx) == 0:
+            return moved
+        bw, bs = w[idx], s[idx]
+        x, y = self.x[bw, bs], self.y[bw, bs]
+        offsets = np.array(COMBAT_OFFSETS)
+        here = self._octile(x, y, tx[idx], ty[idx])
+        after = self._octile(x[:, None] + offsets[:, 0], y[:, None] + offsets[:, 1],
+                             tx[idx][:, None], ty[idx][:, None])
+        order = np.argsort(after, axis=1, kind='stable')
+        rows = np.arange(len(idx))
+        for k in range(len(offsets)):
+            o = order[:, k]
+            # sorted, so once nobody's k-th choice is closer nobody's later one is either
+            todo = np.nonzero(~moved[idx] & (after[rows, o] < here))[0]
+            if len(todo) == 0:
+                break
+            moved[idx[todo]] = self._try_move(bw[todo], bs[todo], x[todo] + offsets[o[todo], 0],
+                                              y[todo] + offsets[o[todo], 1])
+        return moved
+
+    def _random_step(self, w, s):
+        dx = self.rng.integers(-1, 2, size=len(w))
+        dy = self.rng.integers(-1, 2, size=len(w))
+        return self._try_move(w, s, self.x[w, s] + dx, self.y[w, s] + dy)
+
+    def _nearest(self, w, s, candidates):
+        """Nearest living slot of the boolean slot mask `candidates` to each agent, -1 if none."""
+        cand = np.nonzero(candidates)[0]
+        if len(cand) == 0:
+            return np.full(len(w), -1)
+        dist = self._distance(self.x[w, s][:, None], self.y[w, s][:, None],
+                              self.x[w][:, cand], self.y[w][:, cand])
+        dist = np.where(self.alive[w][:, cand], dist, np.iinfo(np.int32).max)
+        best = np.argmin(dist, axis=1)
+        found = self.alive[w][np.arange(len(w)), cand[best]]
+        return np.where(found, cand[best], -1)
+
+    # the turn
+
+    def _move_dek(self, w):
+        """
+        Dek picks one of the Q-learning actions. Simulation's Qlearning starts at epsilon 1
+        and never decays it, so the choice is uniform here. Like _q_learning_actions
+        this always counts as having acted, so traps and resources get checked either way.
+        """
+        s = np.zeros(len(w), dtype=np.int64)
+        action = self.rng.integers(0, len(DEK_ACTIONS), size=len(w))
+        target_x = np.full(len(w), -1)
+        target_y = np.full(len(w), -1)
+        cost = np.zeros(len(w), dtype=np.int32)
+
+        for code, candidates in ((HUNT_MONSTER, self.kind == MONSTER), (HUNT_BOSS, self.kind == BOSS),
+                                 (SEEK_THIA, self.kind == SYNTHETIC)):
+            idx = np.nonzero(action == code)[0]
+            target = self._nearest(w[idx], s[idx], candidates)
+            found = idx[target >= 0]
+            target_x[found] = self.x[w[found], target[target >= 0]]
+            target_y[found] = self.y[w[found], target[target >= 0]]
+            cost[idx] = 5
+
+        idx = np.nonzero(action == COLLECT_RESOURCE)[0]
+        if len(idx):
+            rw = w[idx]
+            dist = self._distance(self.x[rw, 0][:, None], self.y[rw, 0][:, None], self.res_x[rw], self.res_y[rw])
+            dist = np.where(self.res_present[rw], dist, np.iinfo(np.int32).max)
+            best = np.argmin(dist, axis=1)
+            found = self.res_present[rw, best]
+            target_x[idx[found]] = self.res_x[rw[found], best[found]]
+            target_y[idx[found]] = self.res_y[rw[found], best[found]]
+            cost[idx] = 3
+
+        chase = np.nonzero(target_x >= 0)[0]
+        if len(chase):
+            moved = self._step_towards(w[chase], s[chase], target_x[chase], target_y[chase])
+            paid = chase[moved]
+            self._use_stamina(w[paid], s[paid], cost[paid])
+
+        idx = np.nonzero(action == REST)[0]
+        self._rest(w[idx], s[idx], 20)
+
+        idx = np.nonzero(action == AVOID_DANGER)[0]
+        if len(idx):
+            aw = w[idx]
+            monsters = np.nonzero(self.is_monster)[0]
+            best = np.full(len(aw), np.iinfo(np.int32).max)
+            best_dx = np.zeros(len(aw), dtype=np.int32)
+            best_dy = np.zeros(len(aw), dtype=np.int32)
+            for dx, dy in COMBAT_OFFSETS:
+                tx = (self.x[aw, 0] + dx) % self.width
+                ty = (self.y[aw, 0] + dy) % self.height
+                near = self._distance(tx[:, None], ty[:, None], self.x[aw][:, monsters], self.y[aw][:, monsters]) <= 2
+                count = (near & self.alive[aw][:, monsters]).sum(axis=1)
+                better = count < best
+                best = np.where(better, count, best)
+                best_dx = np.where(better, dx, best_dx)
+                best_dy = np.where(better, dy, best_dy)
+            moved = self._try_move(aw, s[idx], self.x[aw, 0] + best_dx, self.y[aw, 0] + best_dy)
+            self._use_stamina(aw[moved], s[idx][moved], 3)
+
+        return np.ones(len(w), dtype=bool)
+
+    def _move(self, w, s):
+        """Movement, mirrors Simulation._move_agent_smart. Returns the mask of agents that moved."""
+        kind = self.kind[s]
+        moved = np.zeros(len(w), dtype=bool)
+
+        dek = s == 0
+        if dek.any():
+            moved[dek] = self._move_dek(w[dek])
+
+        # everyone else moves 70% of the time
+        acts = ~dek & (self.rng.random(len(w)) < 0.7)
+
+        predator = acts & (kind == PREDATOR)
+        tired = predator & (self.stamina[w, s] < 5)
+        self._rest(w[tired], s[tired], 10)
+        predator &= ~tired
+
+        # the rest of the clan goes for the boss, monsters go for the closest predator
+        target = np.full(len(w), -1)
+        boss = np.nonzero(self.kind == BOSS)[0]
+        idx = np.nonzero(predator)[0]
+        if len(idx) and len(boss):
+            target[idx] = np.where(self.alive[w[idx], boss[0]], boss[0], -1)
+        monster = acts & np.isin(kind, (BOSS, MONSTER))
+        if monster.any():
+            idx = np.nonzero(monster)[0]
+            target[idx] = self._nearest(w[idx], s[idx], self.is_predator)
+
+        chase = np.nonzero(acts & (target >= 0))[0]
+        if len(chase):
+            tw, ts, tt = w[chase], s[chase], target[chase]
+            moved[chase] = self._step_towards(tw, ts, self.x[tw, tt], self.y[tw, tt])
+            paid = chase[moved[chase] & (kind[chase] == PREDATOR)]
+            # carrying a load costs double, like _move_agent_smart
+            heavy = self.load[w[paid], s[paid]] > 10
+            self._use_stamina(w[paid[~heavy]], s[paid[~heavy]], 5)
+            self._use_stamina(w[paid[heavy]], s[paid[heavy]], 10)
+
+        wander = np.nonzero(acts & (target < 0) & ~tired)[0]
+        if len(wander):
+            moved[wander] = self._random_step(w[wander], s[wander])
+
+        return moved
+
+    def _check_traps(self, w, s):
+        hit = (self.trap_armed[w] & (self.trap_x[w] == self.x[w, s][:, None])
+               & (self.trap_y[w] == self.y[w, s][:, None]))
+        triggered = hit.any(axis=1)
+        idx = np.nonzero(triggered)[0]
+        if len(idx) == 0:
+            return
+        tw, ts = w[idx], s[idx]
+        self.trap_armed[tw, np.argmax(hit[idx], axis=1)] = False
+        pred = self.kind[ts] == PREDATOR
+        self._change_honour(tw[pred], ts[pred], -5)
+        self._damage(tw, ts, 20)
+
+    def _check_resources(self, w, s):
+        """Pick up the first resource in the 3x3 around each predator, or use held items."""
+        collected = np.zeros(len(w), dtype=bool)
+        for dx, dy in RESOURCE_OFFSETS:
+            cx = (self.x[w, s] + dx) % self.width
+            cy = (self.y[w, s] + dy) % self.height
+            cell = self.occ[w, cy, cx]
+            grab = ~collected & (cell < 0) & (self.load[w, s] <= 80)
+            idx = np.nonzero(grab)[0]
+            if len(idx) == 0:
+                continue
+            gw, gs, r = w[idx], s[idx], -cell[idx] - 1
+            collected[idx] = True
+            self.res_present[gw, r] = False
+            self.occ[gw, cy[idx], cx[idx]] = 0
+            self.stats['resources_collected'][gw] += 1
+            self.load[gw, gs] += 10
+
+            kind = self.res_type[gw, r]
+            sword = kind == SWORD
+            self.weapon_buff[gw[sword], gs[sword]] = 20
+
+            med = kind == MED_KIT
+            use = med & (self.health[gw, gs] < self.max_health[gw, gs])
+            self._heal(gw[use], gs[use], 50)
+            self.load[gw[use], gs[use]] -= 10
+            keep = med & ~use
+            self.held_med_kits[gw[keep], gs[keep]] += 1
+
+            boost = kind == STAMINA_BOOST
+            use = boost & (self.stamina[gw, gs] < 100)
+            self._rest(gw[use], gs[use], 30)
+            self.load[gw[use], gs[use]] -= 10
+            keep = boost & ~use
+            self.held_stamina_boosts[gw[keep], gs[keep]] += 1
+            # repair kits ride along in the load, Thia is never carried in the batch engine
+
+        # nothing picked up, fall back on anything being carried
+        idx = np.nonzero(~collected)[0]
+        hw, hs = w[idx], s[idx]
+        med = (self.held_med_kits[hw, hs] > 0) & (self.health[hw, hs] < 50)
+        self._heal(hw[med], hs[med], 50)
+        self.held_med_kits[hw[med], hs[med]] -= 1
+        self.load[hw[med], hs[med]] = np.maximum(self.load[hw[med], hs[med]] - 10, 0)
+        boost = ~med & (self.held_stamina_boosts[hw, hs] > 0) & (self.stamina[hw, hs] < 30)
+        self._rest(hw[boost], hs[boost], 30)
+        self.held_stamina_boosts[hw[boost], hs[boost]] -= 1
+        self.load[hw[boost], hs[boost]] = np.maximum(self.load[hw[boost], hs[boost]] - 10, 0)
+
+    def _heal(self, w, s, amount):
+        self.health[w, s] = np.minimum(self.health[w, s] + amount, self.max_health[w, s])
+
+    def _attack(self, w, p, d):
+        """Predator slot p attacks slot d, see Simulation._resolve_combat."""
+        self.stats['combats'][w] += 1
+        damage = self.rng.integers(20, 41, size=len(w)) + self.weapon_buff[w, p]
+        died = self._damage(w, d, damage)
+
+        kw, kp, kd = w[died], p[died], d[died]
+        self.stats['deaths'][kw] += 1
+        self.stats['kills'][kw] += 1
+        self.kills[kw, kp] += 1
+        # the code is judged after the kill, so anything but the boss counts as wounded prey (+10)
+        # and killing a synthetic is dishonourable
+        kind = self.kind[kd]
+        self._change_honour(kw, kp, np.where(kind == BOSS, 20, np.where(kind == SYNTHETIC, -5, 10)))
+
+    def _check_combat(self, w, s):
+        """Mirrors Simulation._check_combat, each neighbour has a 40% chance of being looked at before giving up."""
+        look = np.cumprod(self.rng.random((len(w), 8)) <= 0.40, axis=1).astype(bool)
+        spare = self.rng.random((len(w), 8))
+        kind = self.kind[s]
+
+        for i, (dx, dy) in enumerate(COMBAT_OFFSETS):
+            ok = look[:, i] & self.alive[w, s]
+            if not ok.any():
+                break
+            cx = (self.x[w, s] + dx) % self.width
+            cy = (self.y[w, s] + dy) % self.height
+            other = self.occ[w, cy, cx] - 1
+            occupied = ok & (other >= 0)
+            other_kind = np.where(occupied, self.kind[np.maximum(other, 0)], -1)
+
+            # monsters never strike back here, whoever starts it the predator does the damage
+            pvm = occupied & (kind == PREDATOR) & np.isin(other_kind, (BOSS, MONSTER))
+            mvp = occupied & np.isin(kind, (BOSS, MONSTER)) & (other_kind == PREDATOR)
+            idx = np.nonzero(pvm)[0]
+            if len(idx):
+                self._attack(w[idx], s[idx], other[idx])
+            idx = np.nonzero(mvp)[0]
+            if len(idx):
+                self._attack(w[idx], other[idx], s[idx])
+
+            # synthetics only get attacked now and then, Dek refuses and loses honour just for trying
+            pvs = occupied & (kind == PREDATOR) & (other_kind == SYNTHETIC) & (spare[:, i] < 0.3)
+            dek = pvs & (s == 0)
+            idx = np.nonzero(dek)[0]
+            self._change_honour(w[idx], s[idx], -5)
+            idx = np.nonzero(pvs & ~dek)[0]
+            if len(idx):
+                self._attack(w[idx], s[idx], other[idx])
+
+    def _hazard_damage(self, w, s):
+        tiles = self.hazard_tiles[w]  # (n, hazards, tiles, 2)
+        on_tile = ((tiles[..., 0] == self.x[w, s][:, None, None]) & (tiles[..., 1] == self.y[w, s][:, None, None])
+                   & (np.arange(MAX_HAZARD_TILES)[None, None, :] < self.hazard_tile_count[w][:, :, None]))
+        hit = on_tile.any(axis=2) & self.hazard_live[w] & self.hazard_active[w]
+        idx = np.nonzero(hit.any(axis=1))[0]
+        if len(idx) == 0:
+            return
+        # first spawned hazard wins, like HazardGenerator.check_hazard_damage
+        born = np.where(hit[idx], self.hazard_born[w[idx]], np.iinfo(np.int32).max)
+        h = np.argmin(born, axis=1)
+        hw = w[idx]
+        damage = (HAZARD_DAMAGE[self.hazard_type[hw, h]] * self.hazard_intensity[hw, h]).astype(np.int32)
+        self._damage(hw, s[idx], damage)
+
+    def _update_agents(self, active):
+        n = len(active)
+        # every world shuffles its own turn order, like all_agents is shuffled each turn
+        order = np.argsort(self.rng.random((n, self.num_slots)), axis=1)
+
+        for k in range(self.num_slots):
+            s_all = order[:, k]
+            keep = self.alive[active, s_all]
+            w, s = active[keep], s_all[keep]
+            if len(w) == 0:
+                continue
+
+            moved = self._move(w, s)
+            idx = np.nonzero(moved)[0]
+            self._check_traps(w[idx], s[idx])
+            pred = idx[(self.kind[s[idx]] == PREDATOR) & self.alive[w[idx], s[idx]]]
+            self._check_resources(w[pred], s[pred])
+
+            self._check_combat(w, s)
+
+            pred = np.nonzero((self.kind[s] == PREDATOR) & self.alive[w, s])[0]
+            pw, ps = w[pred], s[pred]
+            self._check_resources(pw, ps)
+            self._hazard_damage(pw, ps)
+            self._rest(pw, ps, 5)
+
+    def _update_hazards(self, active):
+        live = self.hazard_live[active]
+        hw, hh = np.nonzero(live)
+        hw = active[hw]
+
+        self.hazard_age[hw, hh] += 1
+        grow = self.hazard_intensity[hw, hh] < self.hazard_max[hw, hh]
+        self.hazard_intensity[hw[grow], hh[grow]] += self.hazard_growth[hw[grow], hh[grow]]
+
+        # ozone spreads to a neighbouring tile every 5 turns, up to 5 tiles
+        spread = ((self.hazard_type[hw, hh] == OZONE_RADIATION) & (self.hazard_age[hw, hh] % 5 == 0)
+                  & (self.hazard_tile_count[hw, hh] < MAX_HAZARD_TILES))
+        sw, sh = hw[spread], hh[spread]
+        if len(sw):
+            count = self.hazard_tile_count[sw, sh]
+            pick = (self.rng.random(len(sw)) * count).astype(np.int32)
+            direction = self.rng.integers(0, 4, size=len(sw))
+            step = np.array([(0, 1), (1, 0), (0, -1), (-1, 0)], dtype=np.int32)[direction]
+            new_tile = self.hazard_tiles[sw, sh, pick] + step
+            existing = self.hazard_tiles[sw, sh]
+            seen = (((existing == new_tile[:, None, :]).all(axis=2))
+                    & (np.arange(MAX_HAZARD_TILES)[None, :] < count[:, None])).any(axis=1)
+            add = ~seen
+            self.hazard_tiles[sw[add], sh[add], count[add]] = new_tile[add]
+            self.hazard_tile_count[sw[add], sh[add]] += 1
+
+        self.hazard_active[hw, hh] = self.turn % 10 != 0
+        self.hazard_live[hw, hh] &= self.hazard_age[hw, hh] < 50
+
+        # maybe spawn one new hazard per world
+        room = self.hazard_live[active].sum(axis=1) < MAX_HAZARDS
+        spawn = room & (self.rng.random(len(active)) < 0.15)
+        sw = active[spawn]
+        if len(sw) == 0:
+            return
+        slot = np.argmin(self.hazard_live[sw], axis=1)
+        types = 4 if self.turn > 30 else 3
+        self.hazard_live[sw, slot] = True
+        self.hazard_active[sw, slot] = True
+        self.hazard_type[sw, slot] = self.rng.integers(0, types, size=len(sw))
+        self.hazard_born[sw, slot] = self.turn
+        self.hazard_age[sw, slot] = 0
+        self.hazard_intensity[sw, slot] = 1.0 + self.turn / 100.0
+        self.hazard_growth[sw, slot] = self.rng.uniform(0.05, 0.15, size=len(sw))
+        self.hazard_max[sw, slot] = self.rng.uniform(2.0, 5.0, size=len(sw))
+        self.hazard_tiles[sw, slot, 0, 0] = self.rng.integers(0, self.width, size=len(sw))
+        self.hazard_tiles[sw, slot, 0, 1] = self.rng.integers(0, self.height, size=len(sw))
+        self.hazard_tile_count[sw, slot] = 1
+
+    def _update_weather(self, active):
+        if self.turn % 10 == 0:
+            self.weather[active] = self.rng.integers(HOT, THUNDER_STORM + 1, size=len(active))
+
+        pred = np.nonzero(self.is_predator)[0]
+        aw, ap = np.nonzero(self.alive[active][:, pred])
+        w, s = active[aw], pred[ap]
+        weather = self.weather[w]
+
+        hot = weather == HOT
+        self._use_stamina(w[hot], s[hot], 2)
+        tired = hot & (self.stamina[w, s] < 20)
+        self._rest(w[tired], s[tired], 10)
+
+        cold = weather == COLD
+        self._use_stamina(w[cold], s[cold], 1)
+
+        storm = weather == THUNDER_STORM
+        struck = storm & (self.rng.random(len(w)) < 0.15)
+        damage = self.rng.integers(5, 11, size=len(w))
+        self._damage(w[struck], s[struck], damage[struck])
+
+    def _record_timelines(self):
+        self.timelines['honour'].append(self.honour[:, 0].copy())
+        self.timelines['health'].append(self.health[:, 0].copy())
+        self.timelines['stamina'].append(self.stamina[:, 0].copy())
+        self.timelines['kills'].append(self.kills[:, 0].copy())
+
+    def step(self):
+        """Advance every unfinished world by one turn."""
+        self.turn += 1
+        active = np.nonzero(~self.finished)[0]
+        if len(active) == 0:
+            return
+        self.turns[active] = self.turn
+        self._record_timelines()
+
+        self._update_agents(active)
+        self._update_hazards(active)
+        self._update_weather(active)
+
+        # a world stops once either side is wiped out, like Simulation._check_win_conditions
+        no_predators = ~(self.alive[active][:, self.is_predator]).any(axis=1)
+        no_monsters = ~(self.alive[active][:, self.is_monster]).any(axis=1)
+        self.finished[active[no_predators | no_monsters]] = True
+
+    def run(self, max_turns: int = 100):
+        self.max_turns = max_turns
+        while self.turn < max_turns and not self.finished.all():
+            self.step()
+
+    def results(self, config_name: str = 'batch') -> List[dict]:
+        """One result dict per world, with the same keys ExperimentRunner collects from a Simulation."""
+        boss = np.nonzero(self.kind == BOSS)[0]
+        timelines = {key: np.array(values).T if values else np.zeros((self.num_worlds, 0), dtype=np.int32)
+                     for key, values in self.timelines.items()}
+
+        results = []
+        for world in range(self.num_worlds):
+            turns = int(self.turns[world])
+            results.append({
+                'run': world + 1,
+                'config': config_name,
+                'seed': self.seed,
+                'turns_survived': turns,
+                'max_turns': self.max_turns,
+                'dek_survived': bool(self.alive[world, 0]),
+                'boss_defeated': bool(len(boss) and not self.alive[world, boss[0]]),
+                'total_kills': int(self.stats['kills'][world]),
+                'total_deaths': int(self.stats['deaths'][world]),
+                'total_combats': int(self.stats['combats'][world]),
+                'resources_collected': int(self.stats['resources_collected'][world]),
+                'dek_honour': int(self.honour[world, 0]),
+                'dek_health': int(self.health[world, 0]),
+                'dek_kills': int(self.kills[world, 0]),
+                'dek_stamina': int(self.stamina[world, 0]),
+                'honour_timeline': timelines['honour'][world, :turns].tolist(),
+                'health_timeline': timelines['health'][world, :turns].tolist(),
+                'stamina_timeline': timelines['stamina'][world, :turns].tolist(),
+                'kill_timeline': timelines['kills'][world, :turns].tolist(),
+            })
+        return results
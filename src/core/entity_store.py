@@ -0,0 +1,160 @@
+"""
+Entity store for the simulation.
+Every entity gets a stable integer id (kept in its entity_id slot) and lives in one
+dict per kind, so adding and removing are O(1) and the per kind views iterate in
+insertion order without copying. Alive counts per kind are kept as counters, and the
+agents that take turns are held in one id list that is shuffled in place each turn,
+with the dead swept out of it first.
+"""
+
+from typing import Dict, Iterator, List, Optional
+
+
+class EntityView:
+    """Live read only view of one kind of entity (or all of them), in the order they were added."""
+
+    __slots__ = ('_entities',)
+
+    def __init__(self, entities: Dict[int, object]):
+        self._entities = entities
+
+    def __iter__(self) -> Iterator:
+        return iter(self._entities.values())
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+    def __bool__(self) -> bool:
+        return bool(self._entities)
+
+    def __contains__(self, entity) -> bool:
+        return self._entities.get(entity.entity_id) is entity
+
+
+class TurnOrderView:
+    """The acting agents in this turn's order, agents removed since the last start_turn are skipped."""
+
+    __slots__ = ('_store',)
+
+    def __init__(self, store: 'EntityStore'):
+        self._store = store
+
+    def __iter__(self) -> Iterator:
+        entities = self._store.entities
+        for entity_id in self._store.turn_order:
+            entity = entities.get(entity_id)
+            if entity is not None:
+                yield entity
+
+    def __len__(self) -> int:
+        return len(self._store.turn_order)
+
+
+class EntityStore:
+    """
+    kinds are the entity classes to keep separate views for, an entity goes in the
+    view of the first kind it is an instance of.
+    """
+
+    def __init__(self, kinds):
+        self.kinds = tuple(kinds)
+        self.entities: Dict[int, object] = {}
+        self.by_kind: Dict[type, Dict[int, object]] = {kind: {} for kind in self.kinds}
+        self.alive: Dict[type, int] = {kind: 0 for kind in self.kinds}
+        self.next_id = 0
+
+        self.turn_order: List[int] = []  # ids of the agents that act, shuffled every turn
+        self._position: Dict[int, int] = {}  # id -> index in turn_order
+        self._leaving: List[int] = []  # dead or removed agents to drop at the next start_turn
+        self._dead = set()  # ids whose death has been counted
+
+    def kind_of(self, entity) -> type:
+        for kind in self.kinds:
+            if isinstance(entity, kind):
+                return kind
+        raise ValueError(f"Invalid entity: {type(entity).__name__}. Must be one of "
+                         f"{[kind.__name__ for kind in self.kinds]}")
+
+    def view(self, kind) -> EntityView:
+        return EntityView(self.by_kind[kind])
+
+    def acting(self) -> TurnOrderView:
+        return TurnOrderView(self)
+
+    def get(self, entity_id: int):
+        return self.entities.get(entity_id)
+
+    def alive_count(self, kind) -> int:
+        return self.alive[kind]
+
+    def add(self, entity, acts: bool = True, entity_id: Optional[int] = None) -> int:
+        """Register an entity, acts=False for things that never take a turn (traps, resources)."""
+        if entity_id is None:
+            entity_id = self.next_id
+        self.next_id = max(self.next_id, entity_id + 1)
+        entity.entity_id = entity_id
+
+        kind = self.kind_of(entity)
+        self.entities[entity_id] = entity
+        self.by_kind[kind][entity_id] = entity
+        if entity.alive:
+            self.alive[kind] += 1
+        else:
+            self._dead.add(entity_id)
+        if acts:
+            self._position[entity_id] = len(self.turn_order)
+            self.turn_order.append(entity_id)
+        return entity_id
+
+    def died(self, entity):
+        """Count a death, the entity stays in its view (like the old lists) but stops taking turns."""
+        entity_id = entity.entity_id
+        if entity_id not in self.entities or entity_id in self._dead:
+            return
+        self._dead.add(entity_id)
+        self.alive[self.kind_of(entity)] -= 1
+        if entity_id in self._position:
+            self._leaving.append(entity_id)
+
+    def remove(self, entity):
+        entity_id = entity.entity_id
+        if self.entities.get(entity_id) is not entity:
+            return
+        self.died(entity)
+        del self.entities[entity_id]
+        del self.by_kind[self.kind_of(entity)][entity_id]
+        self._dead.discard(entity_id)
+
+    def start_turn(self, rng):
+        """Drop whoever left since last turn (swap with the last id, O(1) each) and shuffle the rest."""
+        for entity_id in self._leaving:
+            index = self._position.pop(entity_id, None)
+            if index is None:
+                continue
+            last = self.turn_order.pop()
+            if last != entity_id:
+                self.turn_order[index] = last
+                self._position[last] = index
+        self._leaving.clear()
+        rng.shuffle(self.turn_order)
+        for index, entity_id in enumerate(self.turn_order):
+            self._position[entity_id] = index
+
+    # snapshots
+
+    def getstate(self) -> dict:
+        """Turn order bookkeeping, the entities themselves are saved by whoever owns them (core.snapshot)."""
+        return {
+            'next_id': self.next_id,
+            'turn_order': list(self.turn_order),
+            'leaving': list(self._leaving),
+        }
+
+    def setstate(self, state: dict, entities):
+        """entities is everything that was in the store, in store order, with their entity_id set."""
+        for entity in entities:
+            self.add(entity, acts=False, entity_id=entity.entity_id)
+        self.next_id = state['next_id']
+        self.turn_order = list(state['turn_order'])
+        self._position = {entity_id: index for index, entity_id in enumerate(self.turn_order)}
+        self._leaving = list(state['leaving'])
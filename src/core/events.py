@@ -0,0 +1,110 @@
+"""
+Pluggable event sinks for simulation output.
+Call sites pass a message template plus its fields instead of an f-string,
+so a sink that isnt going to show the message never pays for formatting it.
+"""
+
+from typing import NamedTuple
+
+# levels, same numbers as the logging module
+DEBUG = 10
+INFO = 20
+WARNING = 30
+
+
+class Event(NamedTuple):
+    """One typed record kept by StructuredSink."""
+    turn: int
+    kind: str
+    level: int
+    message: str  # the unformatted template
+    fields: dict
+
+    def format(self) -> str:
+        return self.message.format(**self.fields) if self.fields else self.message
+
+
+class EventSink:
+    """
+    Base sink. emit() drops anything below self.level and hands the rest to write().
+    The simulation keeps self.turn up to date so records can be stamped with it.
+    """
+
+    def __init__(self, level: int = INFO):
+        self.level = level
+        self.turn = 0
+
+    def enabled(self, level: int = INFO) -> bool:
+        return level >= self.level
+
+    def emit(self, kind: str, message: str, level: int = INFO, **fields):
+        if level < self.level:
+            return
+        self.write(kind, level, message, fields)
+
+    def write(self, kind: str, level: int, message: str, fields: dict):
+        raise NotImplementedError
+
+
+class NullSink(EventSink):
+    """Throws everything away without formatting it, for batch runs."""
+
+    def __init__(self):
+        super().__init__(level=WARNING + 1)
+
+    def enabled(self, level: int = INFO) -> bool:
+        return False
+
+    def emit(self, kind: str, message: str, level: int = INFO, **fields):
+        pass
+
+    def write(self, kind: str, level: int, message: str, fields: dict):
+        pass
+
+
+class StdoutSink(EventSink):
+    """Prints every message, which is what the simulation always used to do."""
+
+    def __init__(self, level: int = DEBUG):
+        super().__init__(level)
+
+    def write(self, kind: str, level: int, message: str, fields: dict):
+        print(message.format(**fields) if fields else message)
+
+
+class BufferedSink(EventSink):
+    """Keeps formatted lines in memory, getvalue() joins them like a StringIO would."""
+
+    def __init__(self, level: int = INFO):
+        super().__init__(level)
+        self.lines = []
+
+    def write(self, kind: str, level: int, message: str, fields: dict):
+        self.lines.append(message.format(**fields) if fields else message)
+
+    def getvalue(self) -> str:
+        return "\n".join(self.lines)
+
+    def clear(self):
+        self.lines.clear()
+
+
+class StructuredSink(EventSink):
+    """Keeps unformatted Event records so runs can be analysed by kind and field."""
+
+    def __init__(self, level: int = INFO):
+        super().__init__(level)
+        self.records = []
+
+    def write(self, kind: str, level: int, message: str, fields: dict):
+        self.records.append(Event(self.turn, kind, level, message, fields))
+
+    def of_kind(self, kind: str):
+        return [record for record in self.records if record.kind == kind]
+
+    def clear(self):
+        self.records.clear()
+
+
+# entities created outside a simulation still print like they used to
+DEFAULT_SINK = StdoutSink()
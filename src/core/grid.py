@@ -7,27 +7,53 @@ class Grid:
    
     """
 
-    def __init__(self, width=20, height=20):
+    def __init__(self, width=20, height=20, occupancy=False, spatial_index=False):
         self.width = width
         self.height = height
         # Initialise a 2D list where each cell is initially None (empty)
         self.grid = [[None for _ in range(width)] for _ in range(height)]
 
+        # optional numpy mirror of the grid for vectorized whole grid queries
+        self.occupancy = None
+        if occupancy:
+            from core.occupancy import OccupancyLayer
+            self.occupancy = OccupancyLayer(width, height)
+
+        # optional bucketed hash for nearest / within radius lookups
+        self.spatial = None
+        if spatial_index:
+            from core.spatial import SpatialHash
+            self.spatial = SpatialHash(width, height)
+
+        # optional generation.procedural.Terrain, impassable cells can't be entered and
+        # pathfinding pays its movement cost
+        self.terrain = None
+
+        # anything else that wants to hear about placements, moves and removals
+        # (objects with on_place / on_move / on_remove, e.g. the replay log)
+        self.listeners = []
+
     def normalise_position(self, x, y):
         """
         Wrap coordinates around the grid
         """
         return x % self.width, y % self.height
 
+    @property
+    def neighbours(self):
+        """The precomputed wrap-around neighbour tables for this grid size (core.neighbours)."""
+        from core.neighbours import neighbour_table
+        return neighbour_table(self.width, self.height)
+
     def is_valid_position(self, x, y):
         """
         Check if a position is within the actual grid boundaries (without wrapping).
         """
         return 0 <= x < self.width and 0 <= y < self.height
 
-    def display(self):
-        """ Displays the grid, obviosusly """
-        print("\n" + "=" * (self.width * 2 + 1))
+    def render(self):
+        """ The grid as text, one row per line """
+        lines = ["\n" + "=" * (self.width * 2 + 1)]
         for row in self.grid:
             line = ""
             for cell in row:
@@ -35,17 +61,34 @@ class Grid:
                     line += ". "
                 else:
                     line += cell.symbol + " "
-            print(line)
-        print("=" * (self.width * 2 + 1) + "\n")
+            lines.append(line)
+        lines.append("=" * (self.width * 2 + 1) + "\n")
+        return "\n".join(lines)
+
+    def display(self):
+        """ Displays the grid, obviosusly """
+        print(self.render())
 
     def is_empty(self, x, y):
-        x, y = self.normalise_position(x, y)
+        x, y = x % self.width, y % self.height
+        if self.terrain is not None and not self.terrain.passable[y, x]:
+            return False
         return self.grid[y][x] is None
 
     def get_cell(self, x, y):
-        
-        x, y = self.normalise_position(x, y)
-        return self.grid[y][x]
+        return self.grid[y % self.height][x % self.width]
+
+    def empty_cells(self):
+        """
+        All empty (x, y) positions, uses the occupancy layer when its switched on.
+        """
+        if self.occupancy is not None:
+            cells = [(int(x), int(y)) for x, y in self.occupancy.empty_cells()]
+        else:
+            cells = [(x, y) for y in range(self.height) for x in range(self.width) if self.grid[y][x] is None]
+        if self.terrain is not None:
+            cells = [(x, y) for x, y in cells if self.terrain.passable[y, x]]
+        return cells
 
     def place_agent(self, agent, x, y):
         """
@@ -54,13 +97,21 @@ class Grid:
         """
         x, y = self.normalise_position(x, y)
 
-        if not self.is_empty(x, y):
+        if self.grid[y][x] is not None:
+            return False
+        if self.terrain is not None and not self.terrain.passable[y, x]:
             return False
 
         self.grid[y][x] = agent
+        if self.occupancy is not None:
+            self.occupancy.place(agent, x, y)
+        if self.spatial is not None:
+            self.spatial.insert(agent, x, y)
         # Update agent's internal position tracking
         agent.x = x
         agent.y = y
+        for listener in self.listeners:
+            listener.on_place(agent, x, y)
         return True
 
     def remove_agent(self, agent):
@@ -71,27 +122,42 @@ class Grid:
         # A quick bounds check before attempting removal
         if self.is_valid_position(agent.x, agent.y):
             self.grid[agent.y][agent.x] = None
+            if self.occupancy is not None:
+                self.occupancy.clear(agent.x, agent.y)
+        if self.spatial is not None:
+            self.spatial.remove(agent)
+        for listener in self.listeners:
+            listener.on_remove(agent)
 
 
 
-    def weather_system(self):
+    def weather_system(self, rng=None):
         """
         Returns a random weather string.
+        rng is an optional random.Random to draw from instead of the global random module.
         """
+        rng = rng if rng is not None else random
         weather_options = {
             1: "hot",
             2: "cold",
             3: "rainy",
             4: "thunder_storm"
         }
-        return random.choice(list(weather_options.values()))
+        return rng.choice(list(weather_options.values()))
 
     def move_agent(self, agent, new_x, new_y):
         new_x, new_y = self.normalise_position(new_x, new_y)
 
-        #see if the new spot is available
-        if not self.is_empty(new_x, new_y):
+        #see if the new spot is available (already normalised so index directly)
+        if self.grid[new_y][new_x] is not None:
             return False
+        if self.terrain is not None and not self.terrain.passable[new_y, new_x]:
+            return False
+
+        if self.occupancy is not None:
+            self.occupancy.move(agent.x, agent.y, new_x, new_y)
+        if self.spatial is not None:
+            self.spatial.move(agent, new_x, new_y)
 
         # Clear the agent old position
         self.grid[agent.y][agent.x] = None
@@ -100,6 +166,8 @@ class Grid:
         self.grid[new_y][new_x] = agent
         agent.x = new_x
         agent.y = new_y
+        for listener in self.listeners:
+            listener.on_move(agent, new_x, new_y)
 
         return True
 
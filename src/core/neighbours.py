@@ -0,0 +1,92 @@
+"""
+Precomputed wrap-around neighbours.
+Every lookup of "the cells next to (x, y)" used to build its direction list and do
+two modulos per neighbour. The answers only depend on the grid size, so they are
+worked out once per (width, height) and shared by every grid of that size.
+Tables are indexed by the flat cell index y * width + x.
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+Offsets = Tuple[Tuple[int, int], ...]
+
+# the order MovementSystem.get_neighbors has always returned them in
+ORTHOGONAL: Offsets = ((0, 1), (1, 0), (0, -1), (-1, 0))
+MOORE: Offsets = ORTHOGONAL + ((1, 1), (1, -1), (-1, -1), (-1, 1))
+
+# the 8 surrounding cells in the order the old nested dx / dy loops went (dx outer),
+# the combat scan draws a random number per cell so this order has to stay put
+SCAN_ORDER: Offsets = tuple((dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy)
+
+
+class NeighbourTable:
+    """
+    Neighbour tables for one grid size, each built the first time it's asked for.
+    positions(offsets)[i] is a tuple of (x, y) neighbours of cell i, for the pure python loops.
+    indices(offsets)[i] is the same as flat cell indices, and flat(offsets) is that as an
+    (height * width, len(offsets)) array.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self._positions: Dict[Offsets, List[tuple]] = {}
+        self._indices: Dict[Offsets, List[tuple]] = {}
+        self._flat: Dict[Offsets, np.ndarray] = {}
+        self._axes: Dict[int, tuple] = {}
+
+    def index(self, x: int, y: int) -> int:
+        return (y % self.height) * self.width + (x % self.width)
+
+    def flat(self, offsets: Offsets = MOORE) -> np.ndarray:
+        table = self._flat.get(offsets)
+        if table is None:
+            ys, xs = np.divmod(np.arange(self.width * self.height), self.width)
+            dx = np.array([d[0] for d in offsets])
+            dy = np.array([d[1] for d in offsets])
+            table = ((ys[:, None] + dy) % self.height) * self.width + (xs[:, None] + dx) % self.width
+            table = self._flat[offsets] = table.astype(np.int32)
+        return table
+
+    def indices(self, offsets: Offsets = MOORE) -> List[tuple]:
+        table = self._indices.get(offsets)
+        if table is None:
+            table = self._indices[offsets] = [tuple(row) for row in self.flat(offsets).tolist()]
+        return table
+
+    def positions(self, offsets: Offsets = MOORE) -> List[tuple]:
+        table = self._positions.get(offsets)
+        if table is None:
+            width = self.width
+            # one shared (x, y) tuple per cell, the per cell tuples just point at them
+            cells = [(x, y) for y in range(self.height) for x in range(width)]
+            table = [tuple(cells[i] for i in row) for row in self.indices(offsets)]
+            self._positions[offsets] = table
+        return table
+
+    def axes(self, radius: int) -> tuple:
+        """
+        (offsets, xs, ys) for scanning a square of the given radius: offsets runs -radius..radius
+        and xs[x] / ys[y] are those offsets added to x / y and wrapped.
+        Kept per axis rather than per cell so big radii stay small.
+        """
+        axes = self._axes.get(radius)
+        if axes is None:
+            offsets = tuple(range(-radius, radius + 1))
+            xs = [tuple((x + d) % self.width for d in offsets) for x in range(self.width)]
+            ys = [tuple((y + d) % self.height for d in offsets) for y in range(self.height)]
+            axes = self._axes[radius] = (offsets, xs, ys)
+        return axes
+
+
+_tables: Dict[Tuple[int, int], NeighbourTable] = {}
+
+
+def neighbour_table(width: int, height: int) -> NeighbourTable:
+    """The shared table for a grid size."""
+    table = _tables.get((width, height))
+    if table is None:
+        table = _tables[(width, height)] = NeighbourTable(width, height)
+    return table
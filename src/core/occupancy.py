@@ -0,0 +1,144 @@
+"""
+Array backed occupancy layer for the Grid.
+Mirrors the object grid as two numpy arrays so whole grid questions
+("where are the empty cells", "how many monsters are next to each cell")
+can be answered with vectorized operations instead of python loops.
+"""
+
+import numpy as np
+
+# type codes stored in the type array
+EMPTY = 0
+PREDATOR = 1
+MONSTER = 2
+BOSS = 3
+SYNTHETIC = 4
+RESOURCE = 5
+OTHER = 6
+
+NO_ENTITY = -1
+
+
+def entity_type_code(agent) -> int:
+    """Work out the type code for an agent."""
+    # imported here as the entity modules import core.grid themselves
+    from entities.predator import Predator
+    from entities.monster import Monster
+    from entities.synthetics import Synthetic
+    from entities.resource import Resource
+
+    if isinstance(agent, Predator):
+        return PREDATOR
+    if isinstance(agent, Monster):
+        return BOSS if agent.is_boss else MONSTER
+    if isinstance(agent, Synthetic):
+        return SYNTHETIC
+    if isinstance(agent, Resource):
+        return RESOURCE
+    return OTHER
+
+
+class OccupancyLayer:
+    """
+    Keeps an int32 entity id array and an int8 type code array in sync with the grid.
+    Indexed [y, x] the same way as Grid.grid.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.ids = np.full((height, width), NO_ENTITY, dtype=np.int32)
+        self.types = np.zeros((height, width), dtype=np.int8)
+
+        # id -> agent and agent -> id for the agents on the grid, ids are never reused.
+        # _cells counts the cells holding each id, the mapping is dropped when the last
+        # one is cleared so removed agents aren't kept alive by the layer
+        self._agents = {}
+        self._ids = {}
+        self._cells = {}
+        self._next_id = 0
+
+    def id_for(self, agent) -> int:
+        entity_id = self._ids.get(agent)
+        if entity_id is None:
+            entity_id = self._next_id
+            self._next_id += 1
+            self._ids[agent] = entity_id
+            self._agents[entity_id] = agent
+            self._cells[entity_id] = 0
+        return entity_id
+
+    def agent_for(self, entity_id: int):
+        return self._agents.get(int(entity_id))
+
+    def place(self, agent, x: int, y: int):
+        self._release(x, y)
+        entity_id = self.id_for(agent)
+        self._cells[entity_id] += 1
+        self.ids[y, x] = entity_id
+        self.types[y, x] = entity_type_code(agent)
+
+    def clear(self, x: int, y: int):
+        self._release(x, y)
+        self.ids[y, x] = NO_ENTITY
+        self.types[y, x] = EMPTY
+
+    def move(self, old_x: int, old_y: int, new_x: int, new_y: int):
+        if (old_x, old_y) == (new_x, new_y):
+            return
+        self._release(new_x, new_y)
+        self.ids[new_y, new_x] = self.ids[old_y, old_x]
+        self.types[new_y, new_x] = self.types[old_y, old_x]
+        self.ids[old_y, old_x] = NO_ENTITY
+        self.types[old_y, old_x] = EMPTY
+
+    def _release(self, x: int, y: int):
+        # whatever held (x, y) is losing it, forget the agent once it holds no cells at all
+        entity_id = int(self.ids[y, x])
+        if entity_id == NO_ENTITY:
+            return
+        self._cells[entity_id] -= 1
+        if not self._cells[entity_id]:
+            del self._cells[entity_id]
+            del self._ids[self._agents.pop(entity_id)]
+
+    # whole grid queries
+
+    def mask_of(self, *codes) -> np.ndarray:
+        """Boolean (height, width) mask of cells holding any of the given type codes."""
+        if len(codes) == 1:
+            return self.types == codes[0]
+        return np.isin(self.types, codes)
+
+    def cells_of(self, *codes) -> np.ndarray:
+        """(n, 2) array of (x, y) positions holding any of the given type codes."""
+        ys, xs = np.nonzero(self.mask_of(*codes))
+        return np.column_stack((xs, ys))
+
+    def empty_cells(self) -> np.ndarray:
+        return self.cells_of(EMPTY)
+
+    def monster_cells(self, include_boss: bool = True) -> np.ndarray:
+        if include_boss:
+            return self.cells_of(MONSTER, BOSS)
+        return self.cells_of(MONSTER)
+
+    def count_of(self, *codes) -> int:
+        return int(np.count_nonzero(self.mask_of(*codes)))
+
+    def neighbour_counts(self, *codes, radius: int = 1, include_centre: bool = False) -> np.ndarray:
+        """
+        For every cell count how many cells within `radius` (chebyshev, wrapping
+        round the torus like the rest of the grid) hold one of the given type codes.
+        """
+        mask = self.mask_of(*codes).astype(np.int32)
+        counts = np.zeros_like(mask)
+
+        for dy in range(-radius, radius + 1):
+            for dx in range(-radius, radius + 1):
+                if dx == 0 and dy == 0 and not include_centre:
+                    continue
+                # rolling by (-dy, -dx) lines cell (y+dy, x+dx) up with (y, x)
+                counts += np.roll(mask, shift=(-dy, -dx), axis=(0, 1))
+
+        return counts
@@ -0,0 +1,236 @@
+"""
+Compact binary event log for simulation runs.
+Every move, combat, kill, trap, pickup, hazard spawn and weather change is packed
+into a fixed size record and written out in append only chunks, so thousands of
+runs can be analysed (or replayed onto a Grid) without re-simulating them.
+"""
+
+import struct
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from core.grid import Grid
+
+FORMAT_VERSION = 1
+MAGIC = b'BRPL'
+
+# record codes
+META = 0      # x = width, y = height
+SPAWN = 1     # entity placed on the grid, value = type code, other = symbol
+HIDDEN = 2    # entity that exists but never goes on the grid (traps)
+MOVE = 3
+REMOVE = 4
+COMBAT = 5    # entity attacks other for value damage
+KILL = 6      # entity killed other
+TRAP = 7      # entity stepped on trap other for value damage
+PICKUP = 8    # entity collected resource other
+HAZARD = 9    # hazard of type index entity spawned at x, y, value = intensity * 100
+WEATHER = 10  # value = index into WEATHER_TYPES
+
+WEATHER_TYPES = ["Clear", "hot", "cold", "rainy", "thunder_storm"]
+HAZARD_TYPES = ["silicon_rain", "ozone_radiation", "sulphur_dioxide", "break_domain", "nuke", "radiation_cloud"]
+
+# code, turn, entity, other, x, y, value -> 19 bytes a record
+RECORD = struct.Struct('<BHIIhhi')
+RECORD_DTYPE = np.dtype([
+    ('code', 'u1'), ('turn', '<u2'), ('entity', '<u4'), ('other', '<u4'),
+    ('x', '<i2'), ('y', '<i2'), ('value', '<i4'),
+])
+CHUNK_HEADER = struct.Struct('<4sBII')  # magic, version, names in chunk, records in chunk
+NAME_HEADER = struct.Struct('<IH')  # entity id, name length in bytes
+
+NO_ENTITY = 0xFFFFFFFF
+
+
+class EventLog:
+    """
+    Writes the log. Records are buffered and written as a chunk every
+    chunk_records records (and on flush), appended to `path` if given or kept
+    in memory otherwise. Also acts as a Grid listener for spawns, moves and removals.
+    """
+
+    def __init__(self, path: Optional[str] = None, chunk_records: int = 4096):
+        self.path = path
+        self.chunk_records = chunk_records
+        self.chunks: List[bytes] = []  # only used without a path
+        self.turn = 0
+
+        self._ids = {}
+        self._names = []  # (id, name) pairs waiting for the next chunk
+        self._buffer = bytearray()
+        self._count = 0
+
+    def _id(self, entity) -> int:
+        entity_id = self._ids.get(entity)
+        if entity_id is None:
+            entity_id = len(self._ids)
+            self._ids[entity] = entity_id
+            self._names.append((entity_id, entity.name))
+        return entity_id
+
+    def _record(self, code, entity=NO_ENTITY, other=NO_ENTITY, x=0, y=0, value=0):
+        self._buffer += RECORD.pack(code, self.turn, entity, other, x, y, value)
+        self._count += 1
+        if self._count >= self.chunk_records:
+            self.flush()
+
+    # recording
+
+    def begin(self, width: int, height: int):
+        self._record(META, x=width, y=height)
+
+    def register_hidden(self, entity):
+        self._record(HIDDEN, self._id(entity), x=entity.x, y=entity.y)
+
+    def on_place(self, agent, x, y):
+        # imported here, occupancy pulls in the entity classes
+        from core.occupancy import entity_type_code
+        self._record(SPAWN, self._id(agent), ord(agent.symbol[0]), x, y, entity_type_code(agent))
+
+    def on_move(self, agent, x, y):
+        self._record(MOVE, self._id(agent), x=x, y=y)
+
+    def on_remove(self, agent):
+        if agent in self._ids:
+            self._record(REMOVE, self._ids[agent], x=agent.x, y=agent.y)
+
+    def combat(self, attacker, defender, damage):
+        self._record(COMBAT, self._id(attacker), self._id(defender), defender.x, defender.y, damage)
+
+    def kill(self, attacker, defender):
+        self._record(KILL, self._id(attacker), self._id(defender), defender.x, defender.y)
+
+    def trap(self, agent, trap, damage):
+        self._record(TRAP, self._id(agent), self._id(trap), agent.x, agent.y, damage)
+
+    def pickup(self, agent, resource):
+        self._record(PICKUP, self._id(agent), self._id(resource), resource.x, resource.y)
+
+    def hazard(self, hazard_type, x, y, intensity):
+        type_index = HAZARD_TYPES.index(hazard_type) if hazard_type in HAZARD_TYPES else NO_ENTITY
+        self._record(HAZARD, type_index, x=x, y=y, value=int(round(intensity * 100)))
+
+    def weather(self, weather):
+        self._record(WEATHER, value=WEATHER_TYPES.index(weather))
+
+    # output
+
+    def flush(self):
+        """Write out everything buffered as one chunk."""
+        if not self._count and not self._names:
+            return
+
+        parts = [CHUNK_HEADER.pack(MAGIC, FORMAT_VERSION, len(self._names), self._count)]
+        for entity_id, name in self._names:
+            encoded = name.encode('utf-8')
+            parts.append(NAME_HEADER.pack(entity_id, len(encoded)))
+            parts.append(encoded)
+        parts.append(bytes(self._buffer))
+        chunk = b''.join(parts)
+
+        if self.path is not None:
+            with open(self.path, 'ab') as f:
+                f.write(chunk)
+        else:
+            self.chunks.append(chunk)
+
+        self._names = []
+        self._buffer = bytearray()
+        self._count = 0
+
+    def getvalue(self) -> bytes:
+        """The whole in memory log, call flush first."""
+        return b''.join(self.chunks)
+
+
+class ReplayEntity:
+    """Stand in for an agent when rebuilding a grid from a log."""
+
+    def __init__(self, entity_id: int, name: str, symbol: str, type_code: int):
+        self.entity_id = entity_id
+        self.name = name
+        self.symbol = symbol
+        self.type_code = type_code
+        self.x = 0
+        self.y = 0
+        self.alive = True
+
+
+class Replay:
+    """
+    Reads a log back. `records` is a numpy structured array (fields code, turn,
+    entity, other, x, y, value) so whole runs can be filtered without python loops.
+    """
+
+    def __init__(self, data: bytes):
+        self.names: Dict[int, str] = {}
+        record_blocks = []
+
+        offset = 0
+        while offset < len(data):
+            magic, version, name_count, record_count = CHUNK_HEADER.unpack_from(data, offset)
+            if magic != MAGIC:
+                raise ValueError(f"Not a replay chunk at byte {offset}")
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported replay version {version}, expected {FORMAT_VERSION}")
+            offset += CHUNK_HEADER.size
+
+            for _ in range(name_count):
+                entity_id, length = NAME_HEADER.unpack_from(data, offset)
+                offset += NAME_HEADER.size
+                self.names[entity_id] = data[offset:offset + length].decode('utf-8')
+                offset += length
+
+            size = record_count * RECORD.size
+            record_blocks.append(np.frombuffer(data, dtype=RECORD_DTYPE, count=record_count, offset=offset))
+            offset += size
+
+        if record_blocks:
+            self.records = np.concatenate(record_blocks)
+        else:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+
+        meta = self.records[self.records['code'] == META]
+        if len(meta) == 0:
+            raise ValueError("Replay has no META record")
+        self.width = int(meta[0]['x'])
+        self.height = int(meta[0]['y'])
+
+    @classmethod
+    def load(cls, path: str) -> 'Replay':
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    def of_code(self, code: int) -> np.ndarray:
+        return self.records[self.records['code'] == code]
+
+    @property
+    def last_turn(self) -> int:
+        return int(self.records['turn'].max()) if len(self.records) else 0
+
+    def grid_at(self, turn: int) -> Grid:
+        """Rebuild the grid as it was at the end of `turn`."""
+        grid = Grid(self.width, self.height)
+        entities: Dict[int, ReplayEntity] = {}
+
+        for record in self.records[self.records['turn'] <= turn]:
+            code = record['code']
+            entity_id = int(record['entity'])
+
+            if code == SPAWN:
+                entity = ReplayEntity(entity_id, self.names.get(entity_id, ""), chr(record['other']), int(record['value']))
+                entities[entity_id] = entity
+                grid.place_agent(entity, int(record['x']), int(record['y']))
+            elif code == MOVE:
+                grid.move_agent(entities[entity_id], int(record['x']), int(record['y']))
+            elif code == REMOVE:
+                entity = entities.get(entity_id)
+                if entity is not None and grid.get_cell(entity.x, entity.y) is entity:
+                    grid.remove_agent(entity)
+            elif code == KILL:
+                victim = entities.get(int(record['other']))
+                if victim is not None:
+                    victim.alive = False
+
+        return grid
@@ -0,0 +1,34 @@
+"""
+Seeded random number streams for the simulation.
+Each subsystem gets its own random.Random so two runs with the same seed play out
+identically, and adding a random call in one system doesnt shift the others.
+"""
+
+import random
+
+
+class RandomStreams:
+    """
+    Independent random.Random streams derived from one seed.
+    With seed=None the master seed is drawn from the global random module,
+    so code that seeds `random` itself still gets repeatable runs.
+    """
+
+    STREAMS = ('spawn', 'movement', 'combat', 'weather', 'hazards', 'learning')
+
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+
+        master = random.Random(seed)
+        # always derived in the same order so each stream gets the same seed every time
+        for name in self.STREAMS:
+            setattr(self, name, random.Random(master.getrandbits(64)))
+
+    def getstate(self) -> dict:
+        return {name: getattr(self, name).getstate() for name in self.STREAMS}
+
+    def setstate(self, state: dict):
+        for name in self.STREAMS:
+            getattr(self, name).setstate(state[name])
@@ -9,40 +9,89 @@ import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import random
-
 from typing import List, Dict, Optional
 from core.grid import Grid
 from entities.agent import Agent
 from entities.predator import Predator
 from entities.monster import Monster
 from entities.synthetics import Synthetic
-from systems.movement import MovementSystem
+from systems.movement import MovementSystem, PathCache, FlowField
 from entities.trap import Trap
 from entities.resource import Resource
 from systems.ClanCode import ClanCode
+from core.rng import RandomStreams
+from core.events import StdoutSink, DEBUG, INFO, WARNING
 from ai.reinforcement import Qlearning
 from generation.hazards import HazardGenerator
 from generation.hazards import DynamicHazards
+from generation.hazard_field import HazardField
+from generation.procedural import generate_terrain
+from core.entity_store import EntityStore
+from core.neighbours import SCAN_ORDER
 
 class Simulation:
     
     
-    def __init__(self, width=20, height=20, num_predators=3, num_monsters=5, num_synthetics=2):
+    def __init__(self, width=20, height=20, num_predators=3, num_monsters=5, num_synthetics=2,
+                 occupancy=False, path_cache=True, replan_distance=2, pathfinding='astar',
+                 seed=None, events=None, replay=None, spawn=True, q_backend='dict',
+                 experience=None, learn_online=True, q_learning=None, shared_policy=False,
+                 hazard_field=False, terrain=None):
+
+        # where all the simulation messages go, NullSink() for quiet batch runs
+        self.events = events if events is not None else StdoutSink()
+
+        # one random stream per subsystem, the same seed gives the same run
+        self.rng = RandomStreams(seed)
+        self.seed = self.rng.seed
       
-        self.grid = Grid(width, height)
+        # occupancy=True keeps a numpy mirror of the grid for big maps,
+        # the spatial index is always on as the nearest enemy lookups rely on it
+        self.grid = Grid(width, height, occupancy=occupancy, spatial_index=True)
+
+        # terrain is a generation.procedural.Terrain, or True to generate one from the seed
+        if terrain is True:
+            terrain = generate_terrain(width, height, seed=self.seed)
+        self.grid.terrain = terrain if terrain else None
         self.width = width
         self.height = height
         
-        #track all entities
-        self.predators: List[Predator] = []
-        self.monsters: List[Monster] = []
-        self.synthetics: List[Synthetic] = []
-        self.traps: List[Trap] = []
-        self.resources: List[Resource] = []
-        self.all_agents: List[Agent] = []
+        #track all entities, the store gives each a stable id and the attributes are live views of it
+        self.entities = EntityStore((Predator, Monster, Synthetic, Trap, Resource))
+        self.predators = self.entities.view(Predator)
+        self.monsters = self.entities.view(Monster)
+        self.synthetics = self.entities.view(Synthetic)
+        self.traps = self.entities.view(Trap)
+        self.resources = self.entities.view(Resource)
+        self.all_agents = self.entities.acting()  # everything that takes turns, in this turn's order
+        # hidden traps arent on the grid, so (x, y) -> untriggered traps there in spawn order
+        self.trap_index: Dict[tuple, List[Trap]] = {}
         self.current_weather = "Clear"
-        self.q_learning = Qlearning()
+        # experience is an optional ai.replay_buffer.ReplayBuffer that records Dek's transitions,
+        # q_learning lets a trainer carry one Qlearning across many simulations, the one made here has
+        # fixed epsilon and learning rate (see the Qlearning docstring for why)
+        if q_learning is not None:
+            self.q_learning = q_learning
+        else:
+            self.q_learning = Qlearning(rng=self.rng.learning, backend=q_backend,
+                                        buffer=experience, learn_online=learn_online)
+        # shared_policy=True puts every predator on the one Qlearning: actions for the whole clan are
+        # chosen in one batched call per turn and their updates applied together at the end of the turn
+        # (best with q_backend='dense'), otherwise only Dek learns and the rest use the heuristics
+        self.shared_policy = shared_policy
+        self.planned_actions = {}  # predator -> (state, action) chosen at the start of this turn
+        # hazard_field=True lets ozone (and the new radiation clouds) diffuse over the map as intensity grids
+        field = HazardField(width, height) if hazard_field else None
+        self.hazard_generation = HazardGenerator(width, height, rng=self.rng.hazards, events=self.events,
+                                                 field=field)
+
+        # agents keep walking their last A* path until it gets blocked or the target wanders off
+        self.path_cache = PathCache(max_goal_drift=replan_distance) if path_cache else None
+
+        # 'flow_field' shares one distance map per target per turn instead of an A* per agent
+        if pathfinding not in ('astar', 'flow_field'):
+            raise ValueError(f"Invalid pathfinding: {pathfinding}. Must be 'astar' or 'flow_field'")
+        self.flow_field = FlowField() if pathfinding == 'flow_field' else None
         
         #simulation state
         self.turn = 0
@@ -62,62 +111,91 @@ class Simulation:
         self.last_challenge_turn = {}  #track last challenge turn per predator
         self.challenge_cooldown = 10  #only challenge every 10 turns
         
-        #initialise entities
-        self._spawn_entities(num_predators, num_monsters, num_synthetics)
+        # optional core.replay.EventLog, records the run so it can be analysed or replayed later
+        self.replay = replay
+        if replay is not None:
+            replay.begin(width, height)
+            self.grid.listeners.append(replay)
+            self.hazard_generation.recorder = replay
+
+        #initialise entities, spawn=False leaves the world empty for core.snapshot to fill in
+        if spawn:
+            self._spawn_entities(num_predators, num_monsters, num_synthetics)
     
+    def _attach_policy(self, predator):
+        predator.q_learning = self.q_learning
+        predator.current_state = None
+        predator.last_action = None
+
+    def _learn(self, predator, state, action, reward, next_state):
+        if self.shared_policy:
+            self.q_learning.queue_update(state, action, reward, next_state)
+        else:
+            predator.q_learning.update(state, action, reward, next_state)
+
+    def _plan_actions(self):
+        """Shared policy: one batched choose_actions call for every living learning predator."""
+        clan = [p for p in self.predators if p.alive and p.q_learning is not None]
+        states = [self.q_learning.get_state(p, self) for p in clan]
+        actions = self.q_learning.choose_actions(states)
+        self.planned_actions = dict(zip(clan, zip(states, actions)))
+
     def _spawn_entities(self, num_predators, num_monsters, num_synthetics):
         
-        print("Spawning entities...")
+        self.events.emit('spawn', "Spawning entities...")
         
         
         x, y = self._find_empty_position()
-        dek = Predator(x, y, name="Dek", isDek=True)
+        dek = Predator(x, y, name="Dek", isDek=True, events=self.events)
        
 
-        dek.q_learning = self.q_learning
-        dek.current_state = None
-        dek.last_action = None
-        print(f"Dek has q learning ")
+        self._attach_policy(dek)
+        self.events.emit('spawn', "Dek has q learning ", level=DEBUG)
 
         self.grid.place_agent(dek, x, y)
-        self.predators.append(dek)
-        self.all_agents.append(dek)
-        print(f"  Spawned Dek at ({x}, {y})")
+        self.entities.add(dek)
+        self.events.emit('spawn', "  Spawned Dek at ({x}, {y})", x=x, y=y)
         
       
         x, y = self._find_empty_position()
-        brother = Predator(x, y, name="Brother", isDek=False)
+        brother = Predator(x, y, name="Brother", isDek=False, events=self.events)
+        if self.shared_policy:
+            self._attach_policy(brother)
         self.grid.place_agent(brother, x, y)
-        self.predators.append(brother)
-        self.all_agents.append(brother)
-        print(f"  Spawned Brother at ({x}, {y})")
+        self.entities.add(brother)
+        self.events.emit('spawn', "  Spawned Brother at ({x}, {y})", x=x, y=y)
         
         
         x, y = self._find_empty_position()
-        father = Predator(x, y, name="Father", isDek=False)
+        father = Predator(x, y, name="Father", isDek=False, events=self.events)
+        if self.shared_policy:
+            self._attach_policy(father)
         self.grid.place_agent(father, x, y)
-        self.predators.append(father)
-        self.all_agents.append(father)
-        print(f"  Spawned Father at ({x}, {y})")
+        self.entities.add(father)
+        self.events.emit('spawn', "  Spawned Father at ({x}, {y})", x=x, y=y)
         
        
         for i in range(max(0, num_predators - 3)):
             x, y = self._find_empty_position()
-            predator = Predator(x, y, name=f"Predator{i+1}", isDek=False)
+            predator = Predator(x, y, name=f"Predator{i+1}", isDek=False, events=self.events)
+            if self.shared_policy:
+                self._attach_policy(predator)
             self.grid.place_agent(predator, x, y)
-            self.predators.append(predator)
-            self.all_agents.append(predator)
-            print(f"  Spawned Predator{i+1} at ({x}, {y})")
+            self.entities.add(predator)
+            self.events.emit('spawn', "  Spawned {name} at ({x}, {y})", name=predator.name, x=x, y=y)
 
         
         # new spawn traps functionality
-        num_traps = random.randint(3, 5)  # More traps
+        num_traps = self.rng.spawn.randint(3, 5)  # More traps
         for i in range(num_traps):
             x, y = self._find_empty_position()
-            trap = Trap(x, y, symbol="!", name=f"Trap_{i+1}")
+            trap = Trap(x, y, symbol="!", name=f"Trap_{i+1}", events=self.events)
             #not goin to palce on the grid as its hidden
-            self.traps.append(trap)  
-            print(f"  Spawned {trap.name} at ({x}, {y}) [HIDDEN]")
+            self.entities.add(trap, acts=False)
+            self._index_trap(trap)
+            if self.replay is not None:
+                self.replay.register_hidden(trap)
+            self.events.emit('spawn', "  Spawned {name} at ({x}, {y}) [HIDDEN]", name=trap.name, x=x, y=y)
 
         
     
@@ -125,52 +203,49 @@ class Simulation:
             x, y = self._find_empty_position()
             is_boss = (i == 0)
             name = "Ultimate Adversary" if is_boss else f"Monster{i+1}"
-            monster = Monster(x, y, name=name, is_boss=is_boss)
+            monster = Monster(x, y, name=name, is_boss=is_boss, events=self.events)
             self.grid.place_agent(monster, x, y)
-            self.monsters.append(monster)
-            self.all_agents.append(monster)
-            print(f"  Spawned {name} at ({x}, {y})")
+            self.entities.add(monster)
+            self.events.emit('spawn', "  Spawned {name} at ({x}, {y})", name=name, x=x, y=y)
         
         
         x, y = self._find_empty_position()
-        thia = Synthetic(x, y, name="Thia", isThia=True)
+        thia = Synthetic(x, y, name="Thia", isThia=True, events=self.events)
         self.grid.place_agent(thia, x, y)
-        self.synthetics.append(thia)
-        self.all_agents.append(thia)
-        print(f"  Spawned Thia at ({x}, {y})")
+        self.entities.add(thia)
+        self.events.emit('spawn', "  Spawned Thia at ({x}, {y})", x=x, y=y)
         
         # Spawn resources
         if self.turn > 10:
-            num_resources = random.randint(1, 2)
+            num_resources = self.rng.spawn.randint(1, 2)
         elif self.turn > 30:
-            num_resources = random.randint(2, 4)
+            num_resources = self.rng.spawn.randint(2, 4)
         else:
-            num_resources = random.randint(4, 8)
+            num_resources = self.rng.spawn.randint(4, 8)
         resource_types = ["repair_kit", "stamina_boost", "med_kit", "sword_of_despair_and_destruction"]
         for i in range(num_resources):
             x, y = self._find_empty_position()
-            resource_type = random.choice(resource_types)
-            resource = Resource(x, y, resource_type=resource_type)
+            resource_type = self.rng.spawn.choice(resource_types)
+            resource = Resource(x, y, resource_type=resource_type, events=self.events)
             self.grid.place_agent(resource, x, y)
-            self.resources.append(resource)
-            print(f"  Spawned {resource.name} at ({x}, {y})")
+            self.entities.add(resource, acts=False)
+            self.events.emit('spawn', "  Spawned {name} at ({x}, {y})", name=resource.name, x=x, y=y)
         
-        print(f"\nTotal entities spawned: {len(self.all_agents)}")
+        self.events.emit('spawn', "\nTotal entities spawned: {count}", count=len(self.all_agents))
         
     def _find_empty_position(self):
 
         attempts = 0
         while attempts < 100:
-            x = random.randint(0, self.width - 1)
-            y = random.randint(0, self.height - 1)
+            x = self.rng.spawn.randint(0, self.width - 1)
+            y = self.rng.spawn.randint(0, self.height - 1)
             if self.grid.is_empty(x, y):
                 return x, y
             attempts += 1
         # Fallback: find first empty
-        for y in range(self.height):
-            for x in range(self.width):
-                if self.grid.is_empty(x, y):
-                    return x, y
+        empty = self.grid.empty_cells()
+        if empty:
+            return empty[0]
         raise Exception("Grid is full!")
     
     def _move_agent_smart(self, agent: Agent):
@@ -183,7 +258,7 @@ class Simulation:
         if isinstance(agent, Predator):
             if agent.stamina < 5:
                 agent.rest(10)
-                print(f"{agent.name} out of stamina, resting...")
+                self.events.emit('stamina', "{name} out of stamina, resting...", level=DEBUG, name=agent.name)
                 return False
         
         if isinstance(agent, Predator):
@@ -194,39 +269,48 @@ class Simulation:
         
         #onster hunt predators
         if isinstance(agent, Monster):
-            closest_predator = None
-            closest_dist = float('inf')
-            for pred in self.predators:
-                if pred.alive:  
-                    dist = MovementSystem.manattan_distance((agent.x, agent.y), (pred.x, pred.y))  # Fixed typo
-                    if dist < closest_dist:
-                        closest_dist = dist
-                        closest_predator = pred
+            closest_predator = self._find_nearest(agent, Predator)
             if closest_predator:
                 target = (closest_predator.x, closest_predator.y)
         
     
         if target:
-            success = MovementSystem.move_towards_target(agent, target, self.grid)  # Fixed typo
+            success = self._step_towards(agent, target)
             if success and isinstance(agent, Predator):
                 stamina_cost = 5
-                if hasattr(agent, 'loadCarrying') and agent.loadCarrying > 10:
+                if agent.loadCarrying > 10:
                     stamina_cost = 10
-                    print(f"{agent.name} is carrying a load, increased stamina cost!")
+                    self.events.emit('stamina', "{name} is carrying a load, increased stamina cost!",
+                                     level=DEBUG, name=agent.name)
                 agent.useStamina(stamina_cost)  
             return success
         
         #fa;ilback to random movement
         return self._move_agent_random(agent)
         
+    def _find_nearest(self, agent: Agent, kind, predicate=None):
+        """Closest living entity of the given type to agent (wrapping distance), or None."""
+        found = self.grid.spatial.nearest(agent.x, agent.y, kind=kind, predicate=predicate)
+        return found[0][1] if found else None
+
+    def _step_towards(self, agent: Agent, target):
+        """Move one step towards target using whichever pathfinding mode is on."""
+        if self.flow_field is not None:
+            next_pos = self.flow_field.next_step(agent, target, self.grid)
+            if next_pos:
+                return self.grid.move_agent(agent, next_pos[0], next_pos[1])
+            return False
+
+        return MovementSystem.move_towards_target(agent, target, self.grid, self.path_cache)
+
     def _move_agent_random(self, agent: Agent):
         """Move an agent to a random adjacent position."""
         if not agent.alive:
             return False
         
         
-        dx = random.choice([-1, 0, 1])
-        dy = random.choice([-1, 0, 1])
+        dx = self.rng.movement.choice([-1, 0, 1])
+        dy = self.rng.movement.choice([-1, 0, 1])
         
         new_x = agent.x + dx
         new_y = agent.y + dy
@@ -241,37 +325,33 @@ class Simulation:
        
         
      
-        for dx in [-1, 0, 1]:
-            for dy in [-1, 0, 1]:
-                if dx == 0 and dy == 0:
-                    continue
+        neighbours = self.grid.neighbours.positions(SCAN_ORDER)[agent.y * self.grid.width + agent.x]
+        for check_x, check_y in neighbours:
 
-                
-                if random.random() > 0.40:
+            
+            if self.rng.combat.random() > 0.40:
+    
+                return
+            
+            target = self.grid.grid[check_y][check_x]
+            
         
-                    return
-                
-                check_x = agent.x + dx
-                check_y = agent.y + dy
-                target = self.grid.get_cell(check_x, check_y)
-                
+            if target is None or isinstance(target, Trap):
+                continue
             
-                if target is None or isinstance(target, Trap):
-                    continue
-                
-               
-                if not hasattr(target, 'alive') or not target.alive:
-                    continue
-                
-                #see if they're enemies
-                if isinstance(agent, Predator) and isinstance(target, Monster):
+           
+            if not target.alive:
+                continue
+            
+            #see if they're enemies
+            if isinstance(agent, Predator) and isinstance(target, Monster):
+                self._resolve_combat(agent, target)
+            elif isinstance(agent, Monster) and isinstance(target, Predator):
+                self._resolve_combat(target, agent)
+            elif isinstance(agent, Predator) and isinstance(target, Synthetic):
+                if self.rng.combat.random() < 0.3: 
                     self._resolve_combat(agent, target)
-                elif isinstance(agent, Monster) and isinstance(target, Predator):
-                    self._resolve_combat(target, agent)
-                elif isinstance(agent, Predator) and isinstance(target, Synthetic):
-                    if random.random() < 0.3: 
-                        self._resolve_combat(agent, target)
-    
+
     def _resolve_combat(self, attacker: Agent, defender: Agent):
 
 
@@ -285,8 +365,7 @@ class Simulation:
                 honor_change, msg = ClanCode.calculate_honor_change(attacker, defender, "attack")
                 if honor_change != 0:
                     attacker.gain_honour(honor_change) if honor_change > 0 else attacker.lose_honour(abs(honor_change))
-                if msg:
-                    print(msg)
+                ClanCode.announce(attacker, msg)
                 return  
         
         self.stats['combats'] += 1
@@ -295,14 +374,16 @@ class Simulation:
         if isinstance(attacker, Monster):
             damage = attacker.damage
         elif isinstance(attacker, Predator):
-            base_damage = random.randint(20, 40)
+            base_damage = self.rng.combat.randint(20, 40)
             weapon_buff = getattr(attacker, 'weapon_damage_buff', 0)
             damage = base_damage + weapon_buff
         else:
-            damage = random.randint(10, 20)
+            damage = self.rng.combat.randint(10, 20)
         
         # apply damage
         still_alive = defender.take_damage(damage)
+        if self.replay is not None:
+            self.replay.combat(attacker, defender, damage)
         
         
         if isinstance(defender, Synthetic):
@@ -310,15 +391,21 @@ class Simulation:
         
         # Only print combat messages occasionally to reduce spam
         if self.turn - self.last_combat_message_turn >= self.combat_message_cooldown or not still_alive:
-            print(f"  ⚔️  {attacker.name} attacks {defender.name} for {damage} damage!")
+            self.events.emit('combat', "  ⚔️  {attacker} attacks {defender} for {damage} damage!",
+                             attacker=attacker.name, defender=defender.name, damage=damage)
             self.last_combat_message_turn = self.turn
         
         if not still_alive:
+            self._agent_died(defender)
             self.stats['deaths'] += 1
-            print(f"{defender.name} has been defeated!")
+            self.events.emit('kill', "{name} has been defeated!", level=WARNING, name=defender.name)
+            if self.replay is not None:
+                self.replay.kill(attacker, defender)
             
       
             self.grid.remove_agent(defender)
+            if self.path_cache is not None:
+                self.path_cache.invalidate(defender)
             
             
             if isinstance(attacker, Predator):
@@ -331,8 +418,7 @@ class Simulation:
                 else:
                     attacker.lose_honour(abs(honor_change))
                 
-                if msg:
-                    print(msg)
+                ClanCode.announce(attacker, msg)
                 
                 self.stats['kills'] += 1
             
@@ -340,36 +426,45 @@ class Simulation:
 
 
             # ql earning reward for Dek
-        if attacker.isDek and hasattr(attacker, 'q_learning'):
+        if isinstance(attacker, Predator) and attacker.q_learning is not None:
             if attacker.current_state and attacker.last_action:
                 action_result = 'killed_boss' if (isinstance(defender, Monster) and defender.is_boss) else 'killed_monster'
                 next_state = attacker.q_learning.get_state(attacker, self)
                 reward = attacker.q_learning.get_reward(attacker, action_result)
-                attacker.q_learning.update(attacker.current_state, attacker.last_action, reward, next_state)
+                self._learn(attacker, attacker.current_state, attacker.last_action, reward, next_state)
                 
 
 
     
     def _update_agents(self):
         """Update all agents (movement, combat, etc.)."""
+        self.events.turn = self.turn
+        if self.replay is not None:
+            self.replay.turn = self.turn
+        if self.flow_field is not None:
+            self.flow_field.start_turn(self.turn)
       
-        random.shuffle(self.all_agents)
-        
-        for agent in self.all_agents[:]:  # Copy list to avoid modification issues
-            if not agent.alive:
+        self.entities.start_turn(self.rng.movement)
+        if self.shared_policy:
+            self._plan_actions()
+        
+        # nobody joins or leaves turn_order mid turn (the dead are swept out at the next start_turn)
+        entities = self.entities.entities
+        for entity_id in self.entities.turn_order:
+            agent = entities.get(entity_id)
+            if agent is None or not agent.alive:
                 continue
             # Move agent
             moved = False
             # if isinstance(agent, Predator) and agent.isDek:
-            #     print(f"[debug] Dek's turn hasattr q_learning: {hasattr(agent, 'q_learning')}")
 
-            # Use Q-learning for Dek
-            if isinstance(agent, Predator) and agent.isDek and hasattr(agent, 'q_learning'):
-                moved = self._dek_q_learning_actions(agent)
+            # Use Q-learning for Dek (and the whole clan with a shared policy)
+            if isinstance(agent, Predator) and agent.q_learning is not None:
+                moved = self._q_learning_actions(agent)
                 if moved:
                     self._check_traps(agent)
                     self._check_resources(agent)
-            elif random.random() < 0.7:
+            elif self.rng.movement.random() < 0.7:
                 moved = self._move_agent_smart(agent)
                 if moved:
                     self._check_traps(agent)
@@ -388,7 +483,8 @@ class Simulation:
                             distance = abs(agent.x - synthetic.x) + abs(agent.y - synthetic.y) 
                             if distance <= 1:
                                 if agent.carry_synthetic(synthetic):
-                                    print(f"  {agent.name} picked up {synthetic.name}!")
+                                    self.events.emit('carry', "  {name} picked up {synthetic}!",
+                                                     name=agent.name, synthetic=synthetic.name)
                                 break
                 
             
@@ -403,8 +499,10 @@ class Simulation:
             # u[date for new procedural hazards
                 hit, damage, hazard_type = self.hazard_generation.check_hazard_damage(agent)
                 if hit:
-                    agent.take_damage(damage)
-                    print(f"{agent.name} hit by {hazard_type} for {damage} damage!")
+                    if not agent.take_damage(damage):
+                        self._agent_died(agent)
+                    self.events.emit('hazard', "{name} hit by {hazard} for {damage} damage!",
+                                     name=agent.name, hazard=hazard_type, damage=damage)
 
 
             # occasionalyl challeng eto reduce spam 
@@ -427,13 +525,17 @@ class Simulation:
             if isinstance(agent, Synthetic) and agent.isThia:
                 agent.judge_damage()
 
+        # the clan's transitions from this turn go into the shared table in one go
+        if self.shared_policy:
+            self.q_learning.apply_updates()
+
     def _apply_weather_effects(self):
         """Apply weather effects to all agents."""
         # Update weather every 10 turns
         if self.turn % 10 == 0:
-            self.current_weather = self.grid.weather_system()
+            self.current_weather = self.grid.weather_system(self.rng.weather)
             if self.turn > 0:  # Don't print on turn 0
-                print(f"\n Weather changed: {self.current_weather}")
+                self.events.emit('weather', "\n Weather changed: {weather}", weather=self.current_weather)
         
         # Effects everyone
         if self.current_weather == "hot":
@@ -448,39 +550,52 @@ class Simulation:
         elif self.current_weather == "thunder_storm":
             # Random damage chance due to reduced visibility
             for agent in self.all_agents:
-                if agent.alive and random.random() < 0.1:
-                    agent.take_damage(5)
+                if agent.alive and self.rng.weather.random() < 0.1:
+                    if not agent.take_damage(5):
+                        self._agent_died(agent)
+
 
 
+    def _index_trap(self, trap):
+        if not trap.is_triggered:
+            self.trap_index.setdefault((trap.x, trap.y), []).append(trap)
 
     def _check_traps(self, agent):
         """Check if agent stepped on a trap and trigger it."""
         if not agent.alive:
             return
         
-      
-        for trap in self.traps[:]: 
-            if trap.x == agent.x and trap.y == agent.y and not trap.is_triggered:
-                print(f"{agent.name} stepped on {trap.name}!")
-                
-                damage = trap.damage()
-                still_alive = agent.take_damage(damage)
-                trap.is_triggered = True
-                print(f"Trap deals {damage} damage! {agent.name} HP: {agent.health}/{agent.max_health}")
-                # preds loose honor for triggering traps
-                if isinstance(agent, Predator):
-                    agent.lose_honour(5)
-                    print(f"{agent.name} loses 5 honour for carelessness!")
-                if not still_alive:
-                    print(f" {agent.name} was killed by the trap!")
-                    self._remove_dead_agent(agent)
-                
-                break  
+        traps = self.trap_index.get((agent.x, agent.y))
+        if not traps:
+            return
+
+        # the first untriggered trap on the cell goes off and leaves the index
+        trap = traps.pop(0)
+        if not traps:
+            del self.trap_index[(agent.x, agent.y)]
+        self.events.emit('trap', "{name} stepped on {trap}!", name=agent.name, trap=trap.name)
+        
+        damage = trap.damage()
+        still_alive = agent.take_damage(damage)
+        trap.is_triggered = True
+        if self.replay is not None:
+            self.replay.trap(agent, trap, damage)
+        self.events.emit('trap', "Trap deals {damage} damage! {name} HP: {health}/{max_health}",
+                         damage=damage, name=agent.name, health=agent.health, max_health=agent.max_health)
+        # preds loose honor for triggering traps
+        if isinstance(agent, Predator):
+            agent.lose_honour(5)
+            self.events.emit('honour', "{name} loses 5 honour for carelessness!", name=agent.name)
+        if not still_alive:
+            self.events.emit('kill', " {name} was killed by the trap!", level=WARNING, name=agent.name)
+            self._remove_dead_agent(agent)
 
     def weather_update(self):
         if self.turn % 10 == 0:
-            self.current_weather = self.grid.weather_system()
-            print(f"Weather changed: {self.current_weather}")
+            self.current_weather = self.grid.weather_system(self.rng.weather)
+            self.events.emit('weather', "Weather changed: {weather}", weather=self.current_weather)
+            if self.replay is not None:
+                self.replay.weather(self.current_weather)
 
         for agent in self.all_agents:
             if not agent.alive:
@@ -489,29 +604,37 @@ class Simulation:
                 if self.current_weather == "hot":
                     agent.useStamina(2)
                     if agent.stamina < 20:
-                        print(f"{agent.name} is struggling in the heat, stamina reduced to {agent.stamina}. They must rest")
+                        self.events.emit('weather', "{name} is struggling in the heat, stamina reduced to {stamina}. They must rest",
+                                         name=agent.name, stamina=agent.stamina)
                         agent.rest(10)
                 if self.current_weather == "cold":
                     agent.useStamina(1) #need to update this
 
                 elif self.current_weather == "thunder_storm":
                 #STRIKE BY LIGHTNING
-                    if random.random() < 0.15: 
-                        damage = random.randint(5, 10)
-                        agent.take_damage(damage)
-                        print(f" {agent.name} was struck by lightning for {damage} damage!")   
-
+                    if self.rng.weather.random() < 0.15: 
+                        damage = self.rng.weather.randint(5, 10)
+                        if not agent.take_damage(damage):
+                            self._agent_died(agent)
+                        self.events.emit('weather', " {name} was struck by lightning for {damage} damage!",
+                                         name=agent.name, damage=damage)
+
+
+    def _agent_died(self, agent):
+        """
+        Count a death. Hazard and weather deaths stay on the grid, so the spatial index is told
+        its alive only counts changed (Qlearning.get_state's memo is keyed on its version).
+        """
+        self.grid.spatial.mark_changed()
+        self.entities.died(agent)
 
     def _remove_dead_agent(self, agent):
         #helper method to remove dead agents from simulation
         self.grid.remove_agent(agent)
+        if self.path_cache is not None:
+            self.path_cache.invalidate(agent)
         
-        if isinstance(agent, Predator) and agent in self.predators:
-            self.predators.remove(agent)
-        elif isinstance(agent, Monster) and agent in self.monsters:
-            self.monsters.remove(agent)
-        elif isinstance(agent, Synthetic) and agent in self.synthetics:
-            self.synthetics.remove(agent)
+        self.entities.remove(agent)
 
 
     def _check_resources(self, agent):
@@ -524,50 +647,51 @@ class Simulation:
      
                 
     
-        for dx in [-1, 0, 1]:
-            for dy in [-1, 0, 1]:
-                check_x = agent.x + dx
-                check_y = agent.y + dy
-                resource_cell = self.grid.get_cell(check_x, check_y)
-
-         
-                if resource_cell is None:
-                    continue
-                
-               
-                if isinstance(resource_cell, Resource) and not resource_cell.collected:
-                    if agent.collect_resource(resource_cell):
-                        self.grid.remove_agent(resource_cell)
-                        if resource_cell in self.resources:
-                            self.resources.remove(resource_cell)
-                        self.stats['resources_collected'] += 1
-                        print(f"  📦 {agent.name} collected {resource_cell.name}!")
-                        
-                       
-                        if resource_cell.resource_type == "sword_of_despair_and_destruction":
-                            #equip weapon immediately
+        # the agent's own cell holds the agent, so only the 8 round it can have a resource
+        neighbours = self.grid.neighbours.positions(SCAN_ORDER)[agent.y * self.grid.width + agent.x]
+        for check_x, check_y in neighbours:
+            resource_cell = self.grid.grid[check_y][check_x]
+
+     
+            if resource_cell is None:
+                continue
+            
+           
+            if isinstance(resource_cell, Resource) and not resource_cell.collected:
+                if agent.collect_resource(resource_cell):
+                    if self.replay is not None:
+                        self.replay.pickup(agent, resource_cell)
+                    self.grid.remove_agent(resource_cell)
+                    self.entities.remove(resource_cell)
+                    self.stats['resources_collected'] += 1
+                    self.events.emit('resource', "  📦 {name} collected {resource}!",
+                                     name=agent.name, resource=resource_cell.name)
+                    
+                   
+                    if resource_cell.resource_type == "sword_of_despair_and_destruction":
+                        #equip weapon immediately
+                        resource_cell.use(agent)
+                    elif resource_cell.resource_type == "med_kit":
+                    
+                        if agent.health < agent.max_health:
                             resource_cell.use(agent)
-                        elif resource_cell.resource_type == "med_kit":
-                        
-                            if agent.health < agent.max_health:
-                                resource_cell.use(agent)
-                                if hasattr(agent, 'inventory') and resource_cell in agent.inventory:
-                                    agent.inventory.remove(resource_cell)
-                                    agent.loadCarrying = max(0, agent.loadCarrying - 10)
-                        elif resource_cell.resource_type == "stamina_boost":
-                            #us estamina boost if not full
-                            if agent.stamina < agent.maxStamina:
-                                resource_cell.use(agent)
-                               
-                                if hasattr(agent, 'inventory') and resource_cell in agent.inventory:
-                                    agent.inventory.remove(resource_cell)
-                                    agent.loadCarrying = max(0, agent.loadCarrying - 10)
-                       
-                        
-                        return True
+                            if resource_cell in agent.inventory:
+                                agent.inventory.remove(resource_cell)
+                                agent.loadCarrying = max(0, agent.loadCarrying - 10)
+                    elif resource_cell.resource_type == "stamina_boost":
+                        #us estamina boost if not full
+                        if agent.stamina < agent.maxStamina:
+                            resource_cell.use(agent)
+                           
+                            if resource_cell in agent.inventory:
+                                agent.inventory.remove(resource_cell)
+                                agent.loadCarrying = max(0, agent.loadCarrying - 10)
+                   
+                    
+                    return True
         
         
-        if hasattr(agent, 'inventory') and agent.inventory:
+        if agent.inventory:
             for synthetic in self.synthetics:
                 if synthetic.isThia and synthetic.isDamaged:
                 
@@ -589,120 +713,90 @@ class Simulation:
         
         return False
 
-    def _dek_q_learning_actions(self, dek):
-        """Use Q-Learning to decide and execute Dek's action."""
-        if not hasattr(dek, 'q_learning'):
+    def _q_learning_actions(self, predator):
+        """Use Q-Learning to decide and execute a learning predator's action (Dek, or any of a shared policy clan)."""
+        if predator.q_learning is None:
             return False
             
-        current_state = dek.q_learning.get_state(dek, self)
-        action = dek.q_learning.choose_action(current_state)
+        planned = self.planned_actions.pop(predator, None)
+        if planned is not None:
+            current_state, action = planned
+        else:
+            current_state = predator.q_learning.get_state(predator, self)
+            action = predator.q_learning.choose_action(current_state)
         
         if self.turn % 5 == 0:
-            print(f"Dek Q-Learning: chose '{action}' in state {current_state}")
+            self.events.emit('learning', "{name} Q-Learning: chose '{action}' in state {state}",
+                             level=DEBUG, name=predator.name, action=action, state=current_state)
 
         action_result = 'moved'
 
     
         if action == "hunt_boss":
-            closest_monster = None
-            closest_dist = float('inf')
-            for monster in self.monsters:  
-                if monster.is_boss and monster.alive: 
-                    dist = abs(monster.x - dek.x) + abs(monster.y - dek.y)
-                    if dist < closest_dist:
-                        closest_dist = dist
-                        closest_monster = monster
+            closest_monster = self._find_nearest(predator, Monster, lambda m: m.is_boss)
             
             if closest_monster:
                 target = (closest_monster.x, closest_monster.y)
-                if MovementSystem.move_towards_target(dek, target, self.grid):
-                    dek.useStamina(5)
+                if self._step_towards(predator, target):
+                    predator.useStamina(5)
                     action_result = 'moved'
         
         elif action == "hunt_monster":
-            closest_monster = None
-            closest_dist = float('inf')
-            for monster in self.monsters:
-                if not monster.is_boss and monster.alive:
-                    dist = abs(monster.x - dek.x) + abs(monster.y - dek.y)
-                    if dist < closest_dist:
-                        closest_dist = dist
-                        closest_monster = monster
+            closest_monster = self._find_nearest(predator, Monster, lambda m: not m.is_boss)
             
             if closest_monster:
                 target = (closest_monster.x, closest_monster.y)
-                if MovementSystem.move_towards_target(dek, target, self.grid):
-                    dek.useStamina(5)
+                if self._step_towards(predator, target):
+                    predator.useStamina(5)
                     action_result = 'moved'
         
         elif action == 'rest':
-            if dek.stamina < dek.maxStamina:
-                dek.rest(20)
+            if predator.stamina < predator.maxStamina:
+                predator.rest(20)
                 action_result = 'healed'
             else:
                 action_result = 'wasted_action'
         
         elif action == 'collect_resource':
-            closest_resource = None
-            closest_dist = float('inf')
-            for resource in self.resources:
-                if not resource.collected:
-                    dist = abs(resource.x - dek.x) + abs(resource.y - dek.y)
-                    if dist < closest_dist:
-                        closest_dist = dist
-                        closest_resource = resource
+            closest_resource = self._find_nearest(predator, Resource, lambda r: not r.collected)
             
             if closest_resource:
                 target = (closest_resource.x, closest_resource.y)
-                if MovementSystem.move_towards_target(dek, target, self.grid):
-                    dek.useStamina(3)
+                if self._step_towards(predator, target):
+                    predator.useStamina(3)
                     action_result = 'moved'
         
         elif action == 'seek_thia':
             thia = next((s for s in self.synthetics if s.isThia and s.alive), None)
             if thia:
                 target = (thia.x, thia.y)
-                if MovementSystem.move_towards_target(dek, target, self.grid):
-                    dek.useStamina(5)
+                if self._step_towards(predator, target):
+                    predator.useStamina(5)
                     action_result = 'moved'
         
         elif action == 'avoid_danger':
-            best_dx, best_dy = 0, 0
+            new_x, new_y = predator.x, predator.y
             best_score = -999
             
-            for dx in [-1, 0, 1]:
-                for dy in [-1, 0, 1]:
-                    if dx == 0 and dy == 0:
-                        continue
-                    
-                    test_x = dek.x + dx
-                    test_y = dek.y + dy
-                    
-                    monster_count = 0
-                    for monster in self.monsters:
-                        if monster.alive:
-                            dist = abs(monster.x - test_x) + abs(monster.y - test_y)
-                            if dist < 3:
-                                monster_count += 1
-                    
-                    score = -monster_count
-                    if score > best_score:
-                        best_score = score
-                        best_dx, best_dy = dx, dy
+            for test_x, test_y in self.grid.neighbours.positions(SCAN_ORDER)[predator.y * self.grid.width + predator.x]:
+                monster_count = self.grid.spatial.count_within(test_x, test_y, 2, kind=Monster)
+                
+                score = -monster_count
+                if score > best_score:
+                    best_score = score
+                    new_x, new_y = test_x, test_y
             
-            new_x = dek.x + best_dx
-            new_y = dek.y + best_dy
-            if self.grid.move_agent(dek, new_x, new_y):
-                dek.useStamina(3)
+            if self.grid.move_agent(predator, new_x, new_y):
+                predator.useStamina(3)
                 action_result = 'moved'
         
         # Update Q-table
-        next_state = dek.q_learning.get_state(dek, self)
-        reward = dek.q_learning.get_reward(dek, action_result)
-        dek.q_learning.update(current_state, action, reward, next_state)
+        next_state = predator.q_learning.get_state(predator, self)
+        reward = predator.q_learning.get_reward(predator, action_result)
+        self._learn(predator, current_state, action, reward, next_state)
         
-        dek.current_state = next_state
-        dek.last_action = action
+        predator.current_state = next_state
+        predator.last_action = action
         
         return True
 
@@ -715,36 +809,44 @@ class Simulation:
     def _check_win_conditions(self):
         """Check if simulation should end."""
 
-        alive_monsters = [m for m in self.monsters if m.alive]
-        if len(alive_monsters) == 0:
-            print("\n🎉 All monsters defeated! Predators win!")
+        if self.entities.alive_count(Monster) == 0:
+            self.events.emit('end', "\n🎉 All monsters defeated! Predators win!", level=WARNING)
             return True
         
         # seen if all predators are dead
-        alive_predators = [p for p in self.predators if p.alive]
-        if len(alive_predators) == 0:
-            print("\nAll predators defeated! Monsters win!")
+        if self.entities.alive_count(Predator) == 0:
+            self.events.emit('end', "\nAll predators defeated! Monsters win!", level=WARNING)
             return True
         
         return False
     
+    def _report(self, *lines):
+        """Emit pre formatted report lines (banners, stats, the grid)."""
+        for line in lines:
+            self.events.emit('report', line)
+
+    def _display(self, heading):
+        # rendering the grid is the expensive bit, skip it when nobody is listening
+        if self.events.enabled(INFO):
+            self._report(heading, self.grid.render())
+
     def run(self, display_every=5, max_turns=100):
        
-        print("\n" + "="*20)
-        print("PREDATOR: BADLANDS SIMULATION")
-        print("="*20)
-        print(f"Grid: {self.width}x{self.height}")
-        print(f"Max turns: {max_turns}")
-        print("="*20 + "\n")
+        if self.events.enabled(INFO):
+            self._report("\n" + "="*20,
+                         "PREDATOR: BADLANDS SIMULATION",
+                         "="*20,
+                         f"Grid: {self.width}x{self.height}",
+                         f"Max turns: {max_turns}",
+                         "="*20 + "\n")
         
         self.max_turns = max_turns
         if display_every > 0:
-            print(f"\n--- Turn 0 (Initial State) ---")
-            self.grid.display()
+            self._display(f"\n--- Turn 0 (Initial State) ---")
             self._print_stats()
         
-        #main simulation loop
-        for turn in range(1, max_turns + 1):
+        #main simulation loop, carries on from self.turn for a restored snapshot
+        for turn in range(self.turn + 1, max_turns + 1):
             self.turn = turn
             self.stats['turns'] = turn
             
@@ -757,8 +859,7 @@ class Simulation:
             
             #periodically display
             if display_every > 0 and turn % display_every == 0:
-                print(f"\n--- Turn {turn} ---")
-                self.grid.display()
+                self._display(f"\n--- Turn {turn} ---")
                 self._print_stats()
             
             #check win conditions
@@ -772,71 +873,86 @@ class Simulation:
 
             
         
+        if self.replay is not None:
+            self.replay.flush()
+
+        # moves Dek's epsilon / learning rate schedules on and records convergence telemetry
+        self.q_learning.end_episode()
+
         #final display
-        print(f"\n--- Final State (Turn {self.turn}) ---")
-        self.grid.display()
+        self._display(f"\n--- Final State (Turn {self.turn}) ---")
         self._print_final_stats()
 
    
 
         dek = next((p for p in self.predators if p.isDek), None)
-        if dek and hasattr(dek, 'q_learning'):
-            print(f"QLEARNING STATS:")
-            print(f"table size: {len(dek.q_learning.q_table)} states learned")
-            print(f" Epsilon: {dek.q_learning.epsilon}")
+        if dek and dek.q_learning is not None and self.events.enabled(INFO):
+            self._report(f"QLEARNING STATS:",
+                         f"table size: {len(dek.q_learning.q_table)} states learned",
+                         f" Epsilon: {dek.q_learning.epsilon}")
             if len(dek.q_learning.q_table) > 0:
-                print(f"   Sample states explored:")
+                self._report(f"   Sample states explored:")
                 for i, (state, actions) in enumerate(list(dek.q_learning.q_table.items())[:3]):
                     best_action = max(actions, key=actions.get)
                     best_value = actions[best_action]
-                    print(f"     State {state}: Best action = {best_action} (Q={best_value:.2f})")
+                    self._report(f"     State {state}: Best action = {best_action} (Q={best_value:.2f})")
         
     def _print_stats(self):
         """Print current simulation statistics."""
-        alive_predators = len([p for p in self.predators if p.alive])
-        alive_monsters = len([m for m in self.monsters if m.alive])
-        alive_synthetics = len([s for s in self.synthetics if s.alive])
+        if not self.events.enabled(INFO):
+            return
+
+        alive_predators = self.entities.alive_count(Predator)
+        alive_monsters = self.entities.alive_count(Monster)
+        alive_synthetics = self.entities.alive_count(Synthetic)
         
-        print(f"\nStatistics:")
-        print(f"  Turn: {self.turn}, Weather is {self.current_weather}")
-        print(f"  Alive - Predators: {alive_predators}, Monsters: {alive_monsters}, Synthetics: {alive_synthetics}")
-        print(f"  Combats: {self.stats['combats']}, Kills: {self.stats['kills']}, Deaths: {self.stats['deaths']}")
-        print(f"  Resources collected: {self.stats['resources_collected']}, Remaining: {len(self.resources)}")
-        print(f"  Traps: {len([t for t in self.traps if not t.is_triggered])}  /  {len(self.traps)} active")
+        self._report(f"\nStatistics:",
+                     f"  Turn: {self.turn}, Weather is {self.current_weather}",
+                     f"  Alive - Predators: {alive_predators}, Monsters: {alive_monsters}, Synthetics: {alive_synthetics}",
+                     f"  Combats: {self.stats['combats']}, Kills: {self.stats['kills']}, Deaths: {self.stats['deaths']}",
+                     f"  Resources collected: {self.stats['resources_collected']}, Remaining: {len(self.resources)}",
+                     f"  Traps: {sum(len(traps) for traps in self.trap_index.values())}  /  {len(self.traps)} active")
         
         # Show predator honor
         if self.predators:
-            print(f"\n  Predator Status:")
+            self._report(f"\n  Predator Status:")
             for pred in self.predators:
                 if pred.alive:
-                    print(f"    {pred.name}: HP {pred.health}/{pred.max_health} , Stamina: {pred.stamina} "
-                          f"Honor {pred.honour} ({pred.get_honour_rank()}), Kills: {pred.kills}")
+                    self._report(f"    {pred.name}: HP {pred.health}/{pred.max_health} , Stamina: {pred.stamina} "
+                                 f"Honor {pred.honour} ({pred.get_honour_rank()}), Kills: {pred.kills}")
     
     def _print_final_stats(self):
         """Print final simulation statistics."""
-        print("\n" + "="*50)
-        print("FINAL STATISTICS")
+        if not self.events.enabled(INFO):
+            return
+
+        self._report("\n" + "="*50, "FINAL STATISTICS")
         self._print_stats()
+        if self.path_cache is not None:
+            cache_stats = self.path_cache.stats()
+            self._report(f"  Path cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                         f"({cache_stats['hit_rate']:.0%} reused), "
+                         f"{cache_stats['skipped_searches']} searches skipped after no path")
         
     
     def test_scan(self):
         """Test the scanning functionality of synthetics."""
-        print("\n--- Testing Scan Functionality ---")
+        self._report("\n--- Testing Scan Functionality ---")
         for synthetic in self.synthetics:
             if synthetic.alive and synthetic.isThia:
-                print(f"\n{synthetic.name} scanning area...")
+                self._report(f"\n{synthetic.name} scanning area...")
                 results = synthetic.scan_area(self.grid, scan_range=3)
                 
-                print(f"  Monsters detected: {len(results['monsters'])}")
+                self._report(f"  Monsters detected: {len(results['monsters'])}")
                 for m in results['monsters']:
-                    print(f"    - {m['name']} at {m['position']} (distance: {m['distance']})")
+                    self._report(f"    - {m['name']} at {m['position']} (distance: {m['distance']})")
                 
-                print(f"  Predators detected: {len(results['predators'])}")
+                self._report(f"  Predators detected: {len(results['predators'])}")
                 for p in results['predators']:
-                    print(f"    - {p['name']} at {p['position']} (distance: {p['distance']})")
+                    self._report(f"    - {p['name']} at {p['position']} (distance: {p['distance']})")
                 
                 if results['boss']:
-                    print(f"BOSS SEEN: {results['boss']['name']} at {results['boss']['position']}!")
+                    self._report(f"BOSS SEEN: {results['boss']['name']} at {results['boss']['position']}!")
                 
                 break
 
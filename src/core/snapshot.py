@@ -0,0 +1,387 @@
+"""
+Save and restore the full state of a Simulation mid run.
+The format is a small header plus zlib compressed JSON of explicitly listed fields,
+not a pickle of the object graph, so it is versioned, compact and safe to load.
+A restored simulation carries on exactly as the original would have.
+
+Versions: 1 is the original format, 2 adds the Qlearning schedules, episode and step
+counters, visit counts (and the dense table's per action visits) and convergence telemetry.
+Version 1 snapshots still load, with those starting from scratch. The oldest version 1
+snapshots keep plain entity lists instead of the entity store and its ids, restore()
+rebuilds the store from them (see _store_from_lists).
+"""
+
+import json
+import struct
+import zlib
+
+import numpy as np
+
+from core.simulation import Simulation
+from entities.predator import Predator
+from entities.monster import Monster
+from entities.synthetics import Synthetic
+from entities.trap import Trap
+from entities.resource import Resource
+from generation.hazards import DynamicHazards
+from generation.procedural import TerrainParams, generate_terrain
+from ai.schedules import schedule_from_config
+
+FORMAT_VERSION = 2
+MAGIC = b'BSNP'
+HEADER = struct.Struct('<4sH')  # magic, version
+
+# the fields saved for each kind of entity, anything not listed here isnt saved
+AGENT_FIELDS = ('x', 'y', 'symbol', 'name', 'health', 'max_health', 'alive',
+                'stamina', 'max_stamina', 'honor')
+PREDATOR_FIELDS = ('maxStamina', 'honour', 'role', 'dek_relationship', 'respect_threshhold',
+                   'trophies', 'kills', 'loadCarrying', 'encumbered', 'weapon_damage_buff', 'max_inventory')
+MONSTER_FIELDS = ('damage',)
+SYNTHETIC_FIELDS = ('isDamaged',)
+TRAP_FIELDS = ('is_triggered',)
+RESOURCE_FIELDS = ('damage_boost', 'heal_amount', 'stamina_amount', 'collected')
+# added to Dek by the experiment runner
+TRACKING_FIELDS = ('honour_history', 'health_history', 'stamina_history', 'kill_history')
+
+HAZARD_FIELDS = ('type', 'x', 'y', 'intensity', 'age', 'active', 'growth_rate', 'max_intensity')
+
+SIM_FIELDS = ('turn', 'max_turns', 'running', 'current_weather', 'last_combat_message_turn',
+              'combat_message_cooldown', 'challenge_cooldown')
+
+
+def _rng_state_to_json(state):
+    version, internal, gauss = state
+    return [version, list(internal), gauss]
+
+
+def _rng_state_from_json(state):
+    version, internal, gauss = state
+    return (version, tuple(internal), gauss)
+
+
+class _EntityTable:
+    """Gives every entity reachable from the simulation a reference number."""
+
+    def __init__(self):
+        self.refs = {}
+        self.entries = []
+
+    def ref(self, entity):
+        if entity is None:
+            return None
+        ref = self.refs.get(entity)
+        if ref is None:
+            ref = len(self.entries)
+            self.refs[entity] = ref
+            self.entries.append(None)  # reserve the slot before following references
+            self.entries[ref] = self._encode(entity)
+        return ref
+
+    def _encode(self, entity):
+        data = {field: getattr(entity, field) for field in AGENT_FIELDS}
+        data['id'] = entity.entity_id
+
+        if isinstance(entity, Predator):
+            data['kind'] = 'predator'
+            data['isDek'] = entity.isDek
+            data.update({field: getattr(entity, field) for field in PREDATOR_FIELDS})
+            data['inventory'] = [self.ref(item) for item in entity.inventory]
+            data['carrying_target'] = self.ref(entity.carrying_target)
+            # Dek (or the whole clan with a shared policy) shares the simulation's Qlearning
+            data['q_learning'] = entity.q_learning is not None
+            if data['q_learning']:
+                data['current_state'] = list(entity.current_state) if entity.current_state else None
+                data['last_action'] = entity.last_action
+            for field in TRACKING_FIELDS:
+                if getattr(entity, field) is not None:
+                    data[field] = list(getattr(entity, field))
+        elif isinstance(entity, Monster):
+            data['kind'] = 'monster'
+            data['is_boss'] = entity.is_boss
+            data.update({field: getattr(entity, field) for field in MONSTER_FIELDS})
+        elif isinstance(entity, Synthetic):
+            data['kind'] = 'synthetic'
+            data['isThia'] = entity.isThia
+            data.update({field: getattr(entity, field) for field in SYNTHETIC_FIELDS})
+        elif isinstance(entity, Trap):
+            data['kind'] = 'trap'
+            data.update({field: getattr(entity, field) for field in TRAP_FIELDS})
+        elif isinstance(entity, Resource):
+            data['kind'] = 'resource'
+            data['resource_type'] = entity.resource_type
+            data.update({field: getattr(entity, field) for field in RESOURCE_FIELDS})
+        else:
+            raise ValueError(f"Can't snapshot entity of type {type(entity).__name__}")
+
+        return data
+
+
+def _schedule_config(schedule):
+    return schedule.to_config() if schedule is not None else None
+
+
+def snapshot(sim: Simulation) -> bytes:
+    """Encode the complete state of sim. Take it between turns, not halfway through one."""
+    table = _EntityTable()
+
+    state = {
+        'config': {
+            'width': sim.width,
+            'height': sim.height,
+            'occupancy': sim.grid.occupancy is not None,
+            'path_cache': sim.path_cache is not None,
+            'replan_distance': sim.path_cache.max_goal_drift if sim.path_cache is not None else 2,
+            'pathfinding': 'flow_field' if sim.flow_field is not None else 'astar',
+            'q_backend': sim.q_learning.backend,
+            'shared_policy': sim.shared_policy,
+            'hazard_field': sim.hazard_generation.field is not None,
+            # terrain is rebuilt from its seed and params, the noise is deterministic
+            'terrain': ({'seed': sim.grid.terrain.seed, 'params': list(sim.grid.terrain.params)}
+                        if sim.grid.terrain is not None else None),
+            # schedules are saved as their class name and arguments, custom ones have to be passed to restore()
+            'schedules': {
+                'epsilon': _schedule_config(sim.q_learning.epsilon_schedule),
+                'learning_rate': _schedule_config(sim.q_learning.learning_rate_schedule),
+                'per': sim.q_learning.schedule_per,
+            },
+        },
+        'seed': sim.seed,
+        'rng': {name: _rng_state_to_json(value) for name, value in sim.rng.getstate().items()},
+        'stats': dict(sim.stats),
+        'last_challenge_turn': dict(sim.last_challenge_turn),
+    }
+    state.update({field: getattr(sim, field) for field in SIM_FIELDS})
+
+    # the store's entities in the order they were added (which is the order of every per kind view),
+    # plus its turn order of ids
+    state['store'] = sim.entities.getstate()
+    state['store']['entities'] = [table.ref(entity) for entity in sim.entities.entities.values()]
+
+    # grid contents in spatial hash bucket order, so nearest lookups break ties the same way after a restore
+    state['grid'] = [table.ref(agent) for bucket in sim.grid.spatial.buckets.values() for agent in bucket]
+
+    hazards = sim.hazard_generation
+    state['hazards'] = {
+        'generation_rate': hazards.generation_rate,
+        'max_concurrent_hazards': hazards.max_concurrent_hazards,
+        'hazards': [dict({field: getattr(h, field) for field in HAZARD_FIELDS},
+                         affected_tiles=[list(tile) for tile in h.affected_tiles])
+                    for h in hazards.hazards],
+    }
+    if hazards.field is not None:
+        state['hazards']['field_layers'] = {hazard_type: layer.tolist()
+                                            for hazard_type, layer in hazards.field.layers.items()}
+
+    q = sim.q_learning
+    state['q_learning'] = {
+        'learning_rate': q.learning_rate,
+        'discount': q.discount,
+        'epsilon': q.epsilon,
+        'q_table': [[list(s), values] for s, values in q.q_table.items()],
+        'episodes': q.episodes,
+        'steps': q.steps,
+        'state_visits': [[list(s), count] for s, count in q.state_visits.items()],
+        'telemetry': q.telemetry.getstate(),
+    }
+    if q.backend == 'dense':
+        # per (state, action) update counts, the dict backend doesnt keep any
+        state['q_learning']['visits'] = q.q_table.visits.tolist()
+
+    if sim.path_cache is not None:
+        cache = sim.path_cache
+        state['path_cache'] = {
+            'failed_retry': cache.failed_retry,
+            'hits': cache.hits,
+            'misses': cache.misses,
+            'skipped_searches': cache.skipped_searches,
+            'paths': [[table.ref(agent), list(goal), [list(p) for p in path], index]
+                      for agent, (goal, path, index) in cache.paths.items()],
+            'failures': [[table.ref(agent), list(start), list(goal), left]
+                         for agent, (start, goal, left) in cache.failures.items()],
+        }
+
+    state['entities'] = table.entries
+
+    body = zlib.compress(json.dumps(state, separators=(',', ':')).encode('utf-8'), 6)
+    return HEADER.pack(MAGIC, FORMAT_VERSION) + body
+
+
+def _build_entity(data, sim):
+    kind = data['kind']
+    if kind == 'predator':
+        entity = Predator(data['x'], data['y'], name=data['name'], isDek=data['isDek'],
+                          role=data['role'], events=sim.events)
+        fields = PREDATOR_FIELDS
+    elif kind == 'monster':
+        entity = Monster(data['x'], data['y'], name=data['name'], is_boss=data['is_boss'], events=sim.events)
+        fields = MONSTER_FIELDS
+    elif kind == 'synthetic':
+        entity = Synthetic(data['x'], data['y'], name=data['name'], isThia=data['isThia'], events=sim.events)
+        fields = SYNTHETIC_FIELDS
+    elif kind == 'trap':
+        entity = Trap(data['x'], data['y'], symbol=data['symbol'], name=data['name'], events=sim.events)
+        fields = TRAP_FIELDS
+    elif kind == 'resource':
+        entity = Resource(data['x'], data['y'], resource_type=data['resource_type'], events=sim.events)
+        fields = RESOURCE_FIELDS
+    else:
+        raise ValueError(f"Unknown entity kind in snapshot: {kind}")
+
+    for field in AGENT_FIELDS + fields:
+        setattr(entity, field, data[field])
+    entity.entity_id = data['id']
+    return entity
+
+
+# the per kind lists of pre store snapshots, in the order the simulation spawns them
+_LIST_KINDS = ('predators', 'traps', 'monsters', 'synthetics', 'resources')
+
+
+def _store_from_lists(state):
+    """
+    Turn a pre store snapshot into the current layout: ids are handed out in spawn
+    order, the old all_agents order becomes the turn order and anyone dead in it is
+    swept out at the next turn. Entities only reachable through another (e.g. collected
+    resources in an inventory) get the ids after those.
+    """
+    entries = state['entities']
+    refs = [ref for name in _LIST_KINDS for ref in state[name]]
+    listed = set(refs)
+    for entity_id, ref in enumerate(refs + [ref for ref in range(len(entries)) if ref not in listed]):
+        entries[ref]['id'] = entity_id
+    turn_order = [entries[ref]['id'] for ref in state['all_agents']]
+    state['store'] = {
+        'next_id': len(entries),
+        'turn_order': turn_order,
+        'leaving': [entries[ref]['id'] for ref in state['all_agents'] if not entries[ref]['alive']],
+        'entities': refs,
+    }
+
+
+def _terrain_from_config(config):
+    terrain = config.get('terrain')
+    if terrain is None:
+        return None
+    return generate_terrain(config['width'], config['height'], seed=terrain['seed'],
+                            params=TerrainParams(*terrain['params']))
+
+
+def restore(data: bytes, events=None, replay=None, epsilon_schedule=None,
+            learning_rate_schedule=None) -> Simulation:
+    """
+    Build a new Simulation from snapshot bytes.
+    epsilon_schedule / learning_rate_schedule replace the saved ones, needed for schedule
+    classes that aren't in ai.schedules.SCHEDULES.
+    """
+    magic, version = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a simulation snapshot")
+    if not 1 <= version <= FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {version}, expected 1 to {FORMAT_VERSION}")
+    state = json.loads(zlib.decompress(data[HEADER.size:]).decode('utf-8'))
+    if 'store' not in state:
+        _store_from_lists(state)
+
+    config = state['config']
+    sim = Simulation(width=config['width'], height=config['height'], occupancy=config['occupancy'],
+                     path_cache=config['path_cache'], replan_distance=config['replan_distance'],
+                     pathfinding=config['pathfinding'], seed=state['seed'], events=events,
+                     replay=replay, spawn=False, q_backend=config.get('q_backend', 'dict'),
+                     shared_policy=config.get('shared_policy', False),
+                     hazard_field=config.get('hazard_field', False), terrain=_terrain_from_config(config))
+
+    sim.rng.setstate({name: _rng_state_from_json(value) for name, value in state['rng'].items()})
+    for field in SIM_FIELDS:
+        setattr(sim, field, state[field])
+    sim.stats = state['stats']
+    sim.last_challenge_turn = state['last_challenge_turn']
+
+    # entities first, then the references between them
+    entities = [_build_entity(entry, sim) for entry in state['entities']]
+    for entity, entry in zip(entities, state['entities']):
+        if entry['kind'] != 'predator':
+            continue
+        entity.inventory = [entities[ref] for ref in entry['inventory']]
+        ref = entry['carrying_target']
+        entity.carrying_target = entities[ref] if ref is not None else None
+        if entry['q_learning']:
+            entity.q_learning = sim.q_learning
+            entity.current_state = tuple(entry['current_state']) if entry['current_state'] else None
+            entity.last_action = entry['last_action']
+        for field in TRACKING_FIELDS:
+            if field in entry:
+                setattr(entity, field, entry[field])
+
+    sim.entities.setstate(state['store'], [entities[ref] for ref in state['store']['entities']])
+    for trap in sim.traps:
+        sim._index_trap(trap)
+
+    for ref in state['grid']:
+        agent = entities[ref]
+        sim.grid.place_agent(agent, agent.x, agent.y)
+    if replay is not None:
+        for trap in sim.traps:
+            replay.register_hidden(trap)
+
+    hazard_state = state['hazards']
+    generator = sim.hazard_generation
+    generator.generation_rate = hazard_state['generation_rate']
+    generator.max_concurrent_hazards = hazard_state['max_concurrent_hazards']
+    generator.hazards = []
+    for entry in hazard_state['hazards']:
+        hazard = DynamicHazards(entry['type'], entry['x'], entry['y'], entry['intensity'], rng=generator.rng)
+        for field in HAZARD_FIELDS:
+            setattr(hazard, field, entry[field])
+        hazard.affected_tiles = [tuple(tile) for tile in entry['affected_tiles']]
+        generator.hazards.append(hazard)
+    generator.invalidate_field()
+    for hazard_type, layer in hazard_state.get('field_layers', {}).items():
+        generator.field.layers[hazard_type] = np.array(layer, dtype=np.float32)
+    # building the hazards drew from the stream, put it back where it was
+    sim.rng.setstate({name: _rng_state_from_json(value) for name, value in state['rng'].items()})
+
+    q_state = state['q_learning']
+    q = sim.q_learning
+    schedules = config.get('schedules', {})
+    q.epsilon_schedule = (epsilon_schedule if epsilon_schedule is not None
+                          else schedule_from_config(schedules.get('epsilon')))
+    q.learning_rate_schedule = (learning_rate_schedule if learning_rate_schedule is not None
+                                else schedule_from_config(schedules.get('learning_rate')))
+    q.schedule_per = schedules.get('per', 'episode')
+    # the saved values are what the schedules gave at the saved time, so no _apply_schedules here
+    q.learning_rate = q_state['learning_rate']
+    q.discount = q_state['discount']
+    q.epsilon = q_state['epsilon']
+    for s, values in q_state['q_table']:
+        q.q_table[tuple(s)] = values
+    if 'visits' in q_state and q.backend == 'dense':
+        q.q_table.visits[:] = np.array(q_state['visits'], dtype=np.int64)
+    q.episodes = q_state.get('episodes', 0)
+    q.steps = q_state.get('steps', 0)
+    q.state_visits = {tuple(s): count for s, count in q_state.get('state_visits', [])}
+    if 'telemetry' in q_state:
+        q.telemetry.setstate(q_state['telemetry'])
+
+    if sim.path_cache is not None and 'path_cache' in state:
+        cache_state = state['path_cache']
+        cache = sim.path_cache
+        cache.failed_retry = cache_state['failed_retry']
+        cache.hits = cache_state['hits']
+        cache.misses = cache_state['misses']
+        cache.skipped_searches = cache_state.get('skipped_searches', 0)
+        cache.paths = {entities[ref]: [tuple(goal), [tuple(p) for p in path], index]
+                       for ref, goal, path, index in cache_state['paths']}
+        cache.failures = {entities[ref]: [tuple(start), tuple(goal), left]
+                          for ref, start, goal, left in cache_state['failures']}
+
+    return sim
+
+
+def save(sim: Simulation, filename: str):
+    with open(filename, 'wb') as f:
+        f.write(snapshot(sim))
+
+
+def load(filename: str, events=None, replay=None, **schedules) -> Simulation:
+    with open(filename, 'rb') as f:
+        return restore(f.read(), events=events, replay=replay, **schedules)
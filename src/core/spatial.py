@@ -0,0 +1,165 @@
+"""
+Bucketed spatial hash over the wrapping grid.
+Lets the simulation ask "closest monster to here" or "how many monsters within 3"
+by only looking at nearby buckets instead of scanning every entity list.
+"""
+
+from typing import List, Optional, Tuple
+
+
+class SpatialHash:
+    """
+    Splits the grid into bucket_size x bucket_size buckets that wrap round like the grid does.
+    Kept up to date by Grid.place_agent / move_agent / remove_agent.
+    Distances are manhattan distances on the torus, dead agents are never returned.
+    """
+
+    def __init__(self, width: int, height: int, bucket_size: int = 4):
+        self.width = width
+        self.height = height
+        self.bucket_size = bucket_size
+        self.cols = -(-width // bucket_size)  # ceiling division
+        self.rows = -(-height // bucket_size)
+        # the last bucket on an axis is short when the grid doesnt divide evenly,
+        # which lets a wrapped bucket sit closer than its ring number suggests
+        self.shortfall = max(self.cols * bucket_size - width, self.rows * bucket_size - height)
+
+        # buckets are dicts rather than sets so iteration order (and so tie breaking) is repeatable
+        self.buckets = {}
+        self.where = {}  # agent -> bucket key
+        # bumped on every insert / move / remove (and by mark_changed), lets callers cache query results
+        self.version = 0
+
+    def _key(self, x: int, y: int) -> Tuple[int, int]:
+        return (x // self.bucket_size, y // self.bucket_size)
+
+    def mark_changed(self):
+        """For changes the hash can't see, like an agent dying without leaving the grid."""
+        self.version += 1
+
+    def insert(self, agent, x: int, y: int):
+        self.version += 1
+        key = self._key(x, y)
+        self.buckets.setdefault(key, {})[agent] = None
+        self.where[agent] = key
+
+    def remove(self, agent):
+        key = self.where.pop(agent, None)
+        if key is None:
+            return
+        self.version += 1
+        bucket = self.buckets[key]
+        del bucket[agent]
+        if not bucket:
+            del self.buckets[key]
+
+    def move(self, agent, x: int, y: int):
+        self.version += 1  # even within a bucket, distances changed
+        key = self._key(x, y)
+        old_key = self.where.get(agent)
+        if old_key == key:
+            return  # most moves stay in the same bucket
+        self.remove(agent)
+        self.buckets.setdefault(key, {})[agent] = None
+        self.where[agent] = key
+
+    def distance(self, x1: int, y1: int, x2: int, y2: int) -> int:
+        dx = abs(x1 - x2)
+        dy = abs(y1 - y2)
+        return min(dx, self.width - dx) + min(dy, self.height - dy)
+
+    def _ring(self, centre_col: int, centre_row: int, ring: int):
+        """Bucket keys exactly `ring` buckets away (chebyshev) from the centre bucket, wrapped."""
+        if ring == 0:
+            yield (centre_col, centre_row)
+            return
+
+        seen = set()
+        for d_row in range(-ring, ring + 1):
+            # full rows along the top and bottom, only the two ends in between
+            if abs(d_row) == ring:
+                d_cols = range(-ring, ring + 1)
+            else:
+                d_cols = (-ring, ring)
+            for d_col in d_cols:
+                key = ((centre_col + d_col) % self.cols, (centre_row + d_row) % self.rows)
+                # on small grids the ring can wrap onto itself
+                if key not in seen:
+                    seen.add(key)
+                    yield key
+
+    def _lower_bound(self, ring: int) -> int:
+        """Smallest distance possible to anything outside the first `ring` rings."""
+        return ring * self.bucket_size + 1 - self.shortfall
+
+    def _matches(self, agent, kind, predicate) -> bool:
+        if not agent.alive:
+            return False
+        if kind is not None and not isinstance(agent, kind):
+            return False
+        return predicate is None or predicate(agent)
+
+    def nearest(self, x: int, y: int, k: int = 1, kind=None, predicate=None,
+                max_radius: Optional[int] = None) -> List[tuple]:
+        """
+        Up to k (distance, agent) pairs closest to (x, y), closest first.
+        kind is a class (or tuple of classes) to filter on, predicate an extra check.
+        """
+        x, y = x % self.width, y % self.height
+        centre_col, centre_row = self._key(x, y)
+        max_ring = max(self.cols, self.rows) // 2 + 1
+        found = []
+        visited = set()
+
+        for ring in range(max_ring + 1):
+            for key in self._ring(centre_col, centre_row, ring):
+                if key in visited:
+                    continue
+                visited.add(key)
+                for agent in self.buckets.get(key, ()):
+                    if not self._matches(agent, kind, predicate):
+                        continue
+                    dist = self.distance(x, y, agent.x, agent.y)
+                    if max_radius is None or dist <= max_radius:
+                        found.append((dist, agent))
+
+            # anything in a bucket further out is at least this far away
+            lower_bound = self._lower_bound(ring)
+            if max_radius is not None and lower_bound > max_radius:
+                break
+            if len(found) >= k:
+                found.sort(key=lambda pair: pair[0])
+                if found[k - 1][0] < lower_bound:
+                    break
+
+        found.sort(key=lambda pair: pair[0])
+        return found[:k]
+
+    def within_radius(self, x: int, y: int, radius: int, kind=None, predicate=None) -> List[tuple]:
+        """All (distance, agent) pairs within radius of (x, y), closest first."""
+        x, y = x % self.width, y % self.height
+        centre_col, centre_row = self._key(x, y)
+        max_ring = max(self.cols, self.rows) // 2 + 1
+        found = []
+        visited = set()
+
+        for ring in range(max_ring + 1):
+            for key in self._ring(centre_col, centre_row, ring):
+                if key in visited:
+                    continue
+                visited.add(key)
+                for agent in self.buckets.get(key, ()):
+                    if not self._matches(agent, kind, predicate):
+                        continue
+                    dist = self.distance(x, y, agent.x, agent.y)
+                    if dist <= radius:
+                        found.append((dist, agent))
+
+            if self._lower_bound(ring) > radius:
+                break
+
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+    def count_within(self, x: int, y: int, radius: int, kind=None, predicate=None) -> int:
+        return len(self.within_radius(x, y, radius, kind, predicate))
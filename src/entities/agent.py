@@ -1,6 +1,18 @@
+from core.events import DEFAULT_SINK
+
+
 class Agent:
 
-    def __init__(self,x,y,symbol,name = "Agent"):
+    # fixed attribute sets on every entity class, so no per instance __dict__ (lots of entities
+    # in batched runs). Anything new an entity needs has to be declared in its class's __slots__
+    __slots__ = ('entity_id', 'events', 'x', 'y', 'symbol', 'name', 'health', 'max_health', 'alive',
+                 'stamina', 'max_stamina', 'honor')
+
+    def __init__(self,x,y,symbol,name = "Agent", events = None):
+
+        # where this agents messages go, the simulation hands every entity its own sink
+        self.events = events if events is not None else DEFAULT_SINK
+        self.entity_id = None  # given out by core.entity_store.EntityStore.add
 
         self.x = x
         self.y = y
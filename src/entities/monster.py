@@ -2,10 +2,12 @@ from entities.agent import Agent
 
 class Monster(Agent):
 
-    def __init__(self,x,y,name="Monster",is_boss = False):
+    __slots__ = ('is_boss', 'damage')
+
+    def __init__(self,x,y,name="Monster",is_boss = False, events = None):
         symbol = 'X' if is_boss else 'M'
 
-        super().__init__(x,y,symbol,name)
+        super().__init__(x,y,symbol,name,events)
 
         self.is_boss = is_boss
         self.damage = 100 if is_boss else 10
@@ -1,15 +1,20 @@
 from entities.agent import Agent
 from entities.synthetics import Synthetic
 from core.grid import Grid
+from core.events import DEBUG
 class Predator(Agent):
-    
-   
-     
 
-    def __init__(self,x,y,name = "Predator", isDek = False,role = 'Warrior'):
+    __slots__ = ('maxStamina', 'honour', 'isDek', 'role', 'dek_relationship', 'respect_threshhold',
+                 'trophies', 'carrying_target', 'kills', 'loadCarrying', 'encumbered',
+                 'weapon_damage_buff', 'inventory', 'max_inventory',
+                 # optional components, None until something attaches them
+                 'q_learning', 'current_state', 'last_action',
+                 'honour_history', 'health_history', 'stamina_history', 'kill_history')
+
+    def __init__(self,x,y,name = "Predator", isDek = False,role = 'Warrior', events = None):
         
         symbol = 'D' if isDek else 'P'
-        super().__init__(x,y,symbol,name)
+        super().__init__(x,y,symbol,name,events)
 
         self.stamina = 100
         self.maxStamina = 100
@@ -31,14 +36,18 @@ class Predator(Agent):
         self.max_inventory = 3
 
 
+        # learning: the simulation attaches its Qlearning to Dek (or every predator with a shared policy)
+        self.q_learning = None
+        self.current_state = None
+        self.last_action = None
         if isDek:
-            from ai.reinforcement import Qlearning
-            self.q_learner = Qlearning()
-            self.current_state = None
-            self.last_action = None
-            print(f"{name} initialized with Q-learning AI.")
+            self.events.emit('learning', "{name} initialized with Q-learning AI.", level=DEBUG, name=name)
 
-        grid = Grid()
+        # per turn tracking lists, the experiment runner switches these on for Dek
+        self.honour_history = None
+        self.health_history = None
+        self.stamina_history = None
+        self.kill_history = None
         
 
     def challenge_dek(self, dek, grid):
@@ -53,30 +62,35 @@ class Predator(Agent):
 
         if self.name == "Father":
             if status == "EXILE":
-                print(f"\n⚔️  {self.name}: 'You dishonour the cla{dek.name}! Prove yourself or die little man!'")
+                self.events.emit('clan', "\n⚔️  {name}: 'You dishonour the cla{dek}! Prove yourself or die little man!'",
+                                 name=self.name, dek=dek.name)
                 self.dek_relationship -= 10
                 return True
             elif status == "DISAPPROVED":
-                print(f"\n  {self.name}: 'You have {dek.kills} kills and {dek.honour} honour LOCK IN AND PROVE YOUR WORTH!'")
+                self.events.emit('clan', "\n  {name}: 'You have {kills} kills and {honour} honour LOCK IN AND PROVE YOUR WORTH!'",
+                                 name=self.name, kills=dek.kills, honour=dek.honour)
                 self.dek_relationship -= 5
                 return True
             elif status == "ACCEPTED":
-                print(f"\n✓ {self.name}: 'Well done {dek.name}. You have proven yourself, good job son.'")
+                self.events.emit('clan', "\n✓ {name}: 'Well done {dek}. You have proven yourself, good job son.'",
+                                 name=self.name, dek=dek.name)
                 self.dek_relationship += 5
                 return True
         
         #brother challengeds dek
         elif self.name == "Brother":
             if dek.kills > self.kills + 2:
-                print(f"\n  {self.name}: 'Your {dek.kills} kills make you arrogant, Dek! I only have {self.kills}!  :( )'")
+                self.events.emit('clan', "\n  {name}: 'Your {dek_kills} kills make you arrogant, Dek! I only have {kills}!  :( )'",
+                                 name=self.name, dek_kills=dek.kills, kills=self.kills)
                 self.dek_relationship -= 5
                 return True
             elif status == "ACCEPTED" and dek.honour > self.honour:
-                print(f"\n  {self.name}: 'You may have {dek.honour} honour but I am still superior! HAHAHA!'")
+                self.events.emit('clan', "\n  {name}: 'You may have {honour} honour but I am still superior! HAHAHA!'",
+                                 name=self.name, honour=dek.honour)
                 self.dek_relationship -= 3
                 return True
             elif status == "DISAPPROVED":
-                print(f"\n  {self.name}: 'Still weak scared little man brother.'")
+                self.events.emit('clan', "\n  {name}: 'Still weak scared little man brother.'", name=self.name)
                 return True
         
         return False
@@ -128,7 +142,7 @@ class Predator(Agent):
         self.loadCarrying = load
         if load > 100:
             self.encumbered = True
-            print("Your too heavy! Drop some load to continue")
+            self.events.emit('stamina', "Your too heavy! Drop some load to continue")
             return False
     
     def get_honour_rank(self):
@@ -216,19 +230,21 @@ class Predator(Agent):
 
     def get_thias_help(self,thia,grid):
         
-        print(f"{self.name} uses Thia's scan to assess the area.")
+        self.events.emit('scan', "{name} uses Thia's scan to assess the area.", name=self.name)
 
         scan_results = thia.scan_area(grid, scan_range=5)
 
         if scan_results['boss']:
             boss = scan_results['boss']
-            print(f"{thia.name}: 'WARNING - Ultimate Adversary detected {boss['distance']} cells away!'")
+            self.events.emit('scan', "{thia}: 'WARNING - Ultimate Adversary detected {distance} cells away!'",
+                             thia=thia.name, distance=boss['distance'])
     
         if len(scan_results['monsters']) > 0:
             closest_monster = min(scan_results['monsters'], key=lambda m: m['distance'])
-            print(f"{thia.name}: 'Closest threat: {closest_monster['name']} at distance {closest_monster['distance']}'")
+            self.events.emit('scan', "{thia}: 'Closest threat: {monster} at distance {distance}'",
+                             thia=thia.name, monster=closest_monster['name'], distance=closest_monster['distance'])
         else:
-            print(f"{thia.name}: 'Area is clear of threats.'")
+            self.events.emit('scan', "{thia}: 'Area is clear of threats.'", thia=thia.name)
         
         return scan_results
         
@@ -241,24 +257,27 @@ class Predator(Agent):
             return False
         
         if self.loadCarrying > 50:
-            print(f"{self.name} is too encumbered to carry {synthetic.name}.")
+            self.events.emit('carry', "{name} is too encumbered to carry {synthetic}.",
+                             name=self.name, synthetic=synthetic.name)
             return False
         
         if self.carrying_target is not None:
-            print(f"{self.name} is already carrying {self.carrying_target.name}!")
+            self.events.emit('carry', "{name} is already carrying {synthetic}!",
+                             name=self.name, synthetic=self.carrying_target.name)
             return False
         
         Grid.remove_agent(synthetic)
             
         self.loadCarrying += 50
-        print(f"{self.name} is carrying {synthetic.name} for repairs.")
+        self.events.emit('carry', "{name} is carrying {synthetic} for repairs.",
+                         name=self.name, synthetic=synthetic.name)
         return True
     
     def drop_synthetic(self):
         grid = Grid()
         if grid.is_empty(self.x,self.y):
             grid.place_agent(self.carrying_target,self.x,self.y)
-            print(f"{self.name} drops {self.carrying_target.name}")
+            self.events.emit('carry', "{name} drops {synthetic}", name=self.name, synthetic=self.carrying_target.name)
 
         else:
             placed = False
@@ -270,19 +289,21 @@ class Predator(Agent):
                     drop_y = self.y + dy
                     if grid.is_empty(drop_x,drop_y):
                         grid.place_agent(self.carrying_target,drop_x,drop_y)
-                        print(f"{self.name} drops {self.carrying_target.name} at ({drop_x},{drop_y})")
+                        self.events.emit('carry', "{name} drops {synthetic} at ({x},{y})",
+                                         name=self.name, synthetic=self.carrying_target.name, x=drop_x, y=drop_y)
                         placed = True
                         break
                 if placed:
                     break
             if not placed:
-                print(f"{self.name} could not find a place to drop {self.carrying_target.name}!")
+                self.events.emit('carry', "{name} could not find a place to drop {synthetic}!",
+                                 name=self.name, synthetic=self.carrying_target.name)
                 return False
 
 
         if self.loadCarrying > 0:
             self.loadCarrying = 0
-            print(f"{self.name} puts down the synthetic")
+            self.events.emit('carry', "{name} puts down the synthetic", name=self.name)
             return True
         return False
 
@@ -297,14 +318,12 @@ class Predator(Agent):
         
         resource.collected = True
         self.loadCarrying += 10  #resources add some weight
-        if not hasattr(self, 'inventory'):
-            self.inventory = []
         self.inventory.append(resource)
         return True
     
     def use_resource(self, resource):
         """Use a collected resource."""
-        if not hasattr(self, 'inventory') or resource not in self.inventory:
+        if resource not in self.inventory:
             return False
         
       
@@ -320,13 +339,10 @@ class Predator(Agent):
     
     def repair_synthetic(self, synthetic):
         """Use a repair kit to repair a synthetic."""
-        if not hasattr(self, 'inventory'):
-            return False
-        
         #find repair kit
         repair_kit = None
         for item in self.inventory:
-            if hasattr(item, 'resource_type') and item.resource_type == "repair_kit":
+            if item.resource_type == "repair_kit":
                 repair_kit = item
                 break
         
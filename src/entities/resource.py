@@ -1,13 +1,16 @@
 from entities.agent import Agent
 
 class Resource(Agent):    
+
+    __slots__ = ('resource_type', 'damage_boost', 'heal_amount', 'stamina_amount', 'collected')
+
     TYPES = {
         'sword_of_despair_and_destruction': {'symbol': 'W', 'damage_boost': 20},
         'repair_kit': {'symbol': 'R', 'heal_amount': 30},
         'med_kit': {'symbol': 'H', 'heal_amount': 50},
         'stamina_boost': {'symbol': 'S', 'stamina_amount': 30}
     }
-    def __init__(self, x, y, resource_type='repair_kit'):
+    def __init__(self, x, y, resource_type='repair_kit', events=None):
         if resource_type not in self.TYPES:
 
 
@@ -15,7 +18,7 @@ class Resource(Agent):
             raise ValueError(f"Invalid resource_type: {resource_type}. Must be one of {list(self.TYPES.keys())}")
         self.resource_type = resource_type
         config = self.TYPES[resource_type]
-        super().__init__(x, y, config['symbol'], f"{resource_type.replace('_', ' ').title()}")
+        super().__init__(x, y, config['symbol'], f"{resource_type.replace('_', ' ').title()}", events)
         
         #resource properties
         self.damage_boost = config.get('damage_boost', 0)
@@ -41,7 +44,8 @@ class Resource(Agent):
                 agent.weapon_damage_buff = self.damage_boost
 
 
-                print(f"⚔️{agent.name} equipped THE SWORD OF DESPAIR AND DESTRUCTION! +{self.damage_boost} damage")
+                self.events.emit('resource', "⚔️{name} equipped THE SWORD OF DESPAIR AND DESTRUCTION! +{boost} damage",
+                                 name=agent.name, boost=self.damage_boost)
                 return True
         
         elif self.resource_type == 'repair_kit':
@@ -54,7 +58,7 @@ class Resource(Agent):
 
 
 
-                print(f"🔧{agent.name} repaired for {self.heal_amount} HP")
+                self.events.emit('resource', "🔧{name} repaired for {amount} HP", name=agent.name, amount=self.heal_amount)
                 return True
             
 
@@ -65,7 +69,7 @@ class Resource(Agent):
 
 
             agent.heal(self.heal_amount)
-            print(f"{agent.name} healed for {self.heal_amount} HP")
+            self.events.emit('resource', "{name} healed for {amount} HP", name=agent.name, amount=self.heal_amount)
             return True
         
         elif self.resource_type == 'stamina_boost':
@@ -79,7 +83,7 @@ class Resource(Agent):
                     agent.stamina = agent.maxStamina
 
                     
-                print(f"⚡{agent.name} restored {self.stamina_amount} stamina")
+                self.events.emit('resource', "⚡{name} restored {amount} stamina", name=agent.name, amount=self.stamina_amount)
                 return True
         
         return False
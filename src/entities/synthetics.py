@@ -5,11 +5,13 @@ from entities.monster import Monster
 
 
 class Synthetic(Agent):
+
+    __slots__ = ('isThia', 'isDamaged')
     
-    def __init__(self, x, y, name="Synthetic", isThia=False):
+    def __init__(self, x, y, name="Synthetic", isThia=False, events=None):
 
         symbol = "T" if isThia else 'S'
-        super().__init__(x, y, symbol, name)
+        super().__init__(x, y, symbol, name, events)
 
 
         self.stamina = 100
@@ -40,23 +42,23 @@ class Synthetic(Agent):
     }
         
     
-        for dx in range(-scan_range, scan_range + 1):
-            for dy in range(-scan_range, scan_range + 1):
+        # offsets and their wrapped coordinates along each axis, precomputed per grid size
+        offsets, xs, ys = grid.neighbours.axes(scan_range)
+        rows = grid.grid
+        for dx, check_x in zip(offsets, xs[self.x % grid.width]):
+            for dy, check_y in zip(offsets, ys[self.y % grid.height]):
                 #skip Thia own position
                 if dx == 0 and dy == 0:
                     continue
                 
-                check_x = self.x + dx
-                check_y = self.y + dy
-                
-                cell_content = grid.get_cell(check_x, check_y)
+                cell_content = rows[check_y][check_x]
                 
                 if cell_content is not None:
                    
                     if isinstance(cell_content, Monster):
                         monster_info = {
                             'name': cell_content.name,
-                            'position': (check_x % grid.width, check_y % grid.height),
+                            'position': (check_x, check_y),
                             'distance': abs(dx) + abs(dy),
                             'health': cell_content.health,
                             'is_boss': cell_content.is_boss
@@ -70,7 +72,7 @@ class Synthetic(Agent):
                     elif isinstance(cell_content, Predator):
                         predator_info = {
                             'name': cell_content.name,
-                            'position': (check_x % grid.width, check_y % grid.height),
+                            'position': (check_x, check_y),
                             'distance': abs(dx) + abs(dy),
                             'is_dek': cell_content.isDek
                         }
@@ -79,7 +81,7 @@ class Synthetic(Agent):
                     elif isinstance(cell_content, Synthetic):
                         synthetic_info = {
                             'name': cell_content.name,
-                            'position': (check_x % grid.width, check_y % grid.height),
+                            'position': (check_x, check_y),
                             'distance': abs(dx) + abs(dy),
                             'health': cell_content.health,
                             'is_thia': cell_content.isThia
@@ -3,9 +3,11 @@ from entities.agent import Agent
 
 class Trap(Agent):
 
-    def __init__(self,x,y,symbol,name = "Trap"):
+    __slots__ = ('is_triggered',)
 
-        super().__init__(x,y,symbol,name)
+    def __init__(self,x,y,symbol,name = "Trap", events = None):
+
+        super().__init__(x,y,symbol,name,events)
 
         self.is_triggered = False
         self.x = x
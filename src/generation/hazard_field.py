@@ -0,0 +1,112 @@
+"""
+Continuous hazard fields for big environmental hazards.
+Each hazard type gets a float intensity grid over the whole map. Every turn the grids
+diffuse (a 4 neighbour stencil built from np.roll, so they wrap round like the grid),
+decay, and anything under the type's threshold is cleared. Clouds from different
+sources of the same type simply add up, so they merge as they spread.
+"""
+
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+
+class FieldParams(NamedTuple):
+    diffusion: float  # share of a cell's intensity that flows to each neighbour per turn, at most 0.25
+    decay: float  # fraction lost per turn
+    damage: float  # damage per unit of intensity
+    emission: float  # intensity a source hazard adds to its cell each turn, times its own intensity
+    threshold: float = 0.05  # below this a cell is cleared
+
+
+# the hazard types that become fields when a HazardGenerator has one
+DEFAULT_FIELD_PARAMS: Dict[str, FieldParams] = {
+    'ozone_radiation': FieldParams(diffusion=0.10, decay=0.05, damage=50, emission=0.5),
+    'radiation_cloud': FieldParams(diffusion=0.20, decay=0.01, damage=20, emission=2.0, threshold=0.02),
+}
+
+
+class HazardField:
+    """
+    Intensity grids indexed [y, x], one per hazard type in params.
+    Layers are only allocated once something is emitted into them.
+    """
+
+    def __init__(self, width: int, height: int, params: Optional[Dict[str, FieldParams]] = None):
+        self.width = width
+        self.height = height
+        self.params = dict(params) if params is not None else dict(DEFAULT_FIELD_PARAMS)
+        for hazard_type, p in self.params.items():
+            # the explicit update blows up past 0.25
+            if not 0 <= p.diffusion <= 0.25:
+                raise ValueError(f"Invalid diffusion for {hazard_type}: {p.diffusion}. Must be between 0 and 0.25")
+            if not 0 <= p.decay <= 1:
+                raise ValueError(f"Invalid decay for {hazard_type}: {p.decay}. Must be between 0 and 1")
+
+        self.layers: Dict[str, np.ndarray] = {}
+        self._damage = None  # combined damage grid, rebuilt lazily after the layers change
+
+    def handles(self, hazard_type: str) -> bool:
+        return hazard_type in self.params
+
+    def _layer(self, hazard_type: str) -> np.ndarray:
+        layer = self.layers.get(hazard_type)
+        if layer is None:
+            layer = self.layers[hazard_type] = np.zeros((self.height, self.width), dtype=np.float32)
+        return layer
+
+    def emit(self, hazard_type: str, x: int, y: int, amount: float, radius: int = 0):
+        """Add intensity at (x, y), spread over a wrapping diamond of the given radius."""
+        layer = self._layer(hazard_type)
+        if radius <= 0:
+            layer[y % self.height, x % self.width] += amount
+        else:
+            offsets = np.arange(-radius, radius + 1)
+            dx, dy = np.meshgrid(offsets, offsets)
+            inside = np.abs(dx) + np.abs(dy) <= radius
+            np.add.at(layer, ((y + dy[inside]) % self.height, (x + dx[inside]) % self.width),
+                      amount / inside.sum())
+        self._damage = None
+
+    def step(self):
+        """Advance every layer one turn: diffuse, decay, clear what's under the threshold."""
+        for hazard_type, layer in list(self.layers.items()):
+            p = self.params[hazard_type]
+            if p.diffusion:
+                neighbours = (np.roll(layer, 1, axis=0) + np.roll(layer, -1, axis=0)
+                              + np.roll(layer, 1, axis=1) + np.roll(layer, -1, axis=1))
+                layer *= 1 - 4 * p.diffusion
+                neighbours *= p.diffusion
+                layer += neighbours
+            if p.decay:
+                layer *= 1 - p.decay
+            layer[layer < p.threshold] = 0
+            if not layer.any():
+                del self.layers[hazard_type]  # drops out of future steps until something emits again
+        self._damage = None
+
+    def damage_grid(self) -> np.ndarray:
+        if self._damage is None:
+            damage = np.zeros((self.height, self.width), dtype=np.float32)
+            for hazard_type, layer in self.layers.items():
+                damage += layer * self.params[hazard_type].damage
+            self._damage = damage.astype(np.int32)
+        return self._damage
+
+    def damage_at(self, xs, ys) -> np.ndarray:
+        return self.damage_grid()[np.asarray(ys), np.asarray(xs)]
+
+    def check(self, x: int, y: int) -> Tuple[bool, int, str]:
+        """(hit, damage, hazard_type) for one cell, the type being whichever contributes most damage."""
+        damage = int(self.damage_grid()[y, x])
+        if damage <= 0:
+            return (False, 0, "")
+        worst = max(self.layers, key=lambda t: self.layers[t][y, x] * self.params[t].damage)
+        return (True, damage, worst)
+
+    def coverage(self) -> int:
+        """Number of cells some field currently covers."""
+        covered = np.zeros((self.height, self.width), dtype=bool)
+        for layer in self.layers.values():
+            covered |= layer > 0
+        return int(covered.sum())
@@ -1,7 +1,9 @@
 import random 
 from typing import List,Dict,Tuple
+import numpy as np
 from entities.trap import Trap
 from entities.agent import Agent
+from core.events import DEFAULT_SINK
 
 class Hazards:
 
@@ -17,6 +19,9 @@ class Hazards:
     break_domain = "break_domain"
     nuke = "nuke" 
 
+    # only spawned when the generator has a generation.hazard_field.HazardField to carry it
+    radiation_cloud = "radiation_cloud"
+
 
 
 
@@ -24,7 +29,7 @@ class DynamicHazards:
 
 
 
-    def __init__(self, hazard_type: str, x: int, y: int, intensity: float = 1.0):
+    def __init__(self, hazard_type: str, x: int, y: int, intensity: float = 1.0, rng=None):
 
         self.type = hazard_type
         self.x = x
@@ -33,9 +38,10 @@ class DynamicHazards:
         self.age = 0  # turns since creation
         self.active = True
         self.affected_tiles = [(x, y)]  # can spread to multiple tiles
+        self.rng = rng if rng is not None else random  # seeded stream from the simulation if there is one
 
-        self.growth_rate = random.uniform(0.05, 0.15)  # how fast it evolves
-        self.max_intensity = random.uniform(2.0, 5.0)
+        self.growth_rate = self.rng.uniform(0.05, 0.15)  # how fast it evolves
+        self.max_intensity = self.rng.uniform(2.0, 5.0)
 
 
 
@@ -61,9 +67,9 @@ class DynamicHazards:
 
 
 
-            x, y = random.choice(self.affected_tiles)
+            x, y = self.rng.choice(self.affected_tiles)
             directions = [(0,1), (1,0), (0,-1), (-1,0)]
-            dx, dy = random.choice(directions)
+            dx, dy = self.rng.choice(directions)
             new_tile = (x + dx, y + dy)
             if new_tile not in self.affected_tiles:
                 self.affected_tiles.append(new_tile)
@@ -108,12 +114,25 @@ class DynamicHazards:
 class HazardGenerator:
     """Generates procedural hazards that evolve during runtime"""
     
-    def __init__(self, grid_width: int, grid_height: int):
+    def __init__(self, grid_width: int, grid_height: int, rng=None, events=None, field=None):
+        self.rng = rng if rng is not None else random
+        self.events = events if events is not None else DEFAULT_SINK
+        self.recorder = None  # optional replay log that hears about new hazards
         self.width = grid_width
         self.height = grid_height
         self.hazards: List[DynamicHazards] = []
         self.generation_rate = 0.15  # 15% chance per turn to spawn new hazard
         self.max_concurrent_hazards = 8
+
+        # per cell lookup arrays indexed [y, x]: which hazard covers the cell (-1 for none, the first
+        # in self.hazards wins like the old loop) and its damage. Rebuilt lazily after hazards change
+        self.hazard_index = np.full((grid_height, grid_width), -1, dtype=np.int32)
+        self.damage_field = np.zeros((grid_height, grid_width), dtype=np.int32)
+        self._field_dirty = False
+
+        # optional generation.hazard_field.HazardField, hazards of the types it handles become
+        # sources that feed its spreading intensity grids instead of covering a few tiles
+        self.field = field
         
 
 
@@ -122,18 +141,19 @@ class HazardGenerator:
 
     def generate_initial_hazards(self, count: int = 3):
         for _ in range(count):
-            hazard_type = random.choice([
+            hazard_type = self.rng.choice([
                 Hazards.silicon_rain,
                 Hazards.ozone_raditation,
                 Hazards.sulphur_dioxide,
             ])
-            x = random.randint(0, self.width - 1)
-            y = random.randint(0, self.height - 1)
+            x = self.rng.randint(0, self.width - 1)
+            y = self.rng.randint(0, self.height - 1)
             
-            hazard = DynamicHazards(hazard_type, x, y)
+            hazard = DynamicHazards(hazard_type, x, y, rng=self.rng)
             self.hazards.append(hazard)
+        self.invalidate_field()
             
-        print(f"Generated {count} initial hazards")
+        self.events.emit('hazard', "Generated {count} initial hazards", count=count)
 
 
 
@@ -150,11 +170,19 @@ class HazardGenerator:
             
         # Remove old hazards that have decayed
         self.hazards = [h for h in self.hazards if h.age < 50]
+        self.invalidate_field()
+
+        if self.field is not None:
+            for hazard in self.hazards:
+                if hazard.active and self.field.handles(hazard.type):
+                    emission = self.field.params[hazard.type].emission
+                    self.field.emit(hazard.type, hazard.x, hazard.y, emission * hazard.intensity)
+            self.field.step()
         
         # Spawn new hazards based on difficulty
         if len(self.hazards) < self.max_concurrent_hazards:
             spawn_chance = self.generation_rate * difficulty_multiplier
-            if random.random() < spawn_chance:
+            if self.rng.random() < spawn_chance:
                 self._spawn_random_hazard(turn)
                 
     def _spawn_random_hazard(self, turn: int):
@@ -168,27 +196,69 @@ class HazardGenerator:
         # Later turns can spawn more dangerous hazards
         if turn > 30:
             hazard_types.append(Hazards.nuke and Hazards.break_domain)
+        if self.field is not None and self.field.handles(Hazards.radiation_cloud):
+            hazard_types.append(Hazards.radiation_cloud)
             
-        hazard_type = random.choice(hazard_types)
-        x = random.randint(0, self.width - 1)
-        y = random.randint(0, self.height - 1)
+        hazard_type = self.rng.choice(hazard_types)
+        x = self.rng.randint(0, self.width - 1)
+        y = self.rng.randint(0, self.height - 1)
         
         intensity = 1.0 + (turn / 100.0)  # scales with time
-        hazard = DynamicHazards(hazard_type, x, y, intensity)
+        hazard = DynamicHazards(hazard_type, x, y, intensity, rng=self.rng)
         self.hazards.append(hazard)
+        self.invalidate_field()
         
-        print(f"New hazard spawned: {hazard_type} at ({x}, {y})")
+        self.events.emit('hazard', "New hazard spawned: {hazard} at ({x}, {y})", hazard=hazard_type, x=x, y=y)
+        if self.recorder is not None:
+            self.recorder.hazard(hazard_type, x, y, intensity)
         
+    def invalidate_field(self):
+        """Call after changing self.hazards from outside, the field is rebuilt on the next lookup."""
+        self._field_dirty = True
+
+    def _rebuild_field(self):
+        self.hazard_index.fill(-1)
+        self.damage_field.fill(0)
+        # backwards so the first hazard covering a cell is the last one written
+        for i in range(len(self.hazards) - 1, -1, -1):
+            hazard = self.hazards[i]
+            if not hazard.active or (self.field is not None and self.field.handles(hazard.type)):
+                continue
+            # spreading doesnt wrap, tiles off the edge can't hold an agent so they are skipped
+            tiles = [(x, y) for x, y in hazard.affected_tiles if 0 <= x < self.width and 0 <= y < self.height]
+            if not tiles:
+                continue
+            xs, ys = np.array(tiles).T
+            self.hazard_index[ys, xs] = i
+            self.damage_field[ys, xs] = hazard.get_damage()
+        self._field_dirty = False
+
     def check_hazard_damage(self, agent: Agent) -> Tuple[bool, int, str]:
         """
         Check if agent is in a hazard and return (hit, damage, hazard_type)
         """
-        for hazard in self.hazards:
-            if hazard.affects_position(agent.x, agent.y):
-                damage = hazard.get_damage()
-                return (True, damage, hazard.type)
-                
-        return (False, 0, "")
+        if self._field_dirty:
+            self._rebuild_field()
+        if not (0 <= agent.x < self.width and 0 <= agent.y < self.height):
+            return (False, 0, "")
+
+        index = self.hazard_index[agent.y, agent.x]
+        if index < 0:
+            if self.field is not None:
+                return self.field.check(agent.x, agent.y)
+            return (False, 0, "")
+        return (True, int(self.damage_field[agent.y, agent.x]), self.hazards[index].type)
+
+    def damage_at(self, xs, ys) -> np.ndarray:
+        """Hazard damage for many positions at once (0 where there is no hazard), one gather over the field."""
+        if self._field_dirty:
+            self._rebuild_field()
+        ys, xs = np.asarray(ys), np.asarray(xs)
+        damage = self.damage_field[ys, xs]
+        if self.field is not None:
+            # same rule as check_hazard_damage, the field only counts where no tile hazard does
+            damage = np.where(self.hazard_index[ys, xs] >= 0, damage, self.field.damage_at(xs, ys))
+        return damage
         
     def get_hazards_at(self, x: int, y: int) -> List[DynamicHazards]:
 
@@ -0,0 +1,128 @@
+"""
+Procedural terrain for Kalisk.
+Elevation is fractal value noise: random values on a coarse lattice, smoothly
+interpolated and summed over a few octaves, all as whole array numpy operations.
+The lattice wraps so the terrain tiles like the grid does. Elevation is turned into
+passability (water and peaks are impassable) and a movement cost per cell that
+A* and the flow field pay for entering it. Generated maps can be cached on disk,
+keyed by everything that went into them.
+"""
+
+import hashlib
+import os
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+
+class TerrainParams(NamedTuple):
+    scale: float = 16.0  # cells per lattice square of the first octave, bigger = smoother
+    octaves: int = 4
+    persistence: float = 0.5  # amplitude multiplier per octave
+    lacunarity: float = 2.0  # frequency multiplier per octave
+    water_level: float = 0.3  # elevation below this is impassable water
+    peak_level: float = 0.8  # elevation above this is impassable rock
+    max_cost: float = 4.0  # cost of the steepest passable ground, flat ground costs 1
+
+
+def value_noise(width: int, height: int, scale: float, rng: np.random.Generator) -> np.ndarray:
+    """One octave of wrapping value noise in [0, 1], shape (height, width)."""
+    cols = max(1, int(round(width / scale)))
+    rows = max(1, int(round(height / scale)))
+    lattice = rng.random((rows, cols))
+
+    # each cell's position in lattice units, split into the corner and how far past it
+    gx = np.arange(width) * (cols / width)
+    gy = np.arange(height) * (rows / height)
+    x0 = gx.astype(np.int64)
+    y0 = gy.astype(np.int64)
+    tx = gx - x0
+    ty = gy - y0
+    # smoothstep so the lattice lines dont show
+    tx = tx * tx * (3 - 2 * tx)
+    ty = ty * ty * (3 - 2 * ty)
+    x1 = (x0 + 1) % cols
+    y1 = (y0 + 1) % rows
+
+    top = lattice[y0][:, x0] * (1 - tx) + lattice[y0][:, x1] * tx
+    bottom = lattice[y1][:, x0] * (1 - tx) + lattice[y1][:, x1] * tx
+    return top * (1 - ty)[:, None] + bottom * ty[:, None]
+
+
+def fractal_noise(width: int, height: int, seed: int, params: TerrainParams) -> np.ndarray:
+    """Octaves of value_noise summed and normalised to [0, 1]."""
+    rng = np.random.default_rng(seed)
+    total = np.zeros((height, width))
+    amplitude = 1.0
+    scale = params.scale
+    for _ in range(params.octaves):
+        total += amplitude * value_noise(width, height, scale, rng)
+        amplitude *= params.persistence
+        scale /= params.lacunarity
+
+    low, high = total.min(), total.max()
+    if high > low:
+        total = (total - low) / (high - low)
+    return total.astype(np.float32)
+
+
+class Terrain:
+    """
+    Elevation, passable and cost layers indexed [y, x]. cost is 1 on flat ground rising
+    to params.max_cost, and inf where the cell can't be entered.
+    cost_rows is the same as nested lists for the pathfinding loops, which index one cell at a time,
+    and cost_flat as one list indexed y * width + x.
+    """
+
+    def __init__(self, elevation: np.ndarray, seed: int, params: TerrainParams):
+        self.seed = seed
+        self.params = params
+        self.elevation = elevation
+        self.height, self.width = elevation.shape
+        self.passable = (elevation >= params.water_level) & (elevation <= params.peak_level)
+
+        # cost grows with distance from the middle of the passable band (shore and mountain sides are slow)
+        middle = (params.water_level + params.peak_level) / 2
+        half_band = max((params.peak_level - params.water_level) / 2, 1e-9)
+        roughness = np.clip(np.abs(elevation - middle) / half_band, 0, 1)
+        self.cost = np.where(self.passable, 1 + (params.max_cost - 1) * roughness, np.inf).astype(np.float32)
+        self.cost_rows = self.cost.tolist()
+        self.cost_flat = self.cost.ravel().tolist()
+
+    def is_passable(self, x: int, y: int) -> bool:
+        return bool(self.passable[y, x])
+
+    def cost_at(self, x: int, y: int) -> float:
+        return self.cost_rows[y][x]
+
+
+def cache_key(width: int, height: int, seed: int, params: TerrainParams) -> str:
+    text = repr((width, height, seed, tuple(params)))
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def generate_terrain(width: int, height: int, seed: int = 0, params: Optional[TerrainParams] = None,
+                     cache_dir: Optional[str] = None) -> Terrain:
+    """
+    Build (or with cache_dir, load) the terrain for a map size, seed and params.
+    Cached maps are plain .npy elevation files, passability and costs are cheap to redo from them.
+    """
+    params = params if params is not None else TerrainParams()
+
+    path = None
+    if cache_dir is not None:
+        path = os.path.join(cache_dir, f"terrain_{cache_key(width, height, seed, params)}.npy")
+        if os.path.exists(path):
+            return Terrain(np.load(path), seed, params)
+
+    elevation = fractal_noise(width, height, seed, params)
+
+    if path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        # write then rename, so parallel runs never read a half written file
+        temp = f"{path}.{os.getpid()}.tmp"
+        with open(temp, 'wb') as f:
+            np.save(f, elevation)
+        os.replace(temp, path)
+
+    return Terrain(elevation, seed, params)
@@ -41,15 +41,18 @@ class ClanCode:
     
     @staticmethod
     def calculate_honor_change(predator: Predator, target: Agent, action: str) -> tuple[int, str]:
-    
+        """
+        (honour change, message template), the template has a {name} field for the
+        predator and is only formatted by a sink that shows it, see announce().
+        """
         if action == "kill":
             if isinstance(target, Monster) and target.is_boss:
-                return ClanCode.HONOR_BOSS_KILL, f"{predator.name} gains great honor for slaying the Ultimate Adversary!"
+                return ClanCode.HONOR_BOSS_KILL, "{name} gains great honor for slaying the Ultimate Adversary!"
             
           
             is_worthy, reason = ClanCode.is_worthy_prey(predator, target)
             if is_worthy:
-                return ClanCode.HONOR_WORTHY_KILL, f"{predator.name} gains honor for a successful hunt"
+                return ClanCode.HONOR_WORTHY_KILL, "{name} gains honor for a successful hunt"
             
             
             
@@ -57,24 +60,30 @@ class ClanCode:
             
             
             if reason == "wounded_prey":
-                return ClanCode.HONOR_WOUNDED_ATTACK, f"{predator.name} dishonorably killed wounded prey!"
+                return ClanCode.HONOR_WOUNDED_ATTACK, "{name} dishonorably killed wounded prey!"
             elif reason == "not_alive":
-                return ClanCode.HONOR_SYNTHETIC_ATTACK, f"{predator.name} attacked non-living prey!"
+                return ClanCode.HONOR_SYNTHETIC_ATTACK, "{name} attacked non-living prey!"
         
         elif action == "attack":
           
             is_worthy, reason = ClanCode.is_worthy_prey(predator, target)
             if not is_worthy:
                 if reason == "not_alive":
-                    return ClanCode.HONOR_SYNTHETIC_ATTACK, f" {predator.name} attacks nonliving prey  dishonorable!"
+                    return ClanCode.HONOR_SYNTHETIC_ATTACK, " {name} attacks nonliving prey  dishonorable!"
                 elif reason == "wounded_prey":
-                    return ClanCode.HONOR_WOUNDED_ATTACK, f"{predator.name} attacks wounded prey  shameful!"
+                    return ClanCode.HONOR_WOUNDED_ATTACK, "{name} attacks wounded prey  shameful!"
         
         elif action == "flee":
-            return ClanCode.HONOR_COWARDICE, f"⚠️ {predator.name} fled from combat  cowardice!"
+            return ClanCode.HONOR_COWARDICE, "⚠️ {name} fled from combat  cowardice!"
         
         return 0, ""
     
+    @staticmethod
+    def announce(predator: Predator, message: str):
+        """Send a calculate_honor_change message through the predator's event sink."""
+        if message:
+            predator.events.emit('honour', message, name=predator.name)
+
     @staticmethod
     def should_allow_action(predator: Predator, target: Agent, action: str) -> bool:
      
@@ -84,7 +93,8 @@ class ClanCode:
         
             if reason == "not_alive" and predator.isDek:
                 #dek hqs to follow the code more strictly
-                print(f" {predator.name} refuses to attack {target.name}  not worthy prey!")
+                predator.events.emit('honour', " {name} refuses to attack {target}  not worthy prey!",
+                                     name=predator.name, target=target.name)
                 return False
         
         return True
\ No newline at end of file
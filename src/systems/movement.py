@@ -1,28 +1,127 @@
 import heapq
-from typing import List,Tuple,Optional, Set
+from typing import List,Tuple,Optional
 from core.grid import Grid
+from core.neighbours import MOORE, ORTHOGONAL, neighbour_table
 from entities.agent import Agent
 
-class PathNode:
-
-    def __init__(self,position:Tuple[int,int], g_cost: float, h_cost: float, parent: Optional['PathNode'] = None):
-        self.position = position
-        self.g_cost = g_cost # saying how much it costs to get here from the start
-        self.h_cost = h_cost  # estimated cost to get from here to the goal
-        self.f_cost = g_cost + h_cost # this is the total estimated cost
-        self.parent = parent # this is the node we came from which is used for reconstructing
-
-    def __lt__(self, other):
-        return self.f_cost < other.f_cost
+# cost of a diagonal step, straight steps cost 1
+DIAGONAL_COST = 1.4
+
+# step cost for each of the MOORE offsets, the first four are the straight ones
+STEP_COSTS = (1.0, 1.0, 1.0, 1.0, DIAGONAL_COST, DIAGONAL_COST, DIAGONAL_COST, DIAGONAL_COST)
+
+
+class GridSearch:
+    """
+    A* over flat cell indices (y * width + x) for one grid size.
+    g costs, parents and the closed set are plain lists allocated once and reused by
+    every search. Instead of clearing them each entry is stamped with the search's
+    generation and anything with an older stamp counts as unset.
+    The heuristic is the octile distance on the torus, which never overestimates as
+    flat ground is the cheapest terrain there is.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        cells = width * height
+        self.g_costs = [0.0] * cells
+        self.parents = [0] * cells
+        self.seen = [0] * cells  # generation that last wrote g_costs / parents
+        self.closed = [0] * cells  # generation that expanded the cell
+        self.generation = 0
+        self.neighbours = neighbour_table(width, height).indices(MOORE)
+        self.column = [index % width for index in range(cells)]
+        self.row = [index // width for index in range(cells)]
+        self.expansions = 0  # cells expanded by the last search
+
+    def axis_distances(self, goal_x: int, goal_y: int) -> Tuple[List[int], List[int]]:
+        """Wrapped distance from every column to goal_x and every row to goal_y."""
+        width, height = self.width, self.height
+        dxs = [min(abs(x - goal_x), width - abs(x - goal_x)) for x in range(width)]
+        dys = [min(abs(y - goal_y), height - abs(y - goal_y)) for y in range(height)]
+        return dxs, dys
+
+    def search(self, start: Tuple[int,int], goal: Tuple[int,int], grid: Grid,
+               avoid_agents: bool = False) -> Optional[List[Tuple[int,int]]]:
+        width, height = self.width, self.height
+        goal_x, goal_y = goal[0] % width, goal[1] % height
+        start_index = (start[1] % height) * width + start[0] % width
+        goal_index = goal_y * width + goal_x
+
+        self.generation += 1
+        generation = self.generation
+        g_costs, parents, seen, closed = self.g_costs, self.parents, self.seen, self.closed
+        neighbours = self.neighbours
+        column, row = self.column, self.row
+        dxs, dys = self.axis_distances(goal_x, goal_y)
+        diagonal_saving = DIAGONAL_COST - 2  # a diagonal step does the work of two straight ones
+        terrain_costs = grid.terrain.cost_flat if grid.terrain is not None else None
+        rows = grid.grid if avoid_agents else None
+        inf = float('inf')
+
+        g_costs[start_index] = 0.0
+        parents[start_index] = -1
+        seen[start_index] = generation
+        # (f, h, cell), equal f goes to whichever is closer to the goal
+        dx, dy = dxs[column[start_index]], dys[row[start_index]]
+        h = dx + dy + diagonal_saving * (dx if dx < dy else dy)
+        open_set = [(h, h, start_index)]
+        expansions = 0
 
+        while open_set:
+            current = heapq.heappop(open_set)[2]
+            if current == goal_index:
+                self.expansions = expansions
+                path = []
+                while current != -1:
+                    path.append((column[current], row[current]))
+                    current = parents[current]
+                path.reverse()
+                return path
+
+            if closed[current] == generation:
+                continue  # stale entry, already expanded through something cheaper
+            closed[current] = generation
+            expansions += 1
+            g = g_costs[current]
+
+            for neighbour, step in zip(neighbours[current], STEP_COSTS):
+                if closed[neighbour] == generation:
+                    continue
+                # occupied cells are walls, apart from the goal (usually what we're after)
+                if rows is not None and neighbour != goal_index and \
+                        rows[row[neighbour]][column[neighbour]] is not None:
+                    continue
+                if terrain_costs is not None:
+                    terrain_cost = terrain_costs[neighbour]
+                    if terrain_cost == inf:
+                        continue
+                    step *= terrain_cost
+                tentative_g = g + step
+
+                if seen[neighbour] != generation or tentative_g < g_costs[neighbour]:
+                    seen[neighbour] = generation
+                    g_costs[neighbour] = tentative_g
+                    parents[neighbour] = current
+                    dx, dy = dxs[column[neighbour]], dys[row[neighbour]]
+                    h = dx + dy + diagonal_saving * (dx if dx < dy else dy)
+                    # rounded so float noise in long sums of 1.4 doesnt decide ties
+                    heapq.heappush(open_set, (round(tentative_g + h, 6), h, neighbour))
+
+        self.expansions = expansions
+        return None  # No path found
 
-    def __eq__(self,other):
-        return self.position == other.position
 
+_searches = {}
 
-    def __hash__(self):
-        return hash(self.position)
 
+def grid_search(width: int, height: int) -> GridSearch:
+    """The shared search (and its scratch lists) for a grid size."""
+    search = _searches.get((width, height))
+    if search is None:
+        search = _searches[(width, height)] = GridSearch(width, height)
+    return search
 
 
 class MovementSystem:
@@ -36,6 +135,14 @@ class MovementSystem:
         #defining what mahattan distance is
         # Manhattan distance = like a city block distance where you can only move up/down/left/right (akin to walking on a grid of streets).
 
+    @staticmethod
+    def toroidal_manhattan(pos1: Tuple[int,int], pos2: Tuple[int,int], grid: Grid) -> int:
+
+        # manhattan distance but allowing for the grid wrapping round at the edges
+        dx = abs(pos1[0] - pos2[0]) % grid.width
+        dy = abs(pos1[1] - pos2[1]) % grid.height
+        return min(dx, grid.width - dx) + min(dy, grid.height - dy)
+
     @staticmethod ## going to be useufl for thias scan range , simulating a circular scan or for combat range
     def eucilidean_distance(pos1 : Tuple[int,int], pos2: Tuple[int,int]) -> float:
         return (( pos1[0] - pos2[0])**2 + (pos1[1] - pos2[1])   ** 2) ** 0.5
@@ -45,21 +152,10 @@ class MovementSystem:
     @staticmethod
     def get_neighbors(position: Tuple[int,int], grid: Grid, allow_diagonal: bool = True) -> List[Tuple[int,int]]:
 
-        x,y = position
-        neighbors = []
-
-        directions = [(0,1),(1,0),(0,-1),(-1,0)] # directions for up down left right
-
-        if allow_diagonal:
-            directions.extend([(1,1),(1,-1),(-1,-1),(-1,1)])
-
-        for dx, dy in directions:
-            new_x = (x + dx) % grid.width  # Wrap around
-            new_y = (y + dy) % grid.height
-        
-            neighbors.append((new_x, new_y))
-    
-        return neighbors
+        # up down left right, then the diagonals, all wrapped round (precomputed per grid size)
+        table = grid.neighbours
+        offsets = MOORE if allow_diagonal else ORTHOGONAL
+        return list(table.positions(offsets)[table.index(position[0], position[1])])
 
 
     @staticmethod
@@ -69,72 +165,56 @@ class MovementSystem:
         if start == goal:
             return [start]
 
-        open_set = [] #priority queuue for nodes to explore
-
-
-        start_node = PathNode(start, 0, MovementSystem.manattan_distance(start,goal)) #manhattan distance for h cost
-        heapq.heappush(open_set,start_node)
-
-
-        #track visited nodes
-        closed_set: Set[Tuple[int,int]] = set()
+        # flat index search with reused scratch lists, see GridSearch
+        return grid_search(grid.width, grid.height).search(start, goal, grid, avoid_agents)
 
-        # need to track the best g_cost to reach each position 
-        g_costs = {start: 0}
 
-         # main loop
 
+ 
+    @staticmethod
+    def distance_map(goal: Tuple[int,int], grid: Grid, allow_diagonal: bool = True) -> List[float]:
+        """
+        Dijkstra outwards from the goal over the whole (wrapping) grid.
+        Returns a flat list indexed y * width + x with the cost of getting from each cell to the goal.
+        Agents are ignored as the map is shared by everyone heading for the same goal,
+        terrain isnt: impassable cells stay at inf and the cost of entering a cell is scaled by its terrain cost.
+        """
+        width, height = grid.width, grid.height
+        distances = [float('inf')] * (width * height)
+        goal_index = goal[1] * width + goal[0]
+        distances[goal_index] = 0.0
+
+        # an agent on a neighbour steps onto (x, y), so it pays (x, y)'s terrain cost
+        terrain_costs = grid.terrain.cost_rows if grid.terrain is not None else None
+        neighbours = grid.neighbours.positions(MOORE if allow_diagonal else ORTHOGONAL)
+
+        open_set = [(0.0, goal)]
         while open_set:
-            current = heapq.heappop(open_set)
-
-            if current.position == goal: # W weve reached the goal
-
-            #reconstruc the path with the parent links
-
-                path = []
-                node = current
+            cost, (x, y) = heapq.heappop(open_set)
+            if cost > distances[y * width + x]:
+                continue  # stale entry, already found something cheaper
+            step_cost = terrain_costs[y][x] if terrain_costs is not None else 1.0
+
+            for neighbor_x, neighbor_y in neighbours[y * width + x]:
+                if terrain_costs is not None and terrain_costs[neighbor_y][neighbor_x] == float('inf'):
+                    continue  # nobody stands there to walk from
+                # diagonal when both coordinates changed, works across the wrap too
+                move_cost = 1.4 if neighbor_x != x and neighbor_y != y else 1.0
+                new_cost = cost + move_cost * step_cost
+                index = neighbor_y * width + neighbor_x
+                if new_cost < distances[index]:
+                    distances[index] = new_cost
+                    heapq.heappush(open_set, (new_cost, (neighbor_x, neighbor_y)))
+
+        return distances
 
-
-                while node:
-                    path.append(node.position)
-                    node = node.parent
-
-                return list(reversed(path))
-
-            if current.position in closed_set:
-                continue #means weve already had a look at this node so we skip that
-
-            closed_set.add(current.position)
-
-            #xplore the neighbors
-            for neighbor_pos in MovementSystem.get_neighbors(current.position, grid):
-                if neighbor_pos in closed_set:
-                    continue
-                
-                # check to avoid this cell if its not empty (but allow goal cell)
-                if avoid_agents and neighbor_pos != goal:
-                    cell_agent = grid.get_cell(neighbor_pos[0], neighbor_pos[1])
-                    if cell_agent is not None:
-                        continue
-                
-                #calculate costs
-                move_cost = 1.4 if abs(neighbor_pos[0] - current.position[0]) + abs(neighbor_pos[1] - current.position[1]) == 2 else 1.0
-                tentative_g = current.g_cost + move_cost
-
-                #check if its an ideal path
-                if neighbor_pos not in g_costs or tentative_g < g_costs[neighbor_pos]:
-                    g_costs[neighbor_pos] = tentative_g
-                    h_cost = MovementSystem.manattan_distance(neighbor_pos, goal)
-                    neighbor_node = PathNode(neighbor_pos, tentative_g, h_cost, current)
-                    heapq.heappush(open_set, neighbor_node)
-        
-        return None  # No path found
-
-
-
- 
     @staticmethod
-    def get_next_move(agent: Agent, target_pos : Tuple[int,int], grid: Grid) -> Optional[Tuple[int,int]]:
+    def get_next_move(agent: Agent, target_pos : Tuple[int,int], grid: Grid,
+        cache: Optional['PathCache'] = None) -> Optional[Tuple[int,int]]:
+
+        # reuse the agents last path if we have one thats still walkable
+        if cache is not None:
+            return cache.next_step(agent, target_pos, grid)
 
         current_pos = (agent.x, agent.y)
         path = MovementSystem.a_star_search(current_pos, target_pos, grid, avoid_agents = True)
@@ -145,28 +225,154 @@ class MovementSystem:
         return None
 
     @staticmethod
-    def move_towards_target(agent:Agent, target_pos:Tuple[int,int], grid:Grid) -> bool:
+    def move_towards_target(agent:Agent, target_pos:Tuple[int,int], grid:Grid,
+        cache: Optional['PathCache'] = None) -> bool:
 
-        next_pos = MovementSystem.get_next_move(agent, target_pos,grid)
+        next_pos = MovementSystem.get_next_move(agent, target_pos, grid, cache)
 
         if next_pos:
             return grid.move_agent(agent, next_pos[0],next_pos[1])
 
         return False
 
-    
-
-
-    @staticmethod
-    def move_towards_target(agent:Agent, target_pos:Tuple[int,int], grid:Grid) -> bool:
-
-        next_pos = MovementSystem.get_next_move(agent, target_pos,grid)
 
-        if next_pos:
-            return grid.move_agent(agent, next_pos[0],next_pos[1])
 
-        return False
+class PathCache:
+    """
+    Remembers the last A* path each agent planned so it can keep walking it
+    instead of running a full search every turn.
+    A stored path is only thrown away when a cell still ahead on it gets occupied,
+    the agent falls off it, or the goal has moved more than max_goal_drift cells.
+    """
 
+    def __init__(self, max_goal_drift: int = 2, failed_retry: int = 3):
+        self.max_goal_drift = max_goal_drift
+        self.failed_retry = failed_retry  # lookups to wait before searching again after finding no path
+        self.paths = {}  # agent -> [goal, path, index of the agent on the path]
+        self.failures = {}  # agent -> [start, goal, lookups left]
+        self.hits = 0
+        self.misses = 0
+        self.skipped_searches = 0  # lookups answered "no path" from a recent failure, not reuses
 
+    def next_step(self, agent: Agent, goal: Tuple[int,int], grid: Grid) -> Optional[Tuple[int,int]]:
+        start = (agent.x, agent.y)
+        if start == goal:
+            return None
+
+        entry = self.paths.get(agent)
+        if entry is not None:
+            step = self._reuse(entry, start, goal, grid)
+            if step is not None:
+                self.hits += 1
+                return step
+
+        # a search that found nothing explores the whole grid, so dont redo it straight away
+        failure = self.failures.get(agent)
+        if failure is not None:
+            if failure[2] > 0 and failure[0] == start and \
+                    MovementSystem.toroidal_manhattan(failure[1], goal, grid) <= self.max_goal_drift:
+                failure[2] -= 1
+                self.skipped_searches += 1
+                return None
+            del self.failures[agent]
+
+        self.misses += 1
+        path = MovementSystem.a_star_search(start, goal, grid, avoid_agents=True)
+        if path and len(path) > 1:
+            self.paths[agent] = [goal, path, 0]
+            return path[1]
 
+        self.paths.pop(agent, None)
+        if path is None:
+            self.failures[agent] = [start, goal, self.failed_retry]
+        return None
 
+    def _reuse(self, entry, start, goal, grid) -> Optional[Tuple[int,int]]:
+        cached_goal, path, index = entry
+
+        if MovementSystem.toroidal_manhattan(cached_goal, goal, grid) > self.max_goal_drift:
+            return None
+
+        # the agent is either where we left it or one step further along
+        if path[index] != start:
+            if index + 1 < len(path) and path[index + 1] == start:
+                index += 1
+            else:
+                return None
+
+        if index + 1 >= len(path):
+            return None  # walked the whole thing, time to plan again
+
+        # the goal cell is allowed to be occupied (its usually the target), everything else must be free
+        ahead = path[index + 1:-1] if path[-1] == goal else path[index + 1:]
+        for x, y in ahead:
+            if grid.grid[y][x] is not None:
+                return None
+
+        entry[2] = index
+        return path[index + 1]
+
+    def invalidate(self, agent: Agent):
+        self.paths.pop(agent, None)
+        self.failures.pop(agent, None)
+
+    def clear(self):
+        self.paths.clear()
+        self.failures.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'skipped_searches': self.skipped_searches,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+
+class FlowField:
+    """
+    Shared pathfinding for lots of agents chasing a few targets.
+    Builds one distance map per distinct goal per turn and then every agent
+    just steps to its cheapest free neighbour, instead of each agent running its own A*.
+    """
+
+    def __init__(self):
+        self.maps = {}  # goal -> flat distance list
+        self.turn = None
+        self.builds = 0
+
+    def start_turn(self, turn: int):
+        # targets move during a turn but the maps are only rebuilt once per turn
+        if turn != self.turn:
+            self.maps.clear()
+            self.turn = turn
+
+    def distances(self, goal: Tuple[int,int], grid: Grid) -> List[float]:
+        distances = self.maps.get(goal)
+        if distances is None:
+            distances = MovementSystem.distance_map(goal, grid)
+            self.maps[goal] = distances
+            self.builds += 1
+        return distances
+
+    def next_step(self, agent: Agent, goal: Tuple[int,int], grid: Grid) -> Optional[Tuple[int,int]]:
+        if (agent.x, agent.y) == goal:
+            return None
+
+        distances = self.distances(goal, grid)
+        width = grid.width
+        best_pos = None
+        best_cost = distances[agent.y * width + agent.x]
+
+        for neighbor_x, neighbor_y in grid.neighbours.positions(MOORE)[agent.y * width + agent.x]:
+            # same rule as A* with avoid_agents, the goal itself can be stepped at
+            if (neighbor_x, neighbor_y) != goal and grid.grid[neighbor_y][neighbor_x] is not None:
+                continue
+            cost = distances[neighbor_y * width + neighbor_x]
+            if cost < best_cost:
+                best_cost = cost
+                best_pos = (neighbor_x, neighbor_y)
+
+        return best_pos
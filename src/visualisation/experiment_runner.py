@@ -7,21 +7,109 @@ project_root = os.path.dirname(parent_dir)
 sys.path.insert(0, parent_dir)
 sys.path.insert(0, project_root)
 from core.simulation import Simulation
+from core.events import NullSink
+from core.batch import BatchSimulation
 from matplotlib import *
 import matplotlib.pyplot as plt
 import json
+import random
+import traceback
 import numpy as np
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+def _execute_run(config_name, run_num, sim_params, seed, max_turns=100):
+    """
+    Run one seeded simulation and return its result dict (None if it crashed).
+    Lives at module level so a process pool can send it to the workers.
+    """
+    try:
+        # NullSink drops the simulation messages without ever formatting them
+        sim = Simulation(seed=seed, events=NullSink(), **sim_params)
+
+        # Add tracking hooks to Dek
+        dek = next((p for p in sim.predators if p.isDek), None)
+        if dek:
+            dek.honour_history = []  # Track honour over time
+            dek.health_history = []  # Track health over time
+            dek.stamina_history = []
+            dek.kill_history = []
+
+        # Modified run to track metrics each turn
+        ExperimentRunner._run_with_tracking(sim, max_turns=max_turns)
+
+        turns_survived = sim.turn
+
+    except Exception as e:
+        print(f"ERROR in run {run_num + 1}: {e}")
+        traceback.print_exc()
+        return None
+
+    # Collect final results
+    boss = next((m for m in sim.monsters if m.is_boss), None)
+
+    if dek and dek.honour_history is not None:
+        result = {
+            'run': run_num + 1,
+            'config': config_name,
+            'seed': seed,
+            'turns_survived': turns_survived,
+            'max_turns': sim.max_turns,
+            'dek_survived': dek.alive,
+            'boss_defeated': not (boss.alive if boss else False),
+            'total_kills': sim.stats['kills'],
+            'total_deaths': sim.stats['deaths'],
+            'total_combats': sim.stats['combats'],
+            'resources_collected': sim.stats.get('resources_collected', 0),
+            'dek_honour': dek.honour,
+            'dek_health': dek.health,
+            'dek_kills': dek.kills,
+            'dek_stamina': dek.stamina,
+            'honour_timeline': list(dek.honour_history),
+            'health_timeline': list(dek.health_history),
+            'stamina_timeline': list(dek.stamina_history),
+            'kill_timeline': list(dek.kill_history),
+        }
+    else:
+        result = {
+            'run': run_num + 1,
+            'config': config_name,
+            'seed': seed,
+            'turns_survived': turns_survived,
+            'max_turns': sim.max_turns,
+            'dek_survived': False,
+            'boss_defeated': False,
+            'total_kills': sim.stats['kills'],
+            'total_deaths': sim.stats['deaths'],
+            'total_combats': sim.stats['combats'],
+            'resources_collected': sim.stats.get('resources_collected', 0),
+            'dek_honour': 0,
+            'dek_health': 0,
+            'dek_kills': 0,
+            'dek_stamina': 0,
+            'honour_timeline': [],
+            'health_timeline': [],
+            'stamina_timeline': [],
+            'kill_timeline': [],
+        }
+
+    return result
+
 
 class ExperimentRunner:
     """
     Runs multiple simulations and collects REAL statistical data
     """
     
-    def __init__(self, num_runs=20):
+    def __init__(self, num_runs=20, workers=1, seed=None):
         self.num_runs = num_runs
         self.results = []
         self.honour_timelines = defaultdict(list)  # stores actual honour progression
+
+        # workers > 1 runs the simulations in a process pool
+        self.workers = workers
+        # run n of every experiment uses seed + n so any single run can be reproduced
+        self.seed = seed if seed is not None else random.randrange(2**31)
     
     def run_experiment(self, config_name, **sim_params):
         """
@@ -30,91 +118,35 @@ class ExperimentRunner:
         print(f"\n{'='*60}")
         print(f"Running experiment: {config_name}")
         print(f"Parameters: {sim_params}")
-        print(f"Number of runs: {self.num_runs}")
+        print(f"Number of runs: {self.num_runs} (workers: {self.workers}, seed: {self.seed})")
         print(f"{'='*60}\n")
         
         run_results = []
-        
-        for run_num in range(self.num_runs):
-            print(f"Run {run_num + 1}/{self.num_runs}... ", end='', flush=True)
-            
-            # Create simulation with custom tracking
-            sim = Simulation(**sim_params)
-            
-            # Add tracking hooks to Dek
-            dek = next((p for p in sim.predators if p.isDek), None)
-            if dek:
-                dek.honour_history = []  # Track honour over time
-                dek.health_history = []  # Track health over time
-                dek.stamina_history = []
-                dek.kill_history = []
-            
-            try:
-                # Run simulation with suppressed output
-                import io
-                import contextlib
-                
-                f = io.StringIO()
-                with contextlib.redirect_stdout(f):
-                    # Modified run to track metrics each turn
-                    self._run_with_tracking(sim, max_turns=100)
-                
-                turns_survived = sim.turn
-                
-            except Exception as e:
-                print(f"ERROR: {e}")
-                import traceback
-                traceback.print_exc()
-                continue
-            
-            # Collect final results
-            boss = next((m for m in sim.monsters if m.is_boss), None)
-            
-            if dek and hasattr(dek, 'honour_history'):
-                result = {
-                    'run': run_num + 1,
-                    'config': config_name,
-                    'turns_survived': turns_survived,
-                    'max_turns': sim.max_turns,
-                    'dek_survived': dek.alive,
-                    'boss_defeated': not (boss.alive if boss else False),
-                    'total_kills': sim.stats['kills'],
-                    'total_deaths': sim.stats['deaths'],
-                    'total_combats': sim.stats['combats'],
-                    'resources_collected': sim.stats.get('resources_collected', 0),
-                    'dek_honour': dek.honour,
-                    'dek_health': dek.health,
-                    'dek_kills': dek.kills,
-                    'dek_stamina': dek.stamina,
-                    'honour_timeline': list(dek.honour_history),
-                    'health_timeline': list(dek.health_history),
-                    'stamina_timeline': list(dek.stamina_history),
-                    'kill_timeline': list(dek.kill_history),
-                }
-            else:
-                result = {
-                    'run': run_num + 1,
-                    'config': config_name,
-                    'turns_survived': turns_survived,
-                    'max_turns': sim.max_turns,
-                    'dek_survived': False,
-                    'boss_defeated': False,
-                    'total_kills': sim.stats['kills'],
-                    'total_deaths': sim.stats['deaths'],
-                    'total_combats': sim.stats['combats'],
-                    'resources_collected': sim.stats.get('resources_collected', 0),
-                    'dek_honour': 0,
-                    'dek_health': 0,
-                    'dek_kills': 0,
-                    'dek_stamina': 0,
-                    'honour_timeline': [],
-                    'health_timeline': [],
-                    'stamina_timeline': [],
-                    'kill_timeline': [],
-                }
-            
-            run_results.append(result)
-            print(f"✓ Completed (survived={result['dek_survived']}, kills={result['dek_kills']})")
+
+        if self.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = [pool.submit(_execute_run, config_name, run_num, sim_params, self.seed + run_num)
+                           for run_num in range(self.num_runs)]
+
+                # results stream back as they finish
+                for done, future in enumerate(as_completed(futures), start=1):
+                    result = future.result()
+                    if result is None:
+                        continue
+                    run_results.append(result)
+                    print(f"[{done}/{self.num_runs}] Run {result['run']} ✓ Completed "
+                          f"(survived={result['dek_survived']}, kills={result['dek_kills']})")
+
+            # put them back in run order so everything downstream sees the same thing as a serial run
+            run_results.sort(key=lambda r: r['run'])
+        else:
+            for run_num in range(self.num_runs):
+                print(f"Run {run_num + 1}/{self.num_runs}... ", end='', flush=True)
+                result = _execute_run(config_name, run_num, sim_params, self.seed + run_num)
+                if result is None:
+                    continue
+                run_results.append(result)
+                print(f"✓ Completed (survived={result['dek_survived']}, kills={result['dek_kills']})")
         
         self.results.extend(run_results)
         
@@ -125,7 +157,30 @@ class ExperimentRunner:
         
         return run_results
     
-    def _run_with_tracking(self, sim, max_turns=100):
+    def run_batch_experiment(self, config_name, max_turns=100, **sim_params):
+        """
+        Same as run_experiment but on the vectorized BatchSimulation, for studies
+        with thousands of runs. Results go through generate_statistics like any other.
+        """
+        print(f"\n{'='*60}")
+        print(f"Running batch experiment: {config_name}")
+        print(f"Parameters: {sim_params}")
+        print(f"Number of worlds: {self.num_runs} (seed: {self.seed})")
+        print(f"{'='*60}\n")
+
+        batch = BatchSimulation(self.num_runs, seed=self.seed, **sim_params)
+        batch.run(max_turns=max_turns)
+        run_results = batch.results(config_name)
+
+        self.results.extend(run_results)
+        for result in run_results:
+            if result['honour_timeline']:
+                self.honour_timelines[config_name].append(result['honour_timeline'])
+
+        return run_results
+
+    @staticmethod
+    def _run_with_tracking(sim, max_turns=100):
         """
         Run simulation while tracking metrics each turn
         """
@@ -140,7 +195,7 @@ class ExperimentRunner:
             sim.stats['turns'] = turn
             
             # Track Dek's stats THIS turn
-            if dek and hasattr(dek, 'honour_history'):
+            if dek and dek.honour_history is not None:
                 dek.honour_history.append(dek.honour)
                 dek.health_history.append(dek.health)
                 dek.stamina_history.append(dek.stamina)
@@ -166,6 +221,8 @@ class ExperimentRunner:
                 break
             if len([m for m in sim.monsters if m.alive]) == 0:
                 break
+
+        sim.q_learning.end_episode()
     
     def generate_statistics(self):
         """Generate comprehensive statistics from all runs"""
@@ -399,7 +456,7 @@ if __name__ == "__main__":
     print(f"  Python path: {sys.path[:3]}")
     print()
     
-    runner = ExperimentRunner(num_runs=10)
+    runner = ExperimentRunner(num_runs=10, workers=os.cpu_count() or 1)
     
     # Run baseline experiment
     runner.run_experiment("baseline", 
@@ -2,6 +2,7 @@ import sys
 sys.path.insert(0, 'src')
 
 from core.simulation import Simulation
+from core.events import NullSink
 import matplotlib.pyplot as plt
 import json
 import numpy as np
@@ -29,16 +30,11 @@ class GprahRunner:
         for run_num in range(self.num_runs):
             print(f"Run {run_num + 1}/{self.num_runs}...", end=' ', flush=True)
             
-            sim = Simulation(**sim_params)
+            #null sink keeps the run quiet without formatting every message
+            sim = Simulation(events=NullSink(), **sim_params)
             
             try:
-                #suppress print output during run
-                import io
-                import contextlib
-                
-                f = io.StringIO()
-                with contextlib.redirect_stdout(f):
-                    sim.run(display_every=0, max_turns=100)
+                sim.run(display_every=0, max_turns=100)
                 
                 turns_survived = sim.turn 
                 
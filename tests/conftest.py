@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the code imports relative to src (from core.grid import Grid), like the scripts in it do
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
@@ -0,0 +1,37 @@
+import numpy as np
+
+from core.batch import BatchSimulation
+from visualisation.experiment_runner import _execute_run
+
+METRICS = ('dek_survived', 'total_kills', 'total_combats', 'resources_collected', 'dek_honour',
+           'dek_health', 'dek_kills', 'turns_survived')
+
+
+def _metrics(results):
+    return np.array([[result[key] for key in METRICS] for result in results], dtype=float)
+
+
+def test_same_seed_same_worlds():
+    runs = []
+    for _ in range(2):
+        batch = BatchSimulation(100, seed=5)
+        batch.run(max_turns=40)
+        runs.append(batch.results())
+    assert runs[0] == runs[1]
+
+    other = BatchSimulation(100, seed=6)
+    other.run(max_turns=40)
+    assert other.results() != runs[0]
+
+
+def test_agrees_with_simulation_in_distribution():
+    # the scalar runs go through the experiment runner, runs that crash are dropped there too
+    scalar = _metrics([r for r in (_execute_run('scalar', seed, {}, seed) for seed in range(200)) if r])
+    batch = BatchSimulation(1000, seed=0)
+    batch.run(max_turns=100)
+    vectorized = _metrics(batch.results())
+
+    # every mean within 4 standard errors of the difference
+    error = np.sqrt(scalar.var(axis=0) / len(scalar) + vectorized.var(axis=0) / len(vectorized))
+    gap = np.abs(scalar.mean(axis=0) - vectorized.mean(axis=0))
+    assert (gap <= 4 * error + 1e-9).all(), dict(zip(METRICS, np.round(gap / np.maximum(error, 1e-9), 2)))
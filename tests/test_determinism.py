@@ -0,0 +1,27 @@
+import pytest
+
+from core.events import BufferedSink, DEBUG
+from core.simulation import Simulation
+
+
+def _run(seed, **params):
+    sink = BufferedSink(level=DEBUG)
+    sim = Simulation(seed=seed, events=sink, **params)
+    sim.run(display_every=5, max_turns=100)
+    positions = sorted((e.entity_id, e.x, e.y, e.health, e.alive) for e in sim.entities.entities.values())
+    return sink.getvalue(), dict(sim.stats), positions
+
+
+@pytest.mark.parametrize('params', [
+    {},
+    {'q_backend': 'dense'},
+    {'pathfinding': 'flow_field'},
+    {'shared_policy': True, 'q_backend': 'dense', 'hazard_field': True, 'terrain': True},
+])
+def test_same_seed_same_run(params):
+    for seed in (3, 11):
+        assert _run(seed, **params) == _run(seed, **params)
+
+
+def test_different_seeds_differ():
+    assert _run(3)[0] != _run(4)[0]
@@ -0,0 +1,90 @@
+import random
+
+import pytest
+
+from core.entity_store import EntityStore
+from core.events import NullSink
+from core.simulation import Simulation
+from entities.monster import Monster
+from entities.predator import Predator
+from entities.resource import Resource
+from entities.synthetics import Synthetic
+from entities.trap import Trap
+
+
+class Walker:
+    def __init__(self):
+        self.alive = True
+
+
+class Rock:
+    def __init__(self):
+        self.alive = True
+
+
+def _check_turn_order(store):
+    # every acting id once, and _position pointing back at where it is
+    assert len(set(store.turn_order)) == len(store.turn_order)
+    assert store._position == {entity_id: i for i, entity_id in enumerate(store.turn_order)}
+
+
+def test_swap_remove_and_shuffle_keep_turn_order_consistent():
+    rng = random.Random(7)
+    store = EntityStore((Walker, Rock))
+    acting = set()
+    for _ in range(40):
+        acting.add(store.add(Walker()))
+        store.add(Rock(), acts=False)
+
+    for _ in range(200):
+        roll = rng.random()
+        if roll < 0.3 and acting:
+            # die or leave the store mid turn, either way it still sits in turn_order until start_turn
+            entity = store.get(rng.choice(sorted(acting)))
+            entity.alive = False
+            if rng.random() < 0.5:
+                store.died(entity)
+            else:
+                store.remove(entity)
+            acting.discard(entity.entity_id)
+        elif roll < 0.5:
+            acting.add(store.add(Walker()))
+        else:
+            store.start_turn(rng)
+            assert set(store.turn_order) == acting
+        _check_turn_order(store)
+        alive = sum(entity.alive for entity in store.view(Walker))
+        assert store.alive_count(Walker) == alive
+        assert len(store.acting()) == len(store.turn_order)
+        assert [entity.entity_id for entity in store.acting()] == \
+               [entity_id for entity_id in store.turn_order if store.get(entity_id) is not None]
+
+
+def test_died_twice_counts_once():
+    store = EntityStore((Walker,))
+    walker = Walker()
+    store.add(walker)
+    walker.alive = False
+    store.died(walker)
+    store.died(walker)
+    store.remove(walker)
+    assert store.alive_count(Walker) == 0
+    store.start_turn(random.Random(0))
+    assert store.turn_order == [] and store._position == {}
+
+
+@pytest.mark.parametrize('seed', [3, 11, 21])
+def test_alive_counts_match_a_scan_in_seeded_runs(seed):
+    sim = Simulation(seed=seed, events=NullSink())
+    store = sim.entities
+    for turns in range(10, 101, 10):
+        sim.run(display_every=0, max_turns=turns)
+        for kind in (Predator, Monster, Synthetic, Trap, Resource):
+            assert store.alive_count(kind) == sum(entity.alive for entity in store.view(kind)), kind.__name__
+        _check_turn_order(store)
+        leaving = set(store._leaving)
+        alive_acting = {entity_id for entity_id in store.turn_order if store.get(entity_id) is not None
+                        and store.get(entity_id).alive}
+        assert set(store.turn_order) - leaving == alive_acting
+        if sim.turn < turns:
+            break
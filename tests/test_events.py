@@ -0,0 +1,18 @@
+from core.events import NullSink, StructuredSink
+from core.simulation import Simulation
+
+
+def test_null_sink_runs_print_nothing(capsys):
+    for seed in range(6):
+        Simulation(seed=seed, events=NullSink(), num_monsters=20).run(display_every=0, max_turns=100)
+    assert capsys.readouterr().out == ""
+
+
+def test_honour_messages_go_to_the_sink(capsys):
+    sink = StructuredSink()
+    Simulation(seed=0, events=sink, num_monsters=20).run(display_every=0, max_turns=100)
+    records = sink.of_kind('honour')
+    assert any('refuses to attack' in record.message for record in records)
+    # templates are stored unformatted, the sink formats them on demand
+    assert all('{name}' in record.message for record in records)
+    assert capsys.readouterr().out == ""
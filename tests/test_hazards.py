@@ -0,0 +1,106 @@
+import random
+
+import numpy as np
+import pytest
+
+from entities.agent import Agent
+from generation.hazard_field import FieldParams, HazardField
+from generation.hazards import DynamicHazards, HazardGenerator, Hazards
+
+
+def _field(diffusion=0.2, decay=0.0, threshold=0.0, width=12, height=9):
+    return HazardField(width, height, {'cloud': FieldParams(diffusion=diffusion, decay=decay, damage=10,
+                                                            emission=1.0, threshold=threshold)})
+
+
+def test_diffusion_conserves_intensity_without_decay():
+    field = _field()
+    field.emit('cloud', 3, 4, 100.0)
+    field.emit('cloud', 11, 0, 50.0, radius=2)
+    for _ in range(40):
+        field.step()
+        assert field.layers['cloud'].sum() == pytest.approx(150.0, rel=1e-4)
+    assert (field.layers['cloud'] >= 0).all()
+
+
+def test_decay_takes_its_share_each_turn():
+    field = _field(diffusion=0.1, decay=0.1)
+    field.emit('cloud', 5, 5, 100.0)
+    field.step()
+    assert field.layers['cloud'].sum() == pytest.approx(90.0, rel=1e-5)
+
+
+def test_spreading_wraps_round_the_edges():
+    field = _field(diffusion=0.2)
+    field.emit('cloud', 0, 0, 100.0)
+    field.step()
+    layer = field.layers['cloud']
+    for x, y in ((1, 0), (11, 0), (0, 1), (0, 8)):
+        assert layer[y, x] == pytest.approx(20.0)
+    assert layer[0, 0] == pytest.approx(20.0)
+    assert np.count_nonzero(layer) == 5
+
+
+@pytest.mark.parametrize('params', [dict(diffusion=0.26), dict(diffusion=-0.1), dict(decay=1.5)])
+def test_rejects_unstable_params(params):
+    with pytest.raises(ValueError):
+        _field(**params)
+
+
+def test_threshold_clears_faint_cells_and_empty_layers():
+    field = _field(diffusion=0.0, decay=0.5, threshold=1.0)
+    field.emit('cloud', 2, 2, 3.0)
+    field.step()
+    assert 'cloud' in field.layers
+    field.step()
+    assert 'cloud' not in field.layers and field.coverage() == 0
+
+
+def test_damage_at_falls_back_to_the_field_only_off_tile_hazards():
+    generator = HazardGenerator(12, 9, rng=random.Random(0), field=_field(diffusion=0.0))
+    tile = DynamicHazards(Hazards.silicon_rain, 2, 2, rng=random.Random(1))
+    tile.affected_tiles = [(2, 2), (3, 2)]
+    # a tile hazard that has faded to nothing still covers its cell
+    faded = DynamicHazards(Hazards.sulphur_dioxide, 8, 1, intensity=0.0, rng=random.Random(2))
+    generator.hazards = [tile, faded]
+    generator.invalidate_field()
+    generator.field.emit('cloud', 2, 2, 5.0)  # under the tile hazard
+    generator.field.emit('cloud', 8, 1, 5.0)  # under the faded one
+    generator.field.emit('cloud', 6, 6, 5.0)  # open ground
+
+    ys, xs = np.divmod(np.arange(12 * 9), 12)
+    damage = generator.damage_at(xs, ys).reshape(9, 12)
+    assert damage[2, 2] == damage[2, 3] == tile.get_damage()
+    assert damage[6, 6] == 50 and damage[1, 8] == 0
+    assert np.count_nonzero(damage) == 3
+    for x, y in zip(xs.tolist(), ys.tolist()):
+        _, amount, _ = generator.check_hazard_damage(Agent(x, y, 'A'))
+        assert amount == damage[y, x]
+
+
+def _brute_force(generator, x, y):
+    # the old loop: the first hazard in the list that covers the cell
+    for hazard in generator.hazards:
+        if hazard.affects_position(x, y):
+            return (True, hazard.get_damage(), hazard.type)
+    return (False, 0, "")
+
+
+def test_index_keeps_first_hazard_wins():
+    # a small grid crowded with hazards so they overlap a lot
+    generator = HazardGenerator(6, 6, rng=random.Random(4))
+    generator.generation_rate = 0.8
+    generator.generate_initial_hazards(6)
+    overlaps = 0
+    for turn in range(1, 80):
+        generator.update(turn)
+        if turn % 7 == 0:
+            # changed from outside, which is what invalidate_field is for
+            generator.hazards.reverse()
+            generator.invalidate_field()
+        for y in range(6):
+            for x in range(6):
+                expected = _brute_force(generator, x, y)
+                assert generator.check_hazard_damage(Agent(x, y, 'A')) == expected
+                overlaps += len(generator.get_hazards_at(x, y)) > 1
+    assert overlaps > 20
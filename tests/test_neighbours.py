@@ -0,0 +1,33 @@
+import pytest
+
+from core.grid import Grid
+from core.neighbours import MOORE, ORTHOGONAL, SCAN_ORDER, neighbour_table
+
+
+@pytest.mark.parametrize('width, height', [(20, 20), (7, 3), (1, 4)])
+@pytest.mark.parametrize('offsets', [ORTHOGONAL, MOORE, SCAN_ORDER])
+def test_tables_match_modulo_arithmetic(width, height, offsets):
+    table = neighbour_table(width, height)
+    positions = table.positions(offsets)
+    indices = table.indices(offsets)
+    flat = table.flat(offsets)
+    for y in range(height):
+        for x in range(width):
+            expected = [((x + dx) % width, (y + dy) % height) for dx, dy in offsets]
+            index = table.index(x, y)
+            assert list(positions[index]) == expected
+            assert list(indices[index]) == [ny * width + nx for nx, ny in expected]
+            assert flat[index].tolist() == list(indices[index])
+
+
+def test_axes_match_modulo_arithmetic():
+    table = neighbour_table(9, 5)
+    offsets, xs, ys = table.axes(3)
+    assert offsets == tuple(range(-3, 4))
+    assert all(xs[x] == tuple((x + d) % 9 for d in offsets) for x in range(9))
+    assert all(ys[y] == tuple((y + d) % 5 for d in offsets) for y in range(5))
+
+
+def test_tables_are_shared_per_grid_size():
+    assert Grid(12, 8).neighbours is Grid(12, 8).neighbours
+    assert Grid(12, 8).neighbours is not Grid(8, 12).neighbours
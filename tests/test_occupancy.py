@@ -0,0 +1,61 @@
+import random
+
+from core.events import NullSink
+from core.grid import Grid
+from core.occupancy import EMPTY, NO_ENTITY, entity_type_code
+from core.simulation import Simulation
+from entities.monster import Monster
+from entities.predator import Predator
+
+
+def _assert_mirrors(grid):
+    layer = grid.occupancy
+    for y in range(grid.height):
+        for x in range(grid.width):
+            agent = grid.grid[y][x]
+            if agent is None:
+                assert layer.ids[y, x] == NO_ENTITY and layer.types[y, x] == EMPTY
+            else:
+                assert layer.agent_for(layer.ids[y, x]) is agent
+                assert layer.types[y, x] == entity_type_code(agent)
+    # only agents on the grid are remembered
+    on_grid = {id(agent) for row in grid.grid for agent in row if agent is not None}
+    assert {id(agent) for agent in layer._ids} == on_grid
+
+
+def test_layer_matches_grid_through_a_run():
+    sim = Simulation(seed=5, events=NullSink(), occupancy=True)
+    for turn in range(1, 41):
+        sim.turn = turn
+        sim._update_agents()
+        sim.weather_update()
+        _assert_mirrors(sim.grid)
+
+
+def test_layer_matches_grid_after_moves_and_removals():
+    grid = Grid(12, 12, occupancy=True)
+    rng = random.Random(0)
+    agents = []
+    for i in range(30):
+        agent = Monster(0, 0, name=f"Monster{i}") if i % 2 else Predator(0, 0, name=f"Predator{i}")
+        if grid.place_agent(agent, rng.randrange(12), rng.randrange(12)):
+            agents.append(agent)
+    for _ in range(500):
+        agent = rng.choice(agents)
+        roll = rng.random()
+        if roll < 0.7:
+            grid.move_agent(agent, agent.x + rng.choice((-1, 0, 1)), agent.y + rng.choice((-1, 0, 1)))
+        elif roll < 0.85:
+            grid.remove_agent(agent)
+            agents.remove(agent)
+            if not agents:
+                break
+        else:
+            grid.place_agent(Monster(0, 0), rng.randrange(12), rng.randrange(12))
+            agents = [a for row in grid.grid for a in row if a is not None]
+        _assert_mirrors(grid)
+
+    for agent in list(agents):
+        grid.remove_agent(agent)
+    _assert_mirrors(grid)
+    assert not grid.occupancy._agents
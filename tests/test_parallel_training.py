@@ -0,0 +1,71 @@
+import random
+
+import numpy as np
+import pytest
+
+from ai.parallel_training import ParallelTrainer, _train_round
+from ai.qtable import N_STATES
+from ai.reinforcement import Qlearning
+from ai.training import run_headless_episode
+
+EPISODES = 2
+MAX_TURNS = 30
+
+
+def test_one_worker_matches_training_in_process():
+    trainer = ParallelTrainer(workers=1, episodes_per_round=EPISODES, seed=3, max_turns=MAX_TURNS)
+    trainer.train(rounds=2)
+
+    # the same episodes on a plain Qlearning, each round starting again from the table so far
+    q = Qlearning(backend='dense')
+    for round_ in range(2):
+        seed = 3 + round_ * EPISODES
+        worker = Qlearning(backend='dense', rng=random.Random(seed))
+        worker.q_table.q[:] = q.q_table.q
+        for episode in range(EPISODES):
+            run_headless_episode(worker, MAX_TURNS, seed + episode)
+        q.q_table.q[:] = worker.q_table.q
+    assert np.abs(q.q_table.q).sum() > 0
+    assert np.allclose(trainer.q_learning.q_table.q, q.q_table.q)
+
+
+def test_two_workers_match_the_serial_merge():
+    pooled = ParallelTrainer(workers=2, episodes_per_round=EPISODES, seed=8, max_turns=MAX_TURNS)
+    pooled.train(rounds=2)
+
+    serial = ParallelTrainer(workers=2, episodes_per_round=EPISODES, seed=8, max_turns=MAX_TURNS)
+    for _ in range(2):
+        results = [_train_round(serial.q_learning.q_table.q.copy(), serial._worker_seed(worker), EPISODES,
+                                serial.configs, MAX_TURNS, 0.1, 0.95, 1) for worker in range(2)]
+        serial.history.append(serial._merge(results))
+        serial.rounds += 1
+
+    assert pooled.q_learning.q_table.visits.sum() > 0 and pooled.failed_episodes == 0
+    assert np.array_equal(pooled.q_learning.q_table.q, serial.q_learning.q_table.q)
+    assert np.array_equal(pooled.q_learning.q_table.visits, serial.q_learning.q_table.visits)
+    assert pooled.history == serial.history
+
+
+def _hand_built():
+    shape = (N_STATES, len(Qlearning().actions))
+    delta_a, delta_b = np.zeros(shape), np.zeros(shape)
+    visits_a, visits_b = np.zeros(shape, dtype=np.int64), np.zeros(shape, dtype=np.int64)
+    delta_a[0, 0], visits_a[0, 0] = 3.0, 1   # both workers touched (0, 0)
+    delta_b[0, 0], visits_b[0, 0] = 6.0, 2
+    delta_a[4, 1], visits_a[4, 1] = -2.0, 5  # only worker a touched (4, 1)
+    return [(delta_a, visits_a, 0), (delta_b, visits_b, 1)]
+
+
+@pytest.mark.parametrize('merge, expected', [('visits', {(0, 0): (1 * 3 + 2 * 6) / 3, (4, 1): -2.0}),
+                                             ('average', {(0, 0): (3 + 6) / 2, (4, 1): -1.0})])
+def test_merge_on_hand_built_tables(merge, expected):
+    trainer = ParallelTrainer(workers=2, seed=0, merge=merge)
+    change = trainer._merge(_hand_built())
+
+    q = trainer.q_learning.q_table
+    for (state, action), value in expected.items():
+        assert q.q[state, action] == pytest.approx(value)
+    assert np.count_nonzero(q.q) == len(expected)
+    assert change == pytest.approx(max(abs(v) for v in expected.values()))
+    assert (q.visits[0, 0], q.visits[4, 1]) == (3, 5)
+    assert q.order == [0, 4] and trainer.failed_episodes == 1
@@ -0,0 +1,130 @@
+import random
+
+import pytest
+
+from benchmarks.astar_benchmark import baseline_a_star, free_cells, make_grid, path_cost
+from core.grid import Grid
+from entities.agent import Agent
+from systems.movement import MovementSystem, PathCache, grid_search
+
+SIZE = 30
+
+
+def _pairs(grid, count=150, seed=0):
+    return free_cells(grid, count, random.Random(seed))
+
+
+def _assert_walkable(path, grid, avoid_agents):
+    for (x0, y0), (x1, y1) in zip(path, path[1:]):
+        dx, dy = abs(x1 - x0), abs(y1 - y0)
+        assert min(dx, grid.width - dx) <= 1 and min(dy, grid.height - dy) <= 1
+        if grid.terrain is not None:
+            assert grid.terrain.is_passable(x1, y1)
+    if avoid_agents:
+        assert all(grid.grid[y][x] is None for x, y in path[1:-1])
+
+
+@pytest.mark.parametrize('kind', ['open', 'agents', 'terrain'])
+def test_flat_search_against_pathnode_search(kind):
+    grid = make_grid(kind, SIZE, seed=2)
+    avoid_agents = kind == 'agents'
+    for start, goal in _pairs(grid):
+        path = MovementSystem.a_star_search(start, goal, grid, avoid_agents)
+        old_path, _ = baseline_a_star(start, goal, grid, avoid_agents)
+        # both find a path exactly when one exists, and the flat search's is never worse
+        assert (path is None) == (old_path is None)
+        if path is None:
+            continue
+        assert path[0] == start and path[-1] == goal
+        _assert_walkable(path, grid, avoid_agents)
+        assert path_cost(path, grid) <= path_cost(old_path, grid) + 1e-9
+
+
+@pytest.mark.parametrize('kind', ['open', 'terrain'])
+def test_flat_search_is_optimal(kind):
+    grid = make_grid(kind, SIZE, seed=4)
+    for start, goal in _pairs(grid, seed=1):
+        path = MovementSystem.a_star_search(start, goal, grid)
+        best = MovementSystem.distance_map(goal, grid)[start[1] * SIZE + start[0]]
+        if path is None:
+            assert best == float('inf')
+        else:
+            assert path_cost(path, grid) == pytest.approx(best)
+
+
+def test_open_grid_expands_only_the_path():
+    grid = make_grid('open', SIZE, seed=0)
+    search = grid_search(SIZE, SIZE)
+    path = MovementSystem.a_star_search((2, 3), (12, 8), grid)
+    assert len(path) == 11
+    assert search.expansions == len(path) - 1
+
+
+def test_scratch_lists_are_reused_between_searches():
+    grid = make_grid('agents', SIZE, seed=6)
+    pairs = _pairs(grid, count=40, seed=2)
+    first = [MovementSystem.a_star_search(s, g, grid, True) for s, g in pairs]
+    # the same searches in reverse order, so every one starts on stale generation stamps
+    again = [MovementSystem.a_star_search(s, g, grid, True) for s, g in reversed(pairs)]
+    assert again[::-1] == first
+
+
+def _walker(grid, x, y):
+    agent = Agent(x, y, 'D', name="Walker")
+    grid.place_agent(agent, x, y)
+    return agent
+
+
+def test_path_cache_reuses_the_planned_path():
+    grid = Grid(SIZE, SIZE)
+    agent = _walker(grid, 2, 3)
+    cache = PathCache()
+    planned = MovementSystem.a_star_search((2, 3), (12, 8), grid, avoid_agents=True)
+    walked = []
+    while (agent.x, agent.y) != (12, 8):
+        step = cache.next_step(agent, (12, 8), grid)
+        walked.append(step)
+        grid.move_agent(agent, *step)
+    assert walked == planned[1:]
+    assert (cache.hits, cache.misses) == (len(walked) - 1, 1)
+
+
+def test_path_cache_replans_when_the_path_is_blocked_or_the_goal_moves():
+    grid = Grid(SIZE, SIZE)
+    agent = _walker(grid, 2, 3)
+    cache = PathCache(max_goal_drift=2)
+    first = cache.next_step(agent, (12, 3), grid)
+    grid.move_agent(agent, *first)
+    path = cache.paths[agent][1]
+    index = path.index((agent.x, agent.y))
+
+    # a goal that drifted a little keeps the path, a cell ahead getting occupied throws it away
+    assert cache.next_step(agent, (12, 5), grid) == path[index + 1]
+    assert cache.hits == 1
+    grid.place_agent(Agent(0, 0, '#', name="Rock"), *path[index + 3])
+    step = cache.next_step(agent, (12, 3), grid)
+    assert cache.misses == 2
+    assert step != path[index + 3] and cache.paths[agent][1][0] == (agent.x, agent.y)
+
+    # as does a goal that moved further than max_goal_drift
+    cache.next_step(agent, (12, 20), grid)
+    assert cache.misses == 3 and cache.paths[agent][0] == (12, 20)
+
+    cache.invalidate(agent)
+    cache.next_step(agent, (12, 20), grid)
+    assert cache.misses == 4
+
+
+def test_path_cache_skips_searches_after_no_path_without_counting_hits():
+    grid = Grid(SIZE, SIZE)
+    agent = _walker(grid, 2, 3)
+    # wall the goal in, the goal cell itself stays free
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            if dx or dy:
+                grid.place_agent(Agent(0, 0, '#', name="Rock"), 15 + dx, 15 + dy)
+    cache = PathCache(failed_retry=3)
+    assert [cache.next_step(agent, (15, 15), grid) for _ in range(5)] == [None] * 5
+    # one search, three lookups answered from the failure, then it searches again
+    assert (cache.misses, cache.skipped_searches, cache.hits) == (2, 3, 0)
+    assert cache.stats()['hit_rate'] == 0.0
@@ -0,0 +1,136 @@
+import random
+
+import numpy as np
+
+from ai.qtable import N_STATES, STATE_INDEX, DenseQTable, decode_state, encode_state
+from ai.reinforcement import Qlearning
+from ai.schedules import LinearSchedule, VisitCountSchedule
+from core import snapshot
+from core.events import NullSink
+from core.simulation import Simulation
+
+
+def _transitions(count, seed):
+    rng = random.Random(seed)
+    states = list(STATE_INDEX)
+    actions = Qlearning().actions
+    return [(rng.choice(states), rng.choice(actions), rng.uniform(-20, 100), rng.choice(states))
+            for _ in range(count)]
+
+
+def test_state_encoding_round_trips():
+    assert sorted(encode_state(decode_state(i)) for i in range(N_STATES)) == list(range(N_STATES))
+
+
+def test_dense_updates_match_dict():
+    transitions = _transitions(2000, seed=1)
+    tables = []
+    for backend in ('dict', 'dense'):
+        q = Qlearning(learning_rate=0.3, discount=0.9, rng=random.Random(0), backend=backend)
+        for state, action, reward, next_state in transitions:
+            q.choose_action(state)
+            q.update(state, action, reward, next_state)
+        tables.append(q)
+
+    dict_q, dense_q = tables
+    assert list(dense_q.q_table) == list(dict_q.q_table)  # same states, in first seen order
+    for state, values in dict_q.q_table.items():
+        assert np.allclose([dense_q.q_table[state][a] for a in dict_q.actions],
+                           [values[a] for a in dict_q.actions])
+
+
+def _dict_table_after(transitions, learning_rate, discount):
+    q = Qlearning(learning_rate=learning_rate, discount=discount, backend='dict')
+    for transition in transitions:
+        q.update(*transition)
+    return q
+
+
+def test_batch_of_duplicates_matches_sequential_updates():
+    states = list(STATE_INDEX)
+    actions = Qlearning().actions
+    rng = random.Random(3)
+    # two pairs hit over and over (bootstrapping off a state nothing updates), and a self loop
+    cases = [
+        [(states[0], actions[0], rng.uniform(0, 100), states[5]) if i % 2 else
+         (states[1], actions[3], rng.uniform(-20, 20), states[5]) for i in range(300)],
+        [(states[7], actions[2], 100.0, states[7])] * 500,
+    ]
+    for transitions in cases:
+        expected = _dict_table_after(transitions, 0.3, 0.9)
+        dense = DenseQTable(actions)
+        s, a, r, n = zip(*transitions)
+        dense.batch_update([STATE_INDEX[x] for x in s], [dense.action_index[x] for x in a], r,
+                           [STATE_INDEX[x] for x in n], 0.3, 0.9)
+        for state, values in expected.q_table.items():
+            assert np.allclose([dense[state][x] for x in actions], [values[x] for x in actions])
+
+
+def test_batch_update_stays_bounded():
+    # 1000 copies of a rewarding self loop used to add up to one huge step per batch
+    dense = DenseQTable(Qlearning().actions)
+    index = STATE_INDEX[('high', 'high', 'high', 'low')]
+    for _ in range(20):
+        dense.batch_update([index] * 1000, [0] * 1000, [100.0] * 1000, [index] * 1000, 0.1, 0.95)
+    assert np.isfinite(dense.q).all()
+    assert np.abs(dense.q).max() <= 100.0 / (1 - 0.95) + 1e-6
+    assert dense.visits[index, 0] == 20_000
+
+
+def test_update_batch_uses_each_states_learning_rate():
+    states = list(STATE_INDEX)
+    actions = Qlearning().actions
+    # repeats of a few pairs, all bootstrapping off states nothing in the batch updates
+    transitions = [(states[i % 4], actions[i % 3], float(i), states[20 + i % 5]) for i in range(40)]
+    for schedule, per in ((VisitCountSchedule(0.9, 0.5, 0.01), 'episode'), (LinearSchedule(0.5, 0.05, 30), 'step')):
+        tables = []
+        for backend in ('dict', 'dense'):
+            q = Qlearning(discount=0.9, backend=backend, learning_rate_schedule=schedule, schedule_per=per)
+            q.state_visits = {state: i * 3 for i, state in enumerate(states[:4])}
+            s, a, r, n = zip(*transitions)
+            q.update_batch(s, a, r, n)
+            tables.append(q)
+        dict_q, dense_q = tables
+        assert dense_q.steps == dict_q.steps == len(transitions)
+        assert dense_q.learning_rate == dict_q.learning_rate
+        assert dense_q.telemetry.updates == dict_q.telemetry.updates
+        assert np.isclose(dense_q.telemetry.max_delta, dict_q.telemetry.max_delta)
+        for state, values in dict_q.q_table.items():
+            assert np.allclose([dense_q.q_table[state][x] for x in actions], [values[x] for x in actions])
+
+
+def test_large_shared_clan_stays_bounded():
+    # a big clan mostly sits in a handful of states, so each turn's batch is full of repeats
+    tables = {}
+    for backend in ('dict', 'dense'):
+        sim = Simulation(width=40, height=40, num_predators=120, num_monsters=60, seed=0,
+                         events=NullSink(), shared_policy=True, q_backend=backend)
+        sim.run(display_every=0, max_turns=40)
+        tables[backend] = np.array([list(values.values()) for _, values in sim.q_learning.q_table.items()])
+    assert np.isfinite(tables['dense']).all()
+    # best possible return is a boss kill every turn
+    assert np.abs(tables['dense']).max() < 100 / (1 - 0.95)
+    assert np.abs(tables['dense']).max() < 2 * np.abs(tables['dict']).max()
+
+
+def test_dense_run_matches_dict_run():
+    for seed in (2, 7):
+        runs = []
+        for backend in ('dict', 'dense'):
+            sim = Simulation(seed=seed, events=NullSink(), q_backend=backend)
+            sim.run(display_every=0, max_turns=100)
+            runs.append((dict(sim.stats), {s: v for s, v in sim.q_learning.q_table.items()}))
+        (dict_stats, dict_table), (dense_stats, dense_table) = runs
+        assert dense_stats == dict_stats
+        assert dense_table.keys() == dict_table.keys()
+        for state in dict_table:
+            assert np.allclose(list(dense_table[state].values()), list(dict_table[state].values()))
+
+
+def test_snapshot_keeps_dense_visits():
+    sim = Simulation(seed=4, events=NullSink(), q_backend='dense')
+    sim.run(display_every=0, max_turns=40)
+    restored = snapshot.restore(snapshot.snapshot(sim), events=NullSink())
+    assert restored.q_learning.q_table.visits.sum() > 0
+    assert (restored.q_learning.q_table.visits == sim.q_learning.q_table.visits).all()
+    assert list(restored.q_learning.q_table) == list(sim.q_learning.q_table)
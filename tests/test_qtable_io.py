@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from ai.qtable_io import QTableFile, read_checkpoints, write_checkpoint
+from ai.reinforcement import Qlearning
+from core.events import NullSink
+from core.simulation import Simulation
+
+ACTIONS = Qlearning().actions
+
+
+def _values(rows, seed):
+    return np.random.default_rng(seed).normal(size=(rows, len(ACTIONS)))
+
+
+@pytest.mark.parametrize('backend', ['dict', 'dense'])
+def test_save_and_load_round_trip(tmp_path, backend):
+    sim = Simulation(seed=2, events=NullSink(), q_backend=backend)
+    sim.run(display_every=0, max_turns=40)
+    filename = str(tmp_path / 'q.qtb')
+    sim.q_learning.save(filename)
+
+    for mmap in (False, True):
+        loaded = Qlearning(backend=backend)
+        assert loaded.load(filename, mmap=mmap)
+        assert list(loaded.q_table.keys()) == list(sim.q_learning.q_table.keys())
+        assert dict(loaded.q_table.items()) == dict(sim.q_learning.q_table.items())
+
+
+def test_append_keeps_earlier_checkpoints(tmp_path):
+    filename = str(tmp_path / 'q.qtb')
+    tables = [([0, 5, 9], _values(3, 0)), ([1, 2], _values(2, 1)), ([], _values(0, 2)), ([7], _values(1, 3))]
+    for step, (keys, values) in enumerate(tables):
+        write_checkpoint(filename, keys, values, ACTIONS, step=step * 10, append=step > 0)
+
+    assert [c.step for c in read_checkpoints(filename)] == [0, 10, 20, 30]
+    for index, (keys, values) in enumerate(tables):
+        table = QTableFile(filename, checkpoint=index)
+        assert table.keys.tolist() == keys
+        assert np.array_equal(np.asarray(table.values), values)
+        assert table.actions == ACTIONS
+
+
+def test_torn_append_is_ignored_and_overwritten(tmp_path):
+    filename = str(tmp_path / 'q.qtb')
+    write_checkpoint(filename, [0, 5, 9], _values(3, 0), ACTIONS, step=1)
+    first_size = (tmp_path / 'q.qtb').stat().st_size
+    write_checkpoint(filename, [1, 2], _values(2, 1), ACTIONS, step=2, append=True)
+    whole = (tmp_path / 'q.qtb').read_bytes()
+
+    # cut the second checkpoint off at every length, header included
+    for cut in range(first_size, len(whole)):
+        (tmp_path / 'q.qtb').write_bytes(whole[:cut])
+        assert [c.step for c in read_checkpoints(filename)] == [1]
+        assert QTableFile(filename).step == 1
+
+    # the next append replaces the torn one rather than landing after it
+    write_checkpoint(filename, [4], _values(1, 4), ACTIONS, step=3, append=True)
+    assert [c.step for c in read_checkpoints(filename)] == [1, 3]
+    assert QTableFile(filename).keys.tolist() == [4]
+
+
+def test_truncated_first_checkpoint_and_garbage(tmp_path):
+    filename = str(tmp_path / 'q.qtb')
+    write_checkpoint(filename, [0, 5, 9], _values(3, 0), ACTIONS)
+    whole = (tmp_path / 'q.qtb').read_bytes()
+
+    (tmp_path / 'q.qtb').write_bytes(whole[:len(whole) - 1])
+    assert read_checkpoints(filename) == []
+    with pytest.raises(ValueError, match='no checkpoints'):
+        QTableFile(filename)
+
+    (tmp_path / 'q.qtb').write_bytes(whole + b'not a checkpoint at all, just junk')
+    with pytest.raises(ValueError, match=f'byte {len(whole)} of .*q.qtb'):
+        read_checkpoints(filename)
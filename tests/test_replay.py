@@ -0,0 +1,26 @@
+from core.events import NullSink
+from core.replay import EventLog, Replay
+from core.simulation import Simulation
+
+
+def _cells(grid):
+    # who stands where, deaths that leave the body on the grid (hazards, weather) aren't logged
+    return [[cell.name if cell is not None else None for cell in row] for row in grid.grid]
+
+
+def test_grid_at_matches_the_live_grid():
+    for seed in (1, 5, 9):
+        log = EventLog()
+        sim = Simulation(seed=seed, events=NullSink(), replay=log, hazard_field=True)
+        live = {}
+        for turn in (1, 10, 25, 60):
+            sim.run(display_every=0, max_turns=turn)
+            live[sim.turn] = _cells(sim.grid)
+            if not sim.running or sim.turn < turn:
+                break
+        log.flush()
+
+        replay = Replay(log.getvalue())
+        assert (replay.width, replay.height) == (sim.width, sim.height)
+        for turn, cells in live.items():
+            assert _cells(replay.grid_at(turn)) == cells
@@ -0,0 +1,52 @@
+import pytest
+
+from ai.schedules import (ConstantSchedule, ExponentialSchedule, LinearSchedule, Schedule,
+                          VisitCountSchedule, schedule_from_config)
+from core import snapshot
+from core.events import NullSink
+from core.simulation import Simulation
+
+
+@pytest.mark.parametrize('schedule', [ConstantSchedule(0.2), LinearSchedule(1.0, 0.1, 50),
+                                      ExponentialSchedule(1.0, 0.95, 0.05), VisitCountSchedule(0.8, 0.5, 0.05)])
+def test_schedule_config_round_trips(schedule):
+    rebuilt = schedule_from_config(schedule.to_config())
+    assert type(rebuilt) is type(schedule)
+    assert [rebuilt.value(t, v) for t in (0, 10, 100) for v in (0, 3)] == \
+        [schedule.value(t, v) for t in (0, 10, 100) for v in (0, 3)]
+
+
+@pytest.mark.parametrize('backend', ['dict', 'dense'])
+@pytest.mark.parametrize('per', ['episode', 'step'])
+def test_restore_continues_schedules(backend, per):
+    original = Simulation(seed=1, events=NullSink(), q_backend=backend)
+    q = original.q_learning
+    q.epsilon_schedule = VisitCountSchedule(0.8, 0.5, 0.05)
+    q.learning_rate_schedule = LinearSchedule(0.5, 0.05, 30)
+    q.schedule_per = per
+    original.run(display_every=0, max_turns=25)  # ends an episode, so the counters have moved on
+
+    restored = snapshot.restore(snapshot.snapshot(original), events=NullSink())
+    for sim in (original, restored):
+        sim.run(display_every=0, max_turns=70)
+
+    a, b = original.q_learning, restored.q_learning
+    assert (b.episodes, b.steps, b.state_visits) == (a.episodes, a.steps, a.state_visits)
+    assert (b.epsilon, b.learning_rate, b.schedule_per) == (a.epsilon, a.learning_rate, a.schedule_per)
+    assert dict(b.q_table.items()) == dict(a.q_table.items())
+    assert b.telemetry.history == a.telemetry.history
+    assert restored.stats == original.stats
+
+
+def test_custom_schedules_are_passed_to_restore():
+    class Halving(Schedule):
+        def value(self, t, visits=0):
+            return 0.5 ** t
+
+    sim = Simulation(seed=2, events=NullSink())
+    sim.q_learning.epsilon_schedule = Halving()
+    data = snapshot.snapshot(sim)
+    with pytest.raises(ValueError):
+        snapshot.restore(data, events=NullSink())
+    schedule = Halving()
+    assert snapshot.restore(data, events=NullSink(), epsilon_schedule=schedule).q_learning.epsilon_schedule is schedule
@@ -0,0 +1,78 @@
+import json
+import os
+import zlib
+
+import pytest
+
+from core import snapshot
+from core.events import NullSink
+from core.simulation import Simulation
+from entities.monster import Monster
+
+
+def _step(sim):
+    # one turn of Simulation.run
+    sim.turn += 1
+    sim.stats['turns'] = sim.turn
+    sim._update_agents()
+    sim.hazard_generation.update(sim.turn)
+    sim.weather_update()
+
+
+def _state(sim):
+    entities = sorted((e.entity_id, e.name, e.x, e.y, e.health, e.alive, getattr(e, 'stamina', None))
+                      for e in sim.entities.entities.values())
+    return entities, dict(sim.stats), sim.current_weather, list(sim.entities.turn_order)
+
+
+@pytest.mark.parametrize('params', [
+    {},
+    {'q_backend': 'dense'},
+    {'pathfinding': 'flow_field'},
+    {'shared_policy': True, 'q_backend': 'dense'},
+    {'hazard_field': True, 'terrain': True, 'occupancy': True},
+])
+def test_restore_continues_identically(params):
+    for seed in range(3):
+        original = Simulation(seed=seed, events=NullSink(), **params)
+        for _ in range(20):
+            _step(original)
+        restored = snapshot.restore(snapshot.snapshot(original), events=NullSink())
+        assert _state(restored) == _state(original)
+
+        for _ in range(40):
+            _step(original)
+            _step(restored)
+            assert _state(restored) == _state(original)
+        assert dict(restored.q_learning.q_table.items()) == dict(original.q_learning.q_table.items())
+
+
+def test_rejects_other_data():
+    with pytest.raises(ValueError):
+        snapshot.restore(b'XXXX\x01\x00' + b'\x00' * 10)
+
+
+# saved by the version 1 code from before the entity store, seed 3 after 25 turns
+OLD_SNAPSHOT = os.path.join(os.path.dirname(__file__), 'fixtures', 'snapshot_v1_lists.bsnp')
+
+
+def test_restores_snapshot_from_before_the_entity_store():
+    with open(OLD_SNAPSHOT, 'rb') as f:
+        data = f.read()
+    saved = json.loads(zlib.decompress(data[snapshot.HEADER.size:]).decode('utf-8'))
+    assert 'store' not in saved
+
+    sim = snapshot.restore(data, events=NullSink())
+    assert sim.turn == 25
+    for name in ('predators', 'monsters', 'synthetics', 'traps', 'resources'):
+        assert [e.name for e in getattr(sim, name)] == [saved['entities'][ref]['name'] for ref in saved[name]]
+    assert [a.name for a in sim.all_agents] == [saved['entities'][ref]['name'] for ref in saved['all_agents']]
+    ids = [e.entity_id for e in sim.entities.entities.values()]
+    assert len(set(ids)) == len(ids) and sim.entities.next_id > max(ids)
+    assert sim.entities.alive_count(Monster) == sum(m.alive for m in sim.monsters)
+    # the dead from the old all_agents leave at the next turn
+    store = sim.entities
+    assert all(store.get(i).alive for i in set(store.turn_order) - set(store.getstate()['leaving']))
+
+    sim.run(display_every=0, max_turns=60)
+    assert sim.turn == 60
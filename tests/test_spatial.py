@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+from core.grid import Grid
+from entities.monster import Monster
+from entities.predator import Predator
+from systems.movement import MovementSystem
+
+
+def _populated_grid(width, height, count, seed):
+    rng = random.Random(seed)
+    grid = Grid(width, height, spatial_index=True)
+    agents = []
+    for i in range(count):
+        cls = Monster if i % 3 else Predator
+        agent = cls(0, 0, name=f"{cls.__name__}{i}")
+        if grid.place_agent(agent, rng.randrange(width), rng.randrange(height)):
+            agents.append(agent)
+    # a few dead ones, which the hash must never return
+    for agent in agents[::7]:
+        agent.alive = False
+    return grid, agents
+
+
+def _brute_force(grid, agents, x, y, kind=None):
+    return sorted((MovementSystem.toroidal_manhattan((x, y), (a.x, a.y), grid), a.name)
+                  for a in agents if a.alive and (kind is None or isinstance(a, kind)))
+
+
+@pytest.mark.parametrize('width, height', [(20, 20), (37, 23), (5, 9)])
+def test_nearest_matches_brute_force(width, height):
+    grid, agents = _populated_grid(width, height, 40, seed=width * height)
+    rng = random.Random(1)
+    for _ in range(200):
+        x, y = rng.randrange(width), rng.randrange(height)
+        for kind in (None, Monster):
+            expected = _brute_force(grid, agents, x, y, kind)
+            found = grid.spatial.nearest(x, y, k=3, kind=kind)
+            # ties can come back in any order, the distances can't
+            assert [dist for dist, _ in found] == [dist for dist, _ in expected[:3]]
+
+
+@pytest.mark.parametrize('radius', [0, 1, 4, 11])
+def test_within_radius_matches_brute_force(radius):
+    grid, agents = _populated_grid(30, 25, 60, seed=radius)
+    rng = random.Random(radius)
+    for _ in range(100):
+        x, y = rng.randrange(30), rng.randrange(25)
+        expected = [(dist, name) for dist, name in _brute_force(grid, agents, x, y, Monster) if dist <= radius]
+        found = sorted((dist, agent.name) for dist, agent in grid.spatial.within_radius(x, y, radius, kind=Monster))
+        assert found == expected
+
+
+def test_hash_follows_moves_and_removals():
+    grid, agents = _populated_grid(20, 20, 30, seed=3)
+    rng = random.Random(3)
+    for _ in range(300):
+        agent = rng.choice(agents)
+        if grid.get_cell(agent.x, agent.y) is not agent:
+            continue
+        if rng.random() < 0.1:
+            grid.remove_agent(agent)
+            agents.remove(agent)
+        else:
+            grid.move_agent(agent, agent.x + rng.choice((-1, 0, 1)), agent.y + rng.choice((-1, 0, 1)))
+    for x, y in [(0, 0), (10, 10), (19, 3)]:
+        expected = _brute_force(grid, agents, x, y)
+        found = grid.spatial.within_radius(x, y, 40)
+        assert sorted(agent.name for _, agent in found) == sorted(name for _, name in expected)
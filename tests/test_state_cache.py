@@ -0,0 +1,48 @@
+from core.events import NullSink
+from core.simulation import Simulation
+from entities.monster import Monster
+from entities.predator import Predator
+
+
+def _sim_with_dek_and_monsters(count):
+    sim = Simulation(seed=0, events=NullSink(), spawn=False)
+    dek = Predator(5, 5, name="Dek", isDek=True, events=sim.events)
+    sim.grid.place_agent(dek, 5, 5)
+    sim.entities.add(dek)
+    monsters = []
+    for i in range(count):
+        monster = Monster(7 + i, 5, name=f"Monster{i}", events=sim.events)
+        sim.grid.place_agent(monster, monster.x, monster.y)
+        sim.entities.add(monster)
+        monsters.append(monster)
+    return sim, dek, monsters
+
+
+def test_state_cache_sees_deaths_that_leave_the_body():
+    sim, dek, monsters = _sim_with_dek_and_monsters(3)
+    q = sim.q_learning
+    assert q.get_state(dek, sim)[3] == 'high'
+
+    # a weather or hazard death in the same turn, the monster stays on the grid
+    monsters[0].take_damage(10_000)
+    sim._agent_died(monsters[0])
+    assert sim.grid.get_cell(monsters[0].x, monsters[0].y) is monsters[0]
+    assert q.get_state(dek, sim)[3] == 'medium'
+
+
+def test_state_cache_matches_uncached_states():
+    hits = []
+    for seed in range(5):
+        sim = Simulation(seed=seed, events=NullSink(), num_monsters=30)
+        q = sim.q_learning
+        compute = q.get_state
+
+        def checked(predator, simulation):
+            state = compute(predator, simulation)
+            q._state_cache.clear()
+            hits.append(compute(predator, simulation) == state)
+            return state
+
+        q.get_state = checked
+        sim.run(display_every=0, max_turns=60)
+    assert hits and all(hits)
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from core.events import NullSink
+from core.simulation import Simulation
+from generation import procedural
+from generation.procedural import TerrainParams, cache_key, fractal_noise, generate_terrain
+
+
+def test_cache_hit_skips_generation(tmp_path, monkeypatch):
+    first = generate_terrain(40, 30, seed=5, cache_dir=str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 1
+
+    def fail(*args):
+        raise AssertionError("regenerated a cached map")
+
+    monkeypatch.setattr(procedural, 'fractal_noise', fail)
+    second = generate_terrain(40, 30, seed=5, cache_dir=str(tmp_path))
+    assert np.array_equal(first.elevation, second.elevation)
+    assert np.array_equal(first.passable, second.passable)
+    assert np.array_equal(first.cost, second.cost)
+
+
+def test_cache_key_covers_every_param():
+    params = TerrainParams()
+    base = cache_key(40, 30, 5, params)
+    assert cache_key(41, 30, 5, params) != base
+    assert cache_key(40, 31, 5, params) != base
+    assert cache_key(40, 30, 6, params) != base
+    for name in TerrainParams._fields:
+        changed = params._replace(**{name: getattr(params, name) + 1})
+        assert cache_key(40, 30, 5, changed) != base, name
+
+
+def test_changed_params_dont_reuse_the_cache(tmp_path):
+    generate_terrain(40, 30, seed=5, cache_dir=str(tmp_path))
+    params = TerrainParams(octaves=2)
+    terrain = generate_terrain(40, 30, seed=5, params=params, cache_dir=str(tmp_path))
+    assert np.array_equal(terrain.elevation, fractal_noise(40, 30, 5, params))
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_noise_is_deterministic_per_seed():
+    params = TerrainParams()
+    first = fractal_noise(48, 32, 9, params)
+    assert first.shape == (32, 48)
+    assert first.min() == 0.0 and first.max() == 1.0
+    assert np.array_equal(first, fractal_noise(48, 32, 9, params))
+    assert not np.array_equal(first, fractal_noise(48, 32, 10, params))
+
+
+class PassableCheck:
+    """Grid listener failing on any placement or move onto an impassable cell."""
+
+    def __init__(self, terrain):
+        self.terrain = terrain
+        self.moves = 0
+
+    def on_place(self, agent, x, y):
+        assert self.terrain.passable[y, x], (agent.name, x, y)
+
+    def on_move(self, agent, x, y):
+        assert self.terrain.passable[y, x], (agent.name, x, y)
+        self.moves += 1
+
+    def on_remove(self, agent):
+        pass
+
+
+@pytest.mark.parametrize('params', [{}, {'pathfinding': 'flow_field'}])
+def test_agents_stay_on_passable_cells(params):
+    for seed in (3, 11):
+        sim = Simulation(seed=seed, events=NullSink(), terrain=True, **params)
+        terrain = sim.grid.terrain
+        assert not terrain.passable.all()
+        for entity in sim.entities.entities.values():
+            assert terrain.passable[entity.y, entity.x], (entity.name, entity.x, entity.y)
+
+        check = PassableCheck(terrain)
+        sim.grid.listeners.append(check)
+        sim.run(display_every=0, max_turns=60)
+        assert check.moves > 0
@@ -0,0 +1,79 @@
+from core import snapshot
+from core.events import NullSink
+from core.simulation import Simulation
+from entities.trap import Trap
+
+
+def _add_trap(sim, x, y, name):
+    # what _spawn_entities does for a trap
+    trap = Trap(x, y, symbol="!", name=name, events=sim.events)
+    sim.entities.add(trap, acts=False)
+    sim._index_trap(trap)
+    return trap
+
+
+def _stack(sim, names):
+    """Traps with the given names stacked on one free cell, returns the cell and the traps."""
+    x, y = next((x, y) for x, y in sim.grid.empty_cells() if not sim.trap_index.get((x, y)))
+    traps = [_add_trap(sim, x, y, name) for name in names]
+    return (x, y), traps
+
+
+def _brute_force_index(sim):
+    # every untriggered trap by cell, in spawn order
+    index = {}
+    for trap in sim.traps:
+        if not trap.is_triggered:
+            index.setdefault((trap.x, trap.y), []).append(trap.name)
+    return index
+
+
+def _index_names(sim):
+    return {cell: [trap.name for trap in traps] for cell, traps in sim.trap_index.items()}
+
+
+def _dek(sim):
+    return next(p for p in sim.predators if p.isDek)
+
+
+def test_stacked_traps_fire_in_spawn_order():
+    sim = Simulation(seed=3, events=NullSink())
+    cell, traps = _stack(sim, ["First", "Second"])
+    dek = _dek(sim)
+    dek.x, dek.y = cell
+
+    fired = []
+    for _ in range(3):
+        dek.health = dek.max_health
+        sim._check_traps(dek)
+        fired.append([trap.name for trap in traps if trap.is_triggered])
+    assert fired == [["First"], ["First", "Second"], ["First", "Second"]]
+    assert cell not in sim.trap_index
+    assert _index_names(sim) == _brute_force_index(sim)
+
+
+def test_restore_indexes_only_untriggered_traps():
+    original = Simulation(seed=3, events=NullSink())
+    original.run(display_every=0, max_turns=20)
+    cell, traps = _stack(original, ["First", "Second", "Third"])
+    dek = _dek(original)
+    dek.x, dek.y = cell
+    original._check_traps(dek)
+    dek.health = dek.max_health
+    spent = next(trap for trap in original.traps if trap.name == "Trap_1")
+    spent.is_triggered = True
+    original.trap_index = {}
+    for trap in original.traps:
+        original._index_trap(trap)
+
+    restored = snapshot.restore(snapshot.snapshot(original), events=NullSink())
+    assert _index_names(restored) == _brute_force_index(restored) == _index_names(original)
+    assert _index_names(restored)[cell] == ["Second", "Third"]
+    assert all(not trap.is_triggered for traps in restored.trap_index.values() for trap in traps)
+    assert all(trap in restored.traps for traps in restored.trap_index.values() for trap in traps)
+
+    # and they still go off in order after the restore
+    restored_dek = _dek(restored)
+    restored_dek.x, restored_dek.y = cell
+    restored._check_traps(restored_dek)
+    assert _index_names(restored)[cell] == ["Third"]